@@ -3,11 +3,11 @@ from flask_cors import CORS
 import json
 import os
 import threading
+import time
 import uuid
 import requests
 import io
-import tempfile
-from pydub import AudioSegment
+import itertools
 from datetime import datetime, timedelta
 import sys
 
@@ -16,6 +16,26 @@ from user_manager import User, get_user_manager
 from session_manager import get_session_manager
 from auth_manager import AuthManager
 from gemini_api.client import create_client as create_gemini_client
+from gemini_api.coalescing import CoalescingClient
+from gemini_api.hedging import HedgingClient
+from module_cache import get_module_cache
+from audio_cache import get_audio_cache, audio_etag, AUDIO_FORMATS
+from tts_pipeline import SpeechPipeline, AudioStitcher, is_wav_audio
+from audio_transcoder import AudioTranscoder, AUDIO_CONTENT_TYPES, DEFAULT_AUDIO_FORMAT, negotiate_audio_format
+from audio_prerender import AudioPrerenderer
+from speech_text import SpeechTextExtractor
+from job_manager import get_job_manager, JobQueueFullError
+from grading import GradingBatcher, GRADING_TIMEOUT_FEEDBACK
+from grading_cache import get_grading_cache
+from pre_grader import get_pre_grader
+from json_extractor import extract_quiz
+from prompt_builder import get_prompt_builder, estimate_tokens
+from module_warmer import ModuleWarmer
+from speculation import SpeculativeGenerator
+from usage_meter import UsageMeter, response_token_counts
+from module_service import ModuleFanOut, unique_topics
+from syllabus import SyllabusIngestor, SyllabusError, SyllabusTooLargeError, unit_to_html, unit_text
+from fingerprint import FingerprintIndex, fingerprint
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev_secret_key')
@@ -31,8 +51,94 @@ user_manager = get_user_manager()
 session_manager = get_session_manager()
 auth_manager = AuthManager()
 
-# Initialize Gemini client
-gemini_client = create_gemini_client()
+# Initialize the rate-limited Gemini client, hedging slow calls and coalescing identical
+# in-flight prompts into one upstream call
+llm_client = create_gemini_client()
+hedging_client = HedgingClient(llm_client)
+gemini_client = CoalescingClient(hedging_client)
+
+# Hard deadlines (seconds) for the LLM calls of latency-sensitive endpoints
+MODULE_GENERATION_DEADLINE = float(os.environ.get('MODULE_GENERATION_DEADLINE', 45))
+GRADING_DEADLINE = float(os.environ.get('GRADING_DEADLINE', 15))
+SYLLABUS_SEGMENT_DEADLINE = float(os.environ.get('SYLLABUS_SEGMENT_DEADLINE', 30))
+
+# Seconds /api/update-interests waits for its modules when called with "wait": true
+INTERESTS_WAIT_TIMEOUT = float(os.environ.get('INTERESTS_WAIT_TIMEOUT', 120))
+
+# Initialize generated module cache
+module_cache = get_module_cache()
+
+# Initialize token-budgeted quiz prompt builder
+prompt_builder = get_prompt_builder()
+
+# Initialize background job pool
+job_manager = get_job_manager()
+
+# Seconds generate_module waits for quiz queue space before giving up
+QUIZ_JOB_SUBMIT_TIMEOUT = float(os.environ.get('QUIZ_JOB_SUBMIT_TIMEOUT', 2))
+
+# Meter LLM tokens and latency per user and endpoint, written to llm_usage in batches
+def write_usage_rows(rows):
+    result = supabase_client.from_table('llm_usage').insert(rows)
+    if result.get('error'):
+        raise RuntimeError(f"Failed to store LLM usage: {result.get('error')}")
+
+usage_meter = UsageMeter(write_usage_rows)
+usage_meter.start()
+
+def metered_generate(prompt, user_id, endpoint, timeout=None):
+    """
+    Call Gemini AI and meter the call's tokens and latency for the user and endpoint
+    Returns the response text
+    """
+    model = getattr(gemini_client, 'model_name', 'gemini-pro')
+    started = time.time()
+    try:
+        response = gemini_client.generate_content(prompt, timeout=timeout)
+    except Exception:
+        usage_meter.record(user_id, endpoint, model, estimate_tokens(prompt), 0, (time.time() - started) * 1000, error=True)
+        raise
+    
+    response_text = response.text if hasattr(response, 'text') else str(response)
+    prompt_tokens, response_tokens = response_token_counts(prompt, response, response_text)
+    usage_meter.record(user_id, endpoint, model, prompt_tokens, response_tokens, (time.time() - started) * 1000)
+    return response_text
+
+def quota_exceeded_response(user_id):
+    """
+    Build the 429 response for a user over their LLM token quota, or None if within quota
+    """
+    if usage_meter.check_quota(user_id):
+        return None
+    response = jsonify({
+        "success": False,
+        "error": "LLM usage quota exceeded, please retry later"
+    })
+    response.headers['Retry-After'] = str(usage_meter.retry_after())
+    return response, 429
+
+# Initialize free-text grading, batching answers submitted within a short window
+# (grading usage is metered per answer in submit_answer)
+def generate_response_text(prompt):
+    response = gemini_client.generate_content(prompt, timeout=GRADING_DEADLINE)
+    return response.text if hasattr(response, 'text') else str(response)
+
+grading_batcher = GradingBatcher(generate_response_text)
+grading_cache = get_grading_cache()
+pre_grader = get_pre_grader()
+
+# Initialize syllabus ingestion, segmenting the chunks of an upload in parallel
+# (each segmentation call is metered to the uploading user)
+def generate_syllabus_units_text(prompt, user_id):
+    return metered_generate(prompt, user_id, 'process_syllabus', timeout=SYLLABUS_SEGMENT_DEADLINE)
+
+# Fingerprints of parsed syllabi and of the modules created from their units, so
+# re-uploaded and near-duplicate syllabi reuse earlier results
+fingerprint_index = FingerprintIndex()
+syllabus_ingestor = SyllabusIngestor(generate_syllabus_units_text, index=fingerprint_index)
+
+# Bump when the module prompt changes so stale cached lessons are not reused
+MODULE_PROMPT_VERSION = "1"
 
 # Schedule session cleanup
 def cleanup_expired_sessions():
@@ -312,39 +418,68 @@ def upload_syllabus():
                 "error": "No selected file"
             }), 400
             
-        # Process syllabus and generate modules
-        # This would call the AI service to analyze the syllabus
-        # For now, we'll create a sample module
-        
+        # Validate level
+        level = request.form.get('level', 'Basic')
+        if level not in ['Basic', 'Moderate', 'Advanced']:
+            return jsonify({
+                "success": False,
+                "error": "Invalid level. Must be one of: Basic, Moderate, Advanced"
+            }), 400
+            
         user = user_manager.get_user(user_id)
         if not user:
             return jsonify({
                 "success": False,
                 "error": "User not found"
             }), 404
-            
-        # Create a sample module
-        module_id = str(uuid.uuid4())
-        module = {
-            "id": module_id,
-            "title": "Introduction to Finance",
-            "content": "<h1>Introduction to Finance</h1><p>This module covers the basics of finance.</p>",
-            "created_at": datetime.now().isoformat(),
-            "completion_status": 0
-        }
+        
+        # Throttle users over their LLM token quota
+        over_quota = quota_exceeded_response(user_id)
+        if over_quota:
+            return over_quota
+        
+        # Segment the syllabus into learning units and create a module for each
+        ingestion = syllabus_ingestor.ingest(file.stream, file.filename, user_id=user_id)
+        modules = create_syllabus_modules(user_id, ingestion['units'], level)
         
         if not user.modules:
             user.modules = []
-            
-        user.modules.append(module)
+        
+        created_at = datetime.now().isoformat()
+        known_ids = {module.get("id") for module in user.modules}
+        for unit, module in zip(ingestion['units'], modules):
+            if module["module_id"] in known_ids:
+                continue
+            known_ids.add(module["module_id"])
+            user.modules.append({
+                "id": module["module_id"],
+                "title": unit["unit_title"],
+                "content": unit_to_html(unit),
+                "created_at": created_at,
+                "completion_status": 0
+            })
         user_manager.update_user(user)
             
         return jsonify({
             "success": True,
             "message": "Syllabus processed successfully",
-            "modules_created": 1,
+            "modules_created": sum(not module["reused"] for module in modules),
+            "modules_reused": sum(module["reused"] for module in modules),
+            "units": ingestion['units'],
             "user": user.to_dict()
         })
+    
+    except SyllabusTooLargeError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 413
+    
+    except SyllabusError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
             
     except Exception as e:
         return jsonify({
@@ -355,23 +490,75 @@ def upload_syllabus():
 @app.route('/api/process-syllabus', methods=['POST'])
 def process_syllabus():
     """
-    Process uploaded syllabus file
+    Process a syllabus uploaded as a file (multipart) or sent as text (JSON)
+    and create a module for each of its learning units
     """
     try:
-        data = request.json
+        file = request.files.get('file')
+        data = request.form if file else request.json
         
         if not data:
             return jsonify({
                 "success": False,
                 "error": "Missing request data"
             }), 400
+        
+        user_id = data.get('user_id')
+        level = data.get('level', 'Basic')
+        
+        if not user_id:
+            return jsonify({
+                "success": False,
+                "error": "Missing required parameter: user_id"
+            }), 400
+        
+        if level not in ['Basic', 'Moderate', 'Advanced']:
+            return jsonify({
+                "success": False,
+                "error": "Invalid level. Must be one of: Basic, Moderate, Advanced"
+            }), 400
+        
+        # Throttle users over their LLM token quota
+        over_quota = quota_exceeded_response(user_id)
+        if over_quota:
+            return over_quota
+        
+        # Segment the syllabus into learning units, its chunks in parallel
+        if file:
+            ingestion = syllabus_ingestor.ingest(file.stream, file.filename, user_id=user_id)
+        elif data.get('text'):
+            ingestion = syllabus_ingestor.ingest_text(data['text'], user_id=user_id)
+        else:
+            return jsonify({
+                "success": False,
+                "error": "Missing syllabus: upload a file or send its text"
+            }), 400
+        
+        modules = create_syllabus_modules(user_id, ingestion['units'], level)
             
-        # For demo purposes, return success
         return jsonify({
             "success": True,
             "message": "Syllabus processed successfully",
-            "modules_created": 1
+            "modules_created": sum(not module["reused"] for module in modules),
+            "modules_reused": sum(module["reused"] for module in modules),
+            "modules": modules,
+            "units": ingestion['units'],
+            "chunks": ingestion['chunks'],
+            "failed_chunks": ingestion['failed_chunks'],
+            "duplicate_of": ingestion.get('duplicate_of')
         })
+    
+    except SyllabusTooLargeError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 413
+    
+    except SyllabusError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
             
     except Exception as e:
         return jsonify({
@@ -379,6 +566,400 @@ def process_syllabus():
             "error": str(e)
         }), 500
 
+def build_module_prompt(topic, level):
+    """
+    Build the Gemini prompt (Prompt 1.1) for generating module content
+    """
+    return f"""
+    You are an expert financial educator. Create comprehensive educational content about {topic} at {level} level.
+    
+    Requirements:
+    - For Basic level: Focus on fundamental concepts, simple explanations, and everyday examples.
+    - For Moderate level: Include more detailed explanations, some technical terms with definitions, and practical applications.
+    - For Advanced level: Provide in-depth analysis, technical concepts, market implications, and advanced strategies.
+    
+    Format the response as clean HTML with:
+    - Clear section headings using <h1>, <h2>, <h3> tags
+    - Well-structured paragraphs using <p> tags
+    - Bullet points using <ul> and <li> tags where appropriate
+    - Bold important terms using <strong> tags
+    - Include 2-3 real-world examples
+    
+    The content should be educational, accurate, and engaging.
+    """
+
+def generate_lesson_html(topic, level, timeout=None, user_id=None, endpoint='generate_module'):
+    """
+    Generate module content (Prompt 1.1) with Gemini AI, metered for the user and endpoint
+    Returns the HTML and the estimated tokens used
+    """
+    prompt = build_module_prompt(topic, level)
+    html_content = metered_generate(prompt, user_id, endpoint, timeout=timeout)
+    return html_content, estimate_tokens(prompt) + estimate_tokens(html_content)
+
+def generate_quiz_questions(topic, level, content, user_id=None, endpoint='generate_quiz'):
+    """
+    Generate quiz questions (Prompt 1.2) for a lesson with Gemini AI, metered for the user and endpoint
+    Returns the validated questions and the prompt and response token counts
+    """
+    # Generate quiz using Gemini AI from the lesson reduced to the level's token budget
+    quiz_prompt, token_counts = prompt_builder.build_quiz_prompt(topic, level, content)
+    response_text = metered_generate(quiz_prompt, user_id, endpoint)
+    
+    # Parse the JSON response
+    token_counts["response_tokens"] = estimate_tokens(response_text)
+    
+    # Extract and validate the quiz JSON; a failure raises so the job is retried
+    # instead of storing an empty quiz
+    quiz_json = extract_quiz(response_text)
+    return quiz_json["questions"], token_counts
+
+def store_quiz(module_id, questions):
+    """
+    Store quiz questions for a module in the quizzes table and mark the module's quiz available
+    Returns the quiz ID
+    """
+    quiz_data = {
+        "id": str(uuid.uuid4()),
+        "module_id": module_id,
+        "questions": json.dumps(questions),
+        "created_at": datetime.now().isoformat()
+    }
+    
+    quiz_result = supabase_client.from_table('quizzes').insert(quiz_data)
+    
+    if quiz_result.get('error'):
+        raise RuntimeError(f"Failed to store quiz: {quiz_result.get('error')}")
+    
+    # Update module to indicate quiz is available
+    supabase_client.from_table('modules').eq('id', module_id).update({"has_quiz": True})
+    return quiz_data["id"]
+
+def generate_quiz_async(module_id, content, topic, level, cache_key=None, user_id=None):
+    """
+    Background job: generate the quiz (Prompt 1.2) for a module and store it in the quizzes table
+    """
+    # A retried job may have stored the quiz before it was interrupted
+    existing_quiz = supabase_client.from_table('quizzes').eq('module_id', module_id).select('id').execute()
+    if not existing_quiz.get('error') and existing_quiz.get('data'):
+        supabase_client.from_table('modules').eq('id', module_id).update({"has_quiz": True})
+        return {"quiz_id": existing_quiz['data'][0].get('id'), "question_count": None}
+    
+    # Reuse the quiz generated for the same cached lesson, or generate one
+    questions = module_cache.get_quiz(cache_key) if cache_key else None
+    token_counts = None
+    if questions is None:
+        questions, token_counts = generate_quiz_questions(topic, level, content, user_id=user_id)
+        if cache_key:
+            module_cache.put_quiz(cache_key, questions)
+    
+    quiz_id = store_quiz(module_id, questions)
+    
+    return {
+        "quiz_id": quiz_id,
+        "question_count": len(questions),
+        "prompt_tokens": token_counts
+    }
+
+job_manager.register('generate_quiz', generate_quiz_async)
+
+def get_module_cache_key(topic, level):
+    """
+    Get the content address of the generated module for a topic and level
+    """
+    return module_cache.make_key(topic, level, MODULE_PROMPT_VERSION, getattr(gemini_client, 'model_name', 'gemini-pro'))
+
+def store_generated_module(user_id, topic, level, html_content, cache_key):
+    """
+    Store generated module HTML in the modules table and queue quiz generation for it
+    Returns the module ID and the quiz job status
+    """
+    # Generate a unique module ID
+    module_id = str(uuid.uuid4())
+    
+    # Store the generated HTML content in the modules table
+    module_data = {
+        "id": module_id,
+        "user_id": user_id,
+        "topic": topic,
+        "level": level,
+        "content": html_content,
+        "content_key": cache_key,  # Content address of the cached HTML
+        "created_at": datetime.now().isoformat(),
+        "has_quiz": False  # Will be updated when quiz is generated
+    }
+    
+    # Insert into modules table
+    insert_result = supabase_client.from_table('modules').insert(module_data)
+    
+    if insert_result.get('error'):
+        raise RuntimeError(f"Failed to store module: {insert_result.get('error')}")
+    
+    # Synthesize the module's audio in the background before anyone presses play
+    audio_prerenderer.queue(module_id, html_content)
+    
+    # A pre-generated quiz for this lesson can be stored right away
+    cached_questions = module_cache.get_quiz(cache_key)
+    if cached_questions:
+        try:
+            store_quiz(module_id, cached_questions)
+            return {
+                "module_id": module_id,
+                "quiz_job_id": None,
+                "quiz_status": "ready"
+            }
+        except RuntimeError as e:
+            print(f"Error storing cached quiz for module {module_id}: {str(e)}")
+        
+    # Queue a background job to generate the quiz
+    quiz_job_id, quiz_status = queue_quiz_generation(module_id, html_content, topic, level, cache_key, user_id)
+    
+    return {
+        "module_id": module_id,
+        "quiz_job_id": quiz_job_id,
+        "quiz_status": quiz_status
+    }
+
+def queue_quiz_generation(module_id, html_content, topic, level, cache_key=None, user_id=None):
+    """
+    Queue a background job to generate a module's quiz
+    Returns the job ID (None if the queue stayed full) and the quiz status
+    """
+    try:
+        quiz_job_id = job_manager.submit('generate_quiz', {
+            "module_id": module_id,
+            "content": html_content,
+            "topic": topic,
+            "level": level,
+            "cache_key": cache_key,
+            "user_id": user_id
+        }, timeout=QUIZ_JOB_SUBMIT_TIMEOUT)
+        return quiz_job_id, "generating"
+    except JobQueueFullError as e:
+        print(f"Quiz generation not queued for module {module_id}: {str(e)}")
+        return None, "rejected"
+
+def create_syllabus_modules(user_id, units, level):
+    """
+    Bulk-create one module per syllabus unit, with the unit outline as its content,
+    make them available to the user and queue their quizzes
+    Units matching a module created from an earlier syllabus reuse that module and its quiz
+    Returns the modules and their quiz status
+    """
+    created_at = datetime.now().isoformat()
+    kind = f"unit:{level}"
+    modules = []
+    new_modules = []
+    for unit in units:
+        unit_fp = fingerprint(unit_text(unit))
+        match = fingerprint_index.find(kind, unit_fp)
+        if match:
+            modules.append({"id": match["payload"]["module_id"], "topic": unit["unit_title"], "reused": True})
+            continue
+        module = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "topic": unit["unit_title"],
+            "level": level,
+            "content": unit_to_html(unit),
+            "content_key": None,
+            "created_at": created_at,
+            "has_quiz": False
+        }
+        modules.append({"id": module["id"], "topic": module["topic"], "reused": False})
+        new_modules.append((module, unit_fp))
+    
+    # One insert for all new modules and one upsert for all user_modules entries
+    if new_modules:
+        insert_result = supabase_client.from_table('modules').insert([module for module, _ in new_modules])
+        
+        if insert_result.get('error'):
+            raise RuntimeError(f"Failed to store modules: {insert_result.get('error')}")
+    
+    module_ids = list(dict.fromkeys(module["id"] for module in modules))
+    supabase_client.from_table('user_modules').upsert([{
+        "user_id": user_id,
+        "module_id": module_id,
+        "status": "Available",
+        "unlocked_at": created_at
+    } for module_id in module_ids]).execute()
+    
+    quiz_jobs = {}
+    for module, unit_fp in new_modules:
+        fingerprint_index.add(kind, unit_fp, {"module_id": module["id"]})
+        quiz_jobs[module["id"]] = queue_quiz_generation(module["id"], module["content"], module["topic"], level,
+                                                         user_id=user_id)
+    
+    created = []
+    for module in modules:
+        quiz_job_id, quiz_status = quiz_jobs.get(module["id"], (None, "existing"))
+        created.append({
+            "module_id": module["id"],
+            "topic": module["topic"],
+            "reused": module["reused"],
+            "quiz_job_id": quiz_job_id,
+            "quiz_status": quiz_status
+        })
+    return created
+
+def generate_module_for_user(user_id, topic, level):
+    """
+    Generate (or reuse cached) module content for a topic and level, store it for the user
+    and queue its quiz
+    Raises TimeoutError if Gemini misses the module generation deadline
+    """
+    # Reuse cached content for this topic and level, or call Gemini AI
+    cache_key = get_module_cache_key(topic, level)
+    html_content = module_cache.get(cache_key)
+    from_cache = html_content is not None
+    
+    if not from_cache:
+        html_content, _ = generate_lesson_html(topic, level, timeout=MODULE_GENERATION_DEADLINE, user_id=user_id)
+        module_cache.put(cache_key, html_content)
+    
+    # Store the module and queue quiz generation
+    stored = store_generated_module(user_id, topic, level, html_content, cache_key)
+    stored["from_cache"] = from_cache
+    return stored
+
+# Initialize the fan-out used to generate modules for several interests at once
+module_fanout = ModuleFanOut(job_manager, generate_module_for_user)
+
+def fetch_topic_popularity():
+    """
+    List one topic per user interest and per generated module, for ranking popular topics
+    """
+    topics = []
+    interests_result = supabase_client.from_table('user_interests').select('interest').execute()
+    if interests_result.get('error'):
+        raise RuntimeError(f"Failed to read user interests: {interests_result.get('error')}")
+    topics.extend(row.get('interest') for row in interests_result.get('data', []))
+    
+    modules_result = supabase_client.from_table('modules').select('topic').execute()
+    if modules_result.get('error'):
+        raise RuntimeError(f"Failed to read modules: {modules_result.get('error')}")
+    topics.extend(row.get('topic') for row in modules_result.get('data', []))
+    return [topic for topic in topics if topic]
+
+def warm_quiz(topic, level, html_content):
+    """
+    Generate a quiz for the module warmer, returning the questions and the tokens used
+    """
+    questions, token_counts = generate_quiz_questions(topic, level, html_content, endpoint='module_warmer')
+    return questions, token_counts["prompt_tokens"] + token_counts["response_tokens"]
+
+# Schedule nightly pre-generation of popular topics at every level
+module_warmer = ModuleWarmer(
+    fetch_topics=fetch_topic_popularity,
+    generate_lesson=lambda topic, level: generate_lesson_html(topic, level, endpoint='module_warmer'),
+    generate_quiz=warm_quiz,
+    cache=module_cache,
+    make_key=get_module_cache_key
+)
+module_warmer.schedule()
+
+def prepare_module_async(topic, level):
+    """
+    Background job: make sure the lesson and quiz for a topic and level are in the module cache
+    """
+    cache_key = get_module_cache_key(topic, level)
+    html_content = module_cache.get(cache_key)
+    if html_content is None:
+        html_content, _ = generate_lesson_html(topic, level, endpoint='speculation')
+        module_cache.put(cache_key, html_content)
+    
+    if module_cache.get_quiz(cache_key) is None:
+        questions, _ = generate_quiz_questions(topic, level, html_content, endpoint='speculation')
+        module_cache.put_quiz(cache_key, questions)
+    
+    return {"cache_key": cache_key}
+
+job_manager.register('prepare_module', prepare_module_async)
+
+def load_quiz_progress(user_id, module_id):
+    """
+    Load a module's topic and level and the user's answer scores so far
+    """
+    module_result = supabase_client.from_table('modules').eq('id', module_id).select('topic,level').execute()
+    if module_result.get('error') or not module_result.get('data'):
+        raise RuntimeError(f"Failed to retrieve module: {module_result.get('error')}")
+    module = module_result['data'][0]
+    
+    answers_result = supabase_client.from_table('answers').eq('module_id', module_id).eq('user_id', user_id).select('score').execute()
+    if answers_result.get('error'):
+        raise RuntimeError(f"Failed to retrieve answers: {answers_result.get('error')}")
+    scores = [answer['score'] for answer in answers_result.get('data', []) if answer.get('score') is not None]
+    
+    return module.get('topic', ''), module.get('level', 'Basic'), scores
+
+def queue_module_preparation(topic, level):
+    """
+    Queue speculative preparation of a module, behind jobs users are waiting on
+    """
+    return job_manager.submit('prepare_module', {"topic": topic, "level": level}, priority=-1)
+
+# Prepare the next level while a user is on track to pass the current quiz
+speculator = SpeculativeGenerator(load_quiz_progress, queue_module_preparation)
+
+def unlock_module(user_id, module_id):
+    """
+    Create or update the user_modules entry that makes a module available to the user
+    """
+    supabase_client.from_table('user_modules').upsert({
+        "user_id": user_id,
+        "module_id": module_id,
+        "status": "Available",
+        "unlocked_at": datetime.now().isoformat()
+    }).execute()
+
+def unlock_next_module_async(user_id, topic, level):
+    """
+    Background job: create the next level's module for a user who passed a quiz and unlock it
+    """
+    stored = generate_module_for_user(user_id, topic, level)
+    unlock_module(user_id, stored["module_id"])
+    return stored
+
+job_manager.register('unlock_next_module', unlock_next_module_async)
+
+def grade_free_text_answer(user_id, grading_item, grading_key):
+    """
+    Grade a free-text answer with Gemini AI, batched with concurrent submissions,
+    metering the call and caching a usable evaluation
+    Raises TimeoutError if grading misses its deadline
+    """
+    grading_started = time.time()
+    try:
+        evaluation = grading_batcher.grade(grading_item)
+    except TimeoutError:
+        usage_meter.record(user_id, 'submit_answer', getattr(gemini_client, 'model_name', 'gemini-pro'),
+                           estimate_tokens(json.dumps(grading_item)), 0, (time.time() - grading_started) * 1000, error=True)
+        raise
+    
+    # One batched call grades several users' answers, so each answer is metered
+    # with the estimated tokens of its own part of the prompt and response
+    usage_meter.record(user_id, 'submit_answer', getattr(gemini_client, 'model_name', 'gemini-pro'),
+                       estimate_tokens(json.dumps(grading_item)), estimate_tokens(json.dumps(evaluation)),
+                       (time.time() - grading_started) * 1000, error=evaluation.get('fallback', False))
+    if not evaluation.get('fallback'):
+        grading_cache.put(grading_key, evaluation)
+    return evaluation
+
+def grade_answer_async(answer_id, user_id, grading_item, grading_key):
+    """
+    Background job: grade a stored answer that missed the grading deadline and record its score
+    """
+    evaluation = grade_free_text_answer(user_id, grading_item, grading_key)
+    update_result = supabase_client.from_table('answers').eq('id', answer_id).update({
+        "score": evaluation['score'],
+        "feedback": evaluation['feedback']
+    }).execute()
+    if update_result.get('error'):
+        raise RuntimeError(f"Failed to store grade: {update_result.get('error')}")
+    return {"answer_id": answer_id, "score": evaluation['score'], "feedback": evaluation['feedback']}
+
+job_manager.register('grade_answer', grade_answer_async)
+
 @app.route('/api/generate-module', methods=['POST'])
 def generate_module():
     """
@@ -417,131 +998,155 @@ def generate_module():
                 "error": "Invalid level. Must be one of: Basic, Moderate, Advanced"
             }), 400
             
-        # Step b: Call Gemini AI with prompt for content generation
-        prompt = f"""
-        You are an expert financial educator. Create comprehensive educational content about {topic} at {level} level.
+        # Throttle users over their LLM token quota
+        over_quota = quota_exceeded_response(user_id)
+        if over_quota:
+            return over_quota
         
-        Requirements:
-        - For Basic level: Focus on fundamental concepts, simple explanations, and everyday examples.
-        - For Moderate level: Include more detailed explanations, some technical terms with definitions, and practical applications.
-        - For Advanced level: Provide in-depth analysis, technical concepts, market implications, and advanced strategies.
+        # Refuse new work while the quiz generation queue is saturated
+        if not job_manager.has_capacity():
+            response = jsonify({
+                "success": False,
+                "error": "Module generation is busy, please retry shortly"
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
+            
+        # Steps b-d: Reuse cached content or call Gemini AI, store the module and queue quiz generation
+        try:
+            stored = generate_module_for_user(user_id, topic, level)
+        except TimeoutError:
+            response = jsonify({
+                "success": False,
+                "fallback": True,
+                "error": "Module generation is taking longer than expected, please retry shortly"
+            })
+            response.headers['Retry-After'] = '10'
+            return response, 503
         
-        Format the response as clean HTML with:
-        - Clear section headings using <h1>, <h2>, <h3> tags
-        - Well-structured paragraphs using <p> tags
-        - Bullet points using <ul> and <li> tags where appropriate
-        - Bold important terms using <strong> tags
-        - Include 2-3 real-world examples
+        # Return success response with module ID
+        return jsonify({
+            "success": True,
+            "message": "Module generated successfully",
+            "module_id": stored["module_id"],
+            "from_cache": stored["from_cache"],
+            "quiz_status": stored["quiz_status"],
+            "quiz_job_id": stored["quiz_job_id"]
+        })
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/generate-module/stream', methods=['POST'])
+def generate_module_stream():
+    """
+    Generate module content like /api/generate-module, streaming the HTML as Server-Sent Events
+    Events:
+    - start: generation has begun (from_cache tells whether the content is cached)
+    - chunk: the next piece of HTML ({"html": "..."})
+    - done: the module was stored ({"module_id", "quiz_status", "quiz_job_id"})
+    - error: generation or storage failed ({"error": "..."})
+    If the client disconnects, the upstream Gemini stream is cancelled and nothing is stored
+    """
+    try:
+        data = request.json
         
-        The content should be educational, accurate, and engaging.
-        """
-        content_response = gemini_client.generate_content(prompt)
+        if not data:
+            return jsonify({
+                "success": False,
+                "error": "Missing request data"
+            }), 400
+            
+        # Extract required parameters
+        user_id = data.get('user_id')
+        topic = data.get('topic')
+        level = data.get('level', 'Basic')  # Default to Basic if not specified
         
-        # Extract HTML content
-        html_content = content_response.text if hasattr(content_response, 'text') else str(content_response)
+        if not user_id or not topic:
+            return jsonify({
+                "success": False,
+                "error": "Missing required parameters: user_id and topic"
+            }), 400
+            
+        # Validate level
+        if level not in ['Basic', 'Moderate', 'Advanced']:
+            return jsonify({
+                "success": False,
+                "error": "Invalid level. Must be one of: Basic, Moderate, Advanced"
+            }), 400
+            
+        # Throttle users over their LLM token quota
+        over_quota = quota_exceeded_response(user_id)
+        if over_quota:
+            return over_quota
         
-        # Generate a unique module ID
-        module_id = str(uuid.uuid4())
+        # Refuse new work while the quiz generation queue is saturated
+        if not job_manager.has_capacity():
+            response = jsonify({
+                "success": False,
+                "error": "Module generation is busy, please retry shortly"
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
         
-        # Step c: Store the generated HTML content in the modules table
-        module_data = {
-            "id": module_id,
-            "user_id": user_id,
-            "topic": topic,
-            "level": level,
-            "content": html_content,
-            "created_at": datetime.now().isoformat(),
-            "has_quiz": False  # Will be updated when quiz is generated
-        }
+        cache_key = get_module_cache_key(topic, level)
+        cached_html = module_cache.get(cache_key)
         
-        # Insert into modules table
-        insert_result = supabase_client.from_table('modules').insert(module_data)
+        # Start the upstream stream before responding so connection errors still return JSON
+        upstream = None
+        prompt = build_module_prompt(topic, level)
+        started = time.time()
+        if cached_html is None:
+            upstream = gemini_client.generate_content(prompt, stream=True)
         
-        if insert_result.get('error'):
-            return jsonify({
-                "success": False,
-                "error": f"Failed to store module: {insert_result.get('error')}"
-            }), 500
-            
-        # Step d: Initiate asynchronous job to generate quiz
-        def generate_quiz_async(module_id, content, topic, level):
+        def sse_event(event, payload):
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        
+        def generate():
+            finished = False
             try:
-                # Generate quiz using Gemini AI
-                quiz_prompt = f"""
-                You are an expert financial educator. Create a comprehensive quiz about {topic} at {level} level based on this content:
-                
-                {content}
-                
-                Create a quiz with the following specifications:
-                1. Include 5 multiple-choice questions (MCQs) with 4 options each
-                2. Include 2 free-text questions that require short paragraph answers
-                
-                Format your response as a JSON object with this exact structure:
-                {{
-                  "questions": [
-                    {{
-                      "id": "q1",
-                      "type": "mcq",
-                      "question": "Question text here?",
-                      "options": ["Option A", "Option B", "Option C", "Option D"],
-                      "correct_answer": 0,
-                      "explanation": "Explanation of the correct answer"
-                    }},
-                    {{
-                      "id": "q2",
-                      "type": "free_text",
-                      "question": "Question text here?",
-                      "sample_answer": "A sample correct answer to help with grading",
-                      "key_points": ["Key point 1", "Key point 2", "Key point 3"]
-                    }}
-                  ]
-                }}
+                yield sse_event('start', {"topic": topic, "level": level, "from_cache": upstream is None})
                 
-                Ensure all questions are directly related to the content provided and appropriate for the {level} difficulty level.
-                """
-                quiz_response = gemini_client.generate_content(quiz_prompt)
-                
-                # Parse the JSON response
-                response_text = quiz_response.text if hasattr(quiz_response, 'text') else str(quiz_response)
-                
-                # Extract the JSON part from the response
-                import re
-                json_match = re.search(r'({.*})', response_text, re.DOTALL)
-                if json_match:
-                    quiz_json = json.loads(json_match.group(1))
+                if upstream is None:
+                    html_content = cached_html
+                    yield sse_event('chunk', {"html": html_content})
                 else:
-                    # Fallback if JSON extraction fails
-                    quiz_json = {"questions": []}
-                
-                # Store quiz in quizzes table
-                quiz_data = {
-                    "id": str(uuid.uuid4()),
-                    "module_id": module_id,
-                    "questions": json.dumps(quiz_json.get('questions', [])),
-                    "created_at": datetime.now().isoformat()
-                }
+                    parts = []
+                    for chunk in upstream:
+                        text = getattr(chunk, 'text', '')
+                        if text:
+                            parts.append(text)
+                            yield sse_event('chunk', {"html": text})
+                    html_content = ''.join(parts)
+                    usage_meter.record(user_id, 'generate_module', getattr(gemini_client, 'model_name', 'gemini-pro'),
+                                       estimate_tokens(prompt), estimate_tokens(html_content),
+                                       (time.time() - started) * 1000)
+                    module_cache.put(cache_key, html_content)
                 
-                quiz_result = supabase_client.from_table('quizzes').insert(quiz_data)
-                
-                # Update module to indicate quiz is available
-                if not quiz_result.get('error'):
-                    supabase_client.from_table('modules').eq('id', module_id).update({"has_quiz": True})
+                stored = store_generated_module(user_id, topic, level, html_content, cache_key)
+                finished = True
+                yield sse_event('done', stored)
+            except GeneratorExit:
+                # Client disconnected
+                raise
             except Exception as e:
-                print(f"Error generating quiz: {str(e)}")
-        
-        # Start asynchronous job
-        threading.Thread(
-            target=generate_quiz_async,
-            args=(module_id, html_content, topic, level)
-        ).start()
+                finished = True
+                yield sse_event('error', {"error": str(e)})
+            finally:
+                if not finished and upstream is not None:
+                    cancel_gemini_stream(upstream)
         
-        # Return success response with module ID
-        return jsonify({
-            "success": True,
-            "message": "Module generated successfully",
-            "module_id": module_id,
-            "quiz_status": "generating"
-        })
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'  # Stop nginx from buffering the event stream
+            }
+        )
             
     except Exception as e:
         return jsonify({
@@ -549,6 +1154,19 @@ def generate_module():
             "error": str(e)
         }), 500
 
+def cancel_gemini_stream(upstream):
+    """
+    Stop consuming a streamed Gemini response so the upstream request is torn down
+    """
+    for attr in ('cancel', 'close'):
+        closer = getattr(upstream, attr, None)
+        if callable(closer):
+            try:
+                closer()
+            except Exception as e:
+                print(f"Error cancelling Gemini stream: {str(e)}")
+            return
+
 @app.route('/api/submit-answer', methods=['POST'])
 def submit_answer():
     """
@@ -614,51 +1232,31 @@ def submit_answer():
         
         # Process answer based on question type
         if question_type == 'free_text':
-            # Step b: Call Gemini AI for free-text answer evaluation
-            sample_answer = current_question.get('sample_answer', '')
+            # Step b: Reuse an earlier grade for the same answer, pre-grade locally, or call
+            # Gemini AI for free-text answer evaluation, batched with concurrent submissions
             key_points = current_question.get('key_points', [])
-            
-            # Prepare prompt for Gemini AI
-            prompt = f"""
-            You are an expert financial educator evaluating a student's answer.
-            
-            Question: {current_question.get('question', '')}
-            
-            Sample Correct Answer: {sample_answer}
-            
-            Key Points That Should Be Addressed:
-            {json.dumps(key_points, indent=2)}
-            
-            Student Answer: {user_answer}
-            
-            Evaluate the student's answer and provide:
-            1. A score from 0-100 based on how well they addressed the key points
-            2. Constructive feedback explaining the score
-            
-            Format your response as a JSON object with this structure:
-            {{
-              "score": 85,
-              "feedback": "Your feedback here"
-            }}
-            """
-            
-            # Call Gemini AI for evaluation
-            evaluation_response = gemini_client.generate_content(prompt)
-            
-            # Parse the response
-            response_text = evaluation_response.text if hasattr(evaluation_response, 'text') else str(evaluation_response)
-            
-            # Extract JSON from response
-            import re
-            json_match = re.search(r'({.*})', response_text, re.DOTALL)
-            if json_match:
-                evaluation_json = json.loads(json_match.group(1))
-                score = evaluation_json.get('score', 70)  # Default to 70 if not found
-                feedback = evaluation_json.get('feedback', 'Your answer was evaluated.')
-            else:
-                # Fallback if JSON extraction fails
-                score = 70  # Default score
-                feedback = "Your answer was evaluated but we couldn't generate detailed feedback."
+            grading_key = grading_cache.make_key(quiz_data.get('id', module_id), question_id, key_points, user_answer)
+            evaluation = grading_cache.get(grading_key)
+            
+            # Settle clear passes and fails locally against the key points
+            if evaluation is None:
+                evaluation = pre_grader.grade(user_answer, key_points)
+            
+            if evaluation is None:
+                grading_item = {
+                    "question": current_question.get('question', ''),
+                    "sample_answer": current_question.get('sample_answer', ''),
+                    "key_points": key_points,
+                    "user_answer": user_answer
+                }
+                try:
+                    evaluation = grade_free_text_answer(user_id, grading_item, grading_key)
+                except TimeoutError:
+                    # Grading missed its deadline; store the answer ungraded and finish
+                    # grading it in the background instead of inventing a score
+                    evaluation = {"score": None, "feedback": GRADING_TIMEOUT_FEEDBACK}
+            score = evaluation['score']
+            feedback = evaluation['feedback']
             
         else:  # MCQ
             # Step c: Calculate MCQ correctness locally
@@ -695,6 +1293,23 @@ def submit_answer():
                 "error": f"Failed to store answer: {answer_result.get('error')}"
             }), 500
         
+        # Queue the grading of an answer that missed its deadline
+        grading_job_id = None
+        if score is None:
+            try:
+                grading_job_id = job_manager.submit('grade_answer', {
+                    "answer_id": answer_data["id"],
+                    "user_id": user_id,
+                    "grading_item": grading_item,
+                    "grading_key": grading_key
+                }, timeout=QUIZ_JOB_SUBMIT_TIMEOUT)
+            except JobQueueFullError as e:
+                print(f"Grading of answer {answer_data['id']} not queued: {str(e)}")
+        
+        # Start preparing the next level once passing this quiz looks likely
+        if not is_final_question:
+            speculator.consider(user_id, module_id, len(questions))
+        
         # Step d: If this is the final question, calculate the final percentage
         final_result = None
         passed = False
@@ -711,13 +1326,15 @@ def submit_answer():
                 }), 500
                 
             answers_data = answers_result.get('data', [])
-            all_scores = [answer.get('score', 0) for answer in answers_data]
+            # Answers still being graded do not count until they have a score
+            all_scores = [answer['score'] for answer in answers_data if answer.get('score') is not None]
+            ungraded_answers = len(answers_data) - len(all_scores)
             
-            if not all_scores:
+            if not all_scores and score is not None:
                 all_scores = [score]  # Use current score if no previous answers
             
             # Calculate final percentage
-            final_percentage = sum(all_scores) / len(all_scores)
+            final_percentage = sum(all_scores) / len(all_scores) if all_scores else 0
             
             # Step e: If score ≥80%, update user progress
             passed = final_percentage >= 80
@@ -750,43 +1367,61 @@ def submit_answer():
                         # Check if next level module exists
                         next_module_result = supabase_client.from_table('modules').eq('topic', topic).eq('level', next_level).select('id').execute()
                         
+                        next_module_id = None
                         if not next_module_result.get('error') and next_module_result.get('data'):
                             next_module_id = next_module_result.get('data', [{}])[0].get('id')
-                            
-                            if next_module_id:
-                                # Enable next level module
+                        
+                        if next_module_id:
+                            # Enable next level module
+                            unlock_module(user_id, next_module_id)
+                            next_module = {
+                                "id": next_module_id,
+                                "level": next_level,
+                                "topic": topic,
+                                "status": "Available"
+                            }
+                        else:
+                            # Create and unlock it in the background; speculative preparation
+                            # has usually cached it already, so the job is quick
+                            try:
+                                unlock_job_id = job_manager.submit('unlock_next_module', {
+                                    "user_id": user_id,
+                                    "topic": topic,
+                                    "level": next_level
+                                }, timeout=QUIZ_JOB_SUBMIT_TIMEOUT)
                                 next_module = {
-                                    "id": next_module_id,
+                                    "id": None,
                                     "level": next_level,
-                                    "topic": topic
+                                    "topic": topic,
+                                    "status": "generating",
+                                    "job_id": unlock_job_id
                                 }
-                                
-                                # Create or update user_modules entry for next level
-                                next_module_data = {
-                                    "user_id": user_id,
-                                    "module_id": next_module_id,
-                                    "status": "Available",
-                                    "unlocked_at": datetime.now().isoformat()
-                                }
-                                
-                                supabase_client.from_table('user_modules').upsert(next_module_data).execute()
+                            except JobQueueFullError as e:
+                                print(f"Error queueing {next_level} module for {topic}: {str(e)}")
             
             # Prepare final result
             final_result = {
                 "percentage": final_percentage,
                 "passed": passed,
                 "passing_threshold": 80,
-                "next_module": next_module
+                "next_module": next_module,
+                "ungraded_answers": ungraded_answers
             }
         
         # Return response
-        return jsonify({
+        response_data = {
             "success": True,
             "question_id": question_id,
             "score": score,
             "feedback": feedback,
             "final_result": final_result
-        })
+        }
+        if score is None:
+            # Accepted, but the score arrives with the grading job
+            response_data["grading_status"] = "pending" if grading_job_id else "rejected"
+            response_data["grading_job_id"] = grading_job_id
+            return jsonify(response_data), 202
+        return jsonify(response_data)
             
     except Exception as e:
         return jsonify({
@@ -900,14 +1535,24 @@ def get_module(module_id):
             "error": str(e)
         }), 500
 
+# Route Hugging Face calls to the local stub server when LLM_BACKEND=local
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+if LLM_BACKEND == "local":
+    HUGGINGFACE_MODELS_URL = os.getenv("LOCAL_BACKEND_URL", "http://127.0.0.1:8090").rstrip('/') + "/models"
+else:
+    HUGGINGFACE_MODELS_URL = os.getenv("HUGGINGFACE_MODELS_URL", "https://api-inference.huggingface.co/models")
+
 # Hugging Face TTS client for secure API integration
 class HuggingFaceTTSClient:
     def __init__(self):
         # Get API URL and key from environment variables
-        self.api_url = os.getenv("HUGGINGFACE_API_URL", "https://api-inference.huggingface.co/models/facebook/mms-tts-eng")
+        if LLM_BACKEND == "local":
+            self.api_url = f"{HUGGINGFACE_MODELS_URL}/facebook/mms-tts-eng"
+        else:
+            self.api_url = os.getenv("HUGGINGFACE_API_URL", f"{HUGGINGFACE_MODELS_URL}/facebook/mms-tts-eng")
         
-        # Ensure API key is set in environment variables
-        self.api_key = os.getenv("HUGGINGFACE_API_KEY")
+        # Ensure API key is set in environment variables (the local stub needs none)
+        self.api_key = os.getenv("HUGGINGFACE_API_KEY") or ("local" if LLM_BACKEND == "local" else None)
         if not self.api_key:
             print("WARNING: HUGGINGFACE_API_KEY environment variable not set. API calls will fail.")
             self.api_key = ""
@@ -944,34 +1589,153 @@ class HuggingFaceTTSClient:
     def convert_to_streamable(self, audio_data, format="mp3"):
         """
         Convert audio data to streamable format
+        Raises RuntimeError for TTS error indicators and the transcoder's error if the
+        conversion fails, so unconverted audio is never served or cached as the format
         """
         # Check if we received an error indicator
-        if audio_data in [b'MISSING_API_KEY', b'API_ERROR', b'CONNECTION_ERROR']:
-            return audio_data
+        if audio_data in TTS_ERROR_MESSAGES:
+            raise RuntimeError(TTS_ERROR_MESSAGES[audio_data])
             
         try:
-            # Use pydub for audio conversion if available
-            if format == "mp3":
-                # Convert to MP3 format
-                return audio_data
-            elif format == "ogg":
-                # Convert to OGG format
-                return audio_data
-            else:
-                # Default to WAV format
-                return audio_data
+            # Encode with pydub in a worker process, off the request thread
+            return audio_transcoder.transcode(audio_data, format)
         except Exception as e:
             print(f"Error converting audio: {str(e)}")
-            return audio_data
+            raise
+
+# Transcode TTS audio in worker processes
+audio_transcoder = AudioTranscoder()
 
 # Initialize Hugging Face TTS client
 huggingface_tts_client = HuggingFaceTTSClient()
 
+# Initialize the TTS audio cache, shared by all users listening to the same module
+audio_cache = get_audio_cache()
+
+TTS_ERROR_MESSAGES = {
+    b'MISSING_API_KEY': "Hugging Face API key not configured. Please set HUGGINGFACE_API_KEY environment variable.",
+    b'API_ERROR': "Error from Hugging Face API. Check server logs for details.",
+    b'CONNECTION_ERROR': "Connection error when calling Hugging Face API."
+}
+
+def synthesize_speech(text):
+    """
+    Synthesize one chunk of text with the Hugging Face TTS API, raising on API errors
+    """
+    audio_data = huggingface_tts_client.text_to_speech(text)
+    if audio_data in TTS_ERROR_MESSAGES:
+        raise RuntimeError(TTS_ERROR_MESSAGES[audio_data])
+    return audio_data
+
+# Turn module HTML into speech text, remembered per module content
+speech_text_extractor = SpeechTextExtractor()
+
+# Synthesize module text sentence by sentence, a few chunks at a time per listener
+speech_pipeline = SpeechPipeline(synthesize_speech)
+
+def get_module_audio_key(text_content, audio_format):
+    """
+    Get the audio cache key of module text spoken in a format
+    """
+    return audio_cache.make_key(text_content, huggingface_tts_client.api_url, audio_format)
+
+def get_cached_module_audio_variant(text_content, audio_format):
+    """
+    Get module audio cached in another format, preferring lossless WAV, to transcode
+    instead of synthesizing again
+    Returns the audio data, or None if no other format is cached
+    """
+    for variant in sorted(AUDIO_FORMATS, key=lambda variant: variant != 'wav'):
+        if variant == audio_format:
+            continue
+        variant_path = audio_cache.get(get_module_audio_key(text_content, variant), variant)
+        if variant_path:
+            try:
+                with open(variant_path, 'rb') as variant_file:
+                    return variant_file.read()
+            except OSError:
+                continue
+    return None
+
+def get_requested_audio_format():
+    """
+    Get the audio format for the request from ?format=, or else the Accept header
+    Returns None if an unsupported format was asked for
+    """
+    return negotiate_audio_format(request.args.get('format'), request.accept_mimetypes)
+
+def get_module_audio(text_content, audio_format, pipeline=None):
+    """
+    Get the audio file for module text from the audio cache, synthesizing it with the
+    Hugging Face TTS API on a miss (on the listeners' speech pipeline unless another is given)
+    Returns the path of the audio file (or an in-memory file if it could not be cached)
+    and its entity tag
+    """
+    cache_key = get_module_audio_key(text_content, audio_format)
+    audio_path = audio_cache.get(cache_key, audio_format)
+    if audio_path:
+        etag = audio_cache.get_etag(audio_path)
+        if etag:
+            return audio_path, etag
+    
+    # Transcode another cached variant, or call Hugging Face TTS API for the module's chunks concurrently
+    audio_data = get_cached_module_audio_variant(text_content, audio_format)
+    if audio_data is None:
+        audio_data = (pipeline or speech_pipeline).synthesize_all(text_content)
+    
+    # Convert to streamable format and keep it for later listens
+    streamable_audio = huggingface_tts_client.convert_to_streamable(audio_data, format=audio_format)
+    audio_path = audio_cache.put(cache_key, audio_format, streamable_audio)
+    
+    if audio_path is None:
+        # Serve from memory when the cache cannot store the audio, leaving nothing on disk
+        return io.BytesIO(streamable_audio), audio_etag(streamable_audio)
+    return audio_path, audio_etag(streamable_audio)
+
+def is_module_audio_cached(text_content):
+    """
+    Check whether module text has audio cached in the default format
+    """
+    return audio_cache.get(get_module_audio_key(text_content, DEFAULT_AUDIO_FORMAT), DEFAULT_AUDIO_FORMAT) is not None
+
+def prerender_module_audio(text_content):
+    """
+    Synthesize module text into the audio cache in the default format, on the pre-render pipeline
+    """
+    get_module_audio(text_content, DEFAULT_AUDIO_FORMAT, pipeline=prerender_pipeline)
+
+# Pre-render new modules' audio on its own threads, within its own concurrency limit and
+# daily budget, so it never holds a job worker or queue slot
+audio_prerenderer = AudioPrerenderer(
+    extract=speech_text_extractor.extract,
+    is_cached=is_module_audio_cached,
+    render=prerender_module_audio
+)
+# Pre-rendering synthesizes on its own workers, never on the listeners' speech pipeline
+prerender_pipeline = SpeechPipeline(synthesize_speech, max_concurrency=1, max_workers=audio_prerenderer.max_concurrency)
+
+def send_module_audio(audio_file, etag, audio_format, download_name=None):
+    """
+    Send module audio with a strong ETag, answering If-None-Match with 304 and
+    Range requests with 206 partial content
+    """
+    response = send_file(
+        audio_file,
+        mimetype=AUDIO_CONTENT_TYPES[audio_format],
+        as_attachment=download_name is not None,
+        download_name=download_name,
+        conditional=True,
+        etag=etag
+    )
+    # The format may have been chosen from the Accept header
+    response.vary.add('Accept')
+    return response
+
 # Hugging Face model inference client
 class HuggingFaceModelClient:
     def __init__(self):
-        # Get API key from environment variables
-        self.api_key = os.getenv("HUGGINGFACE_API_KEY")
+        # Get API key from environment variables (the local stub needs none)
+        self.api_key = os.getenv("HUGGINGFACE_API_KEY") or ("local" if LLM_BACKEND == "local" else None)
         if not self.api_key:
             print("WARNING: HUGGINGFACE_API_KEY environment variable not set. Model inference will fail.")
             self.api_key = ""
@@ -997,7 +1761,7 @@ class HuggingFaceModelClient:
                 return {"error": "Missing Hugging Face API key"}
                 
             # Prepare API URL
-            api_url = f"https://api-inference.huggingface.co/models/{model_id}"
+            api_url = f"{HUGGINGFACE_MODELS_URL}/{model_id}"
             
             # Prepare payload
             payload = {"inputs": inputs}
@@ -1127,58 +1891,25 @@ def text_to_speech(module_id):
             # Error occurred
             return module_response
         
-        # Extract text content from HTML (simplified for demo)
+        # Extract the spoken text from the module HTML
         module_data = module_response.json['module']
         html_content = module_data.get('content', '')
+        text_content = speech_text_extractor.extract(html_content)
         
-        # Simple HTML to text conversion (in production, use a proper HTML parser)
-        text_content = html_content.replace('<h1>', '').replace('</h1>', '. ').replace('<p>', '').replace('</p>', ' ')
+        # Get audio format from query parameters or the Accept header (default to mp3)
+        audio_format = get_requested_audio_format()
         
-        # Get audio format from query parameters (default to mp3)
-        audio_format = request.args.get('format', 'mp3')
-        
-        # Call Hugging Face TTS API
-        audio_data = huggingface_tts_client.text_to_speech(text_content)
-        
-        # Handle API errors
-        if audio_data == b'MISSING_API_KEY':
+        if audio_format is None:
             return jsonify({
                 "success": False,
-                "error": "Hugging Face API key not configured. Please set HUGGINGFACE_API_KEY environment variable."
-            }), 500
-        elif audio_data == b'API_ERROR':
-            return jsonify({
-                "success": False,
-                "error": "Error from Hugging Face API. Check server logs for details."
-            }), 500
-        elif audio_data == b'CONNECTION_ERROR':
-            return jsonify({
-                "success": False,
-                "error": "Connection error when calling Hugging Face API."
-            }), 500
-            
-        # Convert to streamable format
-        streamable_audio = huggingface_tts_client.convert_to_streamable(audio_data, format=audio_format)
-        
-        # Create a temporary file to serve
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'.{audio_format}')
-        temp_file.write(streamable_audio)
-        temp_file.close()
+                "error": f"Invalid format. Must be one of: {', '.join(AUDIO_FORMATS)}"
+            }), 400
         
-        # Set content type based on format
-        content_types = {
-            'mp3': 'audio/mpeg',
-            'ogg': 'audio/ogg',
-            'wav': 'audio/wav'
-        }
+        # Serve cached audio, or call Hugging Face TTS API and cache the result
+        audio_file, etag = get_module_audio(text_content, audio_format)
         
-        # Return the audio file
-        return send_file(
-            temp_file.name,
-            mimetype=content_types.get(audio_format, 'audio/mpeg'),
-            as_attachment=True,
-            download_name=f"module_{module_id}.{audio_format}"
-        )
+        # Return the audio file, or only the requested range of it
+        return send_module_audio(audio_file, etag, audio_format, download_name=f"module_{module_id}.{audio_format}")
             
     except Exception as e:
         return jsonify({
@@ -1216,35 +1947,81 @@ def update_interests():
                 "error": "Missing or invalid new_interests parameter"
             }), 400
         
-        # Generate modules for each new interest
-        for topic in new_interests:
-            # Call the generate_module endpoint for each new interest
-            module_data = {
-                "user_id": user_id,
-                "topic": topic,
-                "level": "Basic"  # Default to Basic level for new interests
-            }
+        # Throttle users over their LLM token quota
+        over_quota = quota_exceeded_response(user_id)
+        if over_quota:
+            return over_quota
+        
+        topics = unique_topics(new_interests)
+        if not topics:
+            return jsonify({
+                "success": False,
+                "error": "Missing or invalid new_interests parameter"
+            }), 400
+        
+        # Generate Basic level modules for all new interests as background jobs,
+        # refusing new work while the job queue is saturated
+        try:
+            if not job_manager.has_capacity(len(topics)):
+                raise JobQueueFullError("Job queue is full")
+            batch_id, rejected_topics = module_fanout.submit(user_id, topics, level="Basic")
+        except JobQueueFullError:
+            response = jsonify({
+                "success": False,
+                "error": "Module generation is busy, please retry shortly"
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        
+        # Optionally wait for every module before responding
+        if data.get('wait'):
+            batch = module_fanout.wait(batch_id, timeout=INTERESTS_WAIT_TIMEOUT)
+            return jsonify({
+                "success": batch["counts"]["failed"] == 0 and batch["status"] == "completed" and not rejected_topics,
+                "message": f"Generated {batch['counts']['completed']} of {len(topics)} modules",
+                "batch": batch,
+                "rejected_topics": rejected_topics
+            })
+        
+        batch = module_fanout.get_batch(batch_id)
+        message = f"Generating modules for {len(batch['topics'])} new interests"
+        if rejected_topics:
+            # The queue filled up partway: the queued topics still run, the rest must be retried
+            message = f"Generating modules for {len(batch['topics'])} of {len(topics)} new interests, retry the rest shortly"
+        response = jsonify({
+            "success": True,
+            "message": message,
+            "batch_id": batch_id,
+            "batch": batch,
+            "rejected_topics": rejected_topics
+        })
+        if rejected_topics:
+            response.headers['Retry-After'] = '5'
+        return response, 202
             
-            # Use the existing generate_module function
-            # We're creating a mock request object with the necessary data
-            with app.test_request_context(
-                '/api/generate-module',
-                method='POST',
-                json=module_data
-            ):
-                # Call the generate_module function directly
-                response = generate_module()
-                
-                # Check if module generation was successful
-                if isinstance(response, tuple) and response[1] != 200:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Failed to generate module for topic: {topic}"
-                    }), 500
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/update-interests/<batch_id>', methods=['GET'])
+def get_interests_batch(batch_id):
+    """
+    Get the per-topic module generation status of an update-interests batch
+    """
+    try:
+        batch = module_fanout.get_batch(batch_id)
         
+        if not batch:
+            return jsonify({
+                "success": False,
+                "error": "Batch not found"
+            }), 404
+            
         return jsonify({
             "success": True,
-            "message": f"Successfully generated modules for {len(new_interests)} new interests"
+            "batch": batch
         })
             
     except Exception as e:
@@ -1253,6 +2030,15 @@ def update_interests():
             "error": str(e)
         }), 500
 
+def cache_streamed_audio(cache_key, audio_format, source_audio):
+    """
+    Transcode the stitched WAV audio of a streamed module once and cache it
+    """
+    try:
+        audio_cache.put(cache_key, audio_format, huggingface_tts_client.convert_to_streamable(source_audio, format=audio_format))
+    except Exception as e:
+        print(f"Error caching streamed TTS audio: {str(e)}")
+
 @app.route('/api/tts-stream/<module_id>', methods=['GET'])
 def stream_tts(module_id):
     """
@@ -1266,39 +2052,65 @@ def stream_tts(module_id):
             # Error occurred
             return module_response
         
-        # Extract text content from HTML (simplified for demo)
+        # Extract the spoken text from the module HTML
         module_data = module_response.json['module']
         html_content = module_data.get('content', '')
+        text_content = speech_text_extractor.extract(html_content)
         
-        # Simple HTML to text conversion (in production, use a proper HTML parser)
-        text_content = html_content.replace('<h1>', '').replace('</h1>', '. ').replace('<p>', '').replace('</p>', ' ')
-        
-        # Get audio format from query parameters (default to mp3)
-        audio_format = request.args.get('format', 'mp3')
-        
-        # Call Hugging Face TTS API
-        audio_data = huggingface_tts_client.text_to_speech(text_content)
+        # Get audio format from query parameters or the Accept header (default to mp3)
+        audio_format = get_requested_audio_format()
         
-        # Convert to streamable format
-        streamable_audio = huggingface_tts_client.convert_to_streamable(audio_data, format=audio_format)
-        
-        # Set content type based on format
-        content_types = {
-            'mp3': 'audio/mpeg',
-            'ogg': 'audio/ogg',
-            'wav': 'audio/wav'
-        }
-        
-        # Create a generator to stream the audio data
-        def generate():
-            # In a real implementation, you would stream chunks of the audio
-            # For simplicity in this demo, we're returning the entire audio at once
-            yield streamable_audio
+        if audio_format is None:
+            return jsonify({
+                "success": False,
+                "error": f"Invalid format. Must be one of: {', '.join(AUDIO_FORMATS)}"
+            }), 400
         
-        # Return streaming response
+        cache_key = get_module_audio_key(text_content, audio_format)
+        audio_path = audio_cache.get(cache_key, audio_format)
+        etag = audio_cache.get_etag(audio_path) if audio_path else None
+        
+        if etag:
+            # Serve the cached audio file; seeking requests only the missing range
+            return send_module_audio(audio_path, etag, audio_format)
+        else:
+            # Synthesize sentence by sentence; wait for the first segment before responding
+            # so Hugging Face API errors still return JSON
+            segments = speech_pipeline.stream(text_content)
+            first_segment = next(segments, b'')
+            
+            def generate():
+                stitcher = AudioStitcher()
+                source = AudioStitcher()
+                completed = False
+                try:
+                    # Encode each segment as it arrives; MP3 frames and Ogg streams concatenate
+                    for segment in itertools.chain([first_segment], segments):
+                        encoded = huggingface_tts_client.convert_to_streamable(segment, format=audio_format)
+                        # Keep a WAV copy of every segment to stitch into the cached audio
+                        if is_wav_audio(segment):
+                            source.add(segment)
+                        else:
+                            source.add(encoded if audio_format == 'wav' else
+                                       huggingface_tts_client.convert_to_streamable(segment, format='wav'))
+                        yield stitcher.add(encoded)
+                    completed = True
+                except Exception as e:
+                    print(f"Error streaming TTS audio for module {module_id}: {str(e)}")
+                finally:
+                    # Stop synthesizing if the client disconnected
+                    segments.close()
+                    if completed:
+                        # Cache one encode of the stitched WAV rather than the streamed segments,
+                        # whose concatenation repeats MP3 headers or chains Ogg streams
+                        threading.Thread(target=cache_streamed_audio, args=(cache_key, audio_format, source.getvalue()),
+                                         name='tts-stream-cache', daemon=True).start()
+        
+        # Return streaming response; ranges are served once the audio is cached
         return Response(
             stream_with_context(generate()),
-            mimetype=content_types.get(audio_format, 'audio/mpeg')
+            mimetype=AUDIO_CONTENT_TYPES[audio_format],
+            headers={'Accept-Ranges': 'none', 'Vary': 'Accept'}
         )
             
     except Exception as e:
@@ -1307,5 +2119,67 @@ def stream_tts(module_id):
             "error": str(e)
         }), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+    Get the status of a background job
+    """
+    try:
+        job = job_manager.get_job(job_id)
+        if not job:
+            return jsonify({
+                "success": False,
+                "error": "Job not found"
+            }), 404
+            
+        return jsonify({
+            "success": True,
+            "job": job
+        })
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Report counters for the LLM call path
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "metrics": {
+                "llm_client": llm_client.get_stats(),
+                "llm_hedging": hedging_client.get_stats(),
+                "llm_coalescing": gemini_client.get_stats(),
+                "module_cache": module_cache.get_stats(),
+                "audio_cache": audio_cache.get_stats(),
+                "speech_text": speech_text_extractor.get_stats(),
+                "tts_pipeline": speech_pipeline.get_stats(),
+                "audio_prerender": audio_prerenderer.get_stats(),
+                "audio_transcoder": audio_transcoder.get_stats(),
+                "jobs": job_manager.get_stats(),
+                "module_fanout": module_fanout.get_stats(),
+                "module_warmer": module_warmer.get_stats(),
+                "speculation": speculator.get_stats(),
+                "syllabus": syllabus_ingestor.get_stats(),
+                "fingerprints": fingerprint_index.get_stats(),
+                "grading": grading_batcher.get_stats(),
+                "llm_usage": usage_meter.get_stats(),
+                "grading_cache": grading_cache.get_stats(),
+                "pre_grader": pre_grader.get_stats(),
+                "quiz_prompts": prompt_builder.get_stats()
+            }
+        })
+            
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,288 @@
+"""
+Audio Cache Module
+
+This module provides a disk-backed cache for text-to-speech audio. Audio is
+keyed by a hash of the spoken text, the voice model and the audio format,
+so every listen of a module after the first, by any user, is served from a
+local file instead of calling the TTS API again.
+
+Audio files live on local disk and are written atomically. An in-memory
+index of the files (path, size, last use) is kept in least recently used
+order; when the cache grows past its byte quota, the least recently used
+files are removed. Files written or removed by other worker processes are
+picked up on lookup.
+
+Each file also has a strong entity tag, the SHA-256 of its audio, so
+responses can be revalidated (304) and served in byte ranges (206) without
+resending audio the client already has.
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'audio')
+
+AUDIO_FORMATS = ('mp3', 'ogg', 'wav')
+
+# Number of entity tags remembered per process
+MAX_ETAGS = 4096
+
+
+def audio_etag(audio: bytes) -> str:
+    """
+    Build the strong entity tag of audio data.
+
+    Args:
+        audio: The audio data
+
+    Returns:
+        str: Hex SHA-256 digest of the audio
+    """
+    return hashlib.sha256(audio).hexdigest()
+
+
+class AudioCache:
+    """
+    Singleton class for caching synthesized audio files.
+
+    This class provides methods for looking up and storing TTS audio on
+    local disk under a byte quota with least recently used eviction.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AudioCache, cls).__new__(cls)
+            cls._instance._configure(
+                cache_dir=os.getenv('AUDIO_CACHE_DIR', DEFAULT_CACHE_DIR),
+                max_bytes=int(os.getenv('AUDIO_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+            )
+        return cls._instance
+
+    def _configure(self, cache_dir: str, max_bytes: int):
+        """
+        (Re)initialize the cache settings and rebuild the index from disk.
+
+        Args:
+            cache_dir: Directory holding the audio files
+            max_bytes: Maximum total size of the cached audio in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()  # Map of key to (path, size), least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._etags = OrderedDict()  # Map of (path, inode, size) to entity tag
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(text: str, voice: str, audio_format: str) -> str:
+        """
+        Build the content address for synthesized audio.
+
+        Args:
+            text: The text that is spoken
+            voice: Identifier of the voice model
+            audio_format: The audio format (mp3/ogg/wav)
+
+        Returns:
+            str: Hex SHA-256 digest identifying the audio
+        """
+        parts = [' '.join((text or '').split()), str(voice), (audio_format or '').lower()]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path_for(self, key: str, audio_format: str) -> str:
+        """Get the disk path for a cache key."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{audio_format}")
+
+    def _load_index(self):
+        """Index the audio files on disk, least recently used first."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                key, _, extension = name.partition('.')
+                if extension not in AUDIO_FORMATS:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, key, path, stat.st_size))
+
+        for _, key, path, size in sorted(entries):
+            self._index[key] = (path, size)
+            self._total_bytes += size
+
+    def get(self, key: str, audio_format: str) -> Optional[str]:
+        """
+        Look up cached audio.
+
+        Args:
+            key: The cache key from make_key()
+            audio_format: The audio format the key was built for
+
+        Returns:
+            Optional[str]: Path of the cached audio file, or None on a miss
+        """
+        path = self._path_for(key, audio_format)
+        try:
+            size = os.stat(path).st_size
+            # Record the use on disk so recency survives restarts and is shared between workers
+            os.utime(path)
+        except OSError:
+            size = None
+
+        with self._lock:
+            if size is None:
+                self._forget(key)
+                self._stats['misses'] += 1
+                return None
+            if key not in self._index:
+                # Written by another worker process
+                self._index[key] = (path, size)
+                self._total_bytes += size
+            self._index.move_to_end(key)
+            self._stats['hits'] += 1
+        return path
+
+    def put(self, key: str, audio_format: str, audio: bytes) -> Optional[str]:
+        """
+        Store audio on disk.
+
+        Args:
+            key: The cache key from make_key()
+            audio_format: The audio format the key was built for
+            audio: The audio data
+
+        Returns:
+            Optional[str]: Path of the stored audio file, or None if it could not be stored
+        """
+        if not audio or len(audio) > self.max_bytes:
+            return None
+
+        path = self._path_for(key, audio_format)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see partial audio
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+            stat = os.stat(path)
+        except OSError as e:
+            print(f"Error writing audio cache entry: {str(e)}")
+            return None
+
+        with self._lock:
+            self._remember_etag((path, stat.st_ino, stat.st_size), audio_etag(audio))
+            self._forget(key)
+            self._index[key] = (path, len(audio))
+            self._total_bytes += len(audio)
+            self._stats['stores'] += 1
+
+        self.evict()
+        return path
+
+    def get_etag(self, path: str) -> Optional[str]:
+        """
+        Get the strong entity tag of a cached audio file.
+
+        Tags of files written by this process are known; others are hashed
+        once and remembered until the file is replaced.
+
+        Args:
+            path: Path of the audio file from get() or put()
+
+        Returns:
+            Optional[str]: The entity tag, or None if the file is gone
+        """
+        try:
+            stat = os.stat(path)
+            identity = (path, stat.st_ino, stat.st_size)
+            with self._lock:
+                etag = self._etags.get(identity)
+            if etag is not None:
+                return etag
+
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+        except OSError:
+            return None
+
+        etag = digest.hexdigest()
+        with self._lock:
+            self._remember_etag(identity, etag)
+        return etag
+
+    def _remember_etag(self, identity: tuple, etag: str):
+        """Remember a file's entity tag. Caller holds the lock."""
+        self._etags[identity] = etag
+        self._etags.move_to_end(identity)
+        while len(self._etags) > MAX_ETAGS:
+            self._etags.popitem(last=False)
+
+    def _forget(self, key: str):
+        """Drop a key from the index. Caller holds the lock."""
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def evict(self) -> int:
+        """
+        Remove least recently used audio until the cache is under its byte quota.
+
+        Returns:
+            int: Number of files removed
+        """
+        removed = 0
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._index:
+                    break
+                key, (path, size) = self._index.popitem(last=False)
+                self._total_bytes -= size
+                self._stats['evictions'] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            removed += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Counters, number of cached files and their total size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._index)
+            stats['bytes'] = self._total_bytes
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+
+# Create a singleton instance
+audio_cache = AudioCache()
+
+def get_audio_cache() -> AudioCache:
+    """
+    Get the AudioCache singleton instance.
+
+    Returns:
+        AudioCache: The AudioCache singleton instance
+    """
+    return audio_cache
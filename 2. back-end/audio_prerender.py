@@ -0,0 +1,187 @@
+"""
+Audio Prerender Module
+
+This module provides background pre-rendering of module audio. When a
+module is created, its speech is queued for synthesis, transcoding to the
+default format and storage in the audio cache, so the first listener is
+served from disk instead of waiting for the TTS API.
+
+Pre-rendering runs on its own small thread pool rather than the shared job
+workers, so it never takes a worker or queue slot from quiz and module
+generation: at most a few renders run at a time, further modules wait in
+a bounded backlog (and are dropped once it is full), and a daily character
+budget caps how much text is sent to the TTS API. All limits are per
+worker process; a render lost to a restart is simply synthesized on the
+first listen instead.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable
+
+
+class AudioPrerenderer:
+    """
+    Queues and runs module audio pre-rendering within a concurrency limit and daily budget.
+
+    extract(html) returns a module's speech text, is_cached(text) tells
+    whether its audio is already cached and render(text) synthesizes and
+    stores the audio.
+    """
+
+    def __init__(self, extract: Callable[[str], str], is_cached: Callable[[str], bool],
+                 render: Callable[[str], Any], enabled: bool = None, max_concurrency: int = None,
+                 max_pending: int = None, daily_char_budget: int = None,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the prerenderer.
+
+        Args:
+            extract: Converts module HTML into speech text
+            is_cached: Checks whether audio for speech text is cached
+            render: Synthesizes speech text and stores its audio
+            enabled: Whether pre-rendering is active
+            max_concurrency: Renders running at the same time
+            max_pending: Modules waiting for a render slot before new ones are dropped
+            daily_char_budget: Characters of speech text rendered per day
+            clock: Time source, replaceable in tests
+        """
+        self.extract = extract
+        self.is_cached = is_cached
+        self.render = render
+        self.enabled = enabled if enabled is not None else \
+            os.getenv('TTS_PRERENDER_ENABLED', 'True').lower() in ('true', '1', 't')
+        self.max_concurrency = max_concurrency or int(os.getenv('TTS_PRERENDER_CONCURRENCY', 1))
+        self.max_pending = max_pending or int(os.getenv('TTS_PRERENDER_MAX_PENDING', 100))
+        self.daily_char_budget = daily_char_budget if daily_char_budget is not None else \
+            int(os.getenv('TTS_PRERENDER_DAILY_CHARS', 200000))
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='audio-prerender')
+        self._lock = threading.Lock()
+        self._pending = 0  # Queued renders not finished yet, including running ones
+        self._day = None
+        self._chars_today = 0
+        self._stats = {'queued': 0, 'dropped': 0, 'rendered': 0, 'already_cached': 0,
+                       'over_budget': 0, 'errors': 0, 'chars_rendered': 0}
+
+    def _roll_day(self):
+        """Reset the daily budget when the day changes. Caller holds the lock."""
+        today = datetime.fromtimestamp(self.clock()).date()
+        if today != self._day:
+            self._day = today
+            self._chars_today = 0
+
+    def _reserve(self, chars: int) -> bool:
+        """Take characters from today's budget, if they fit."""
+        with self._lock:
+            self._roll_day()
+            if self._chars_today + chars > self.daily_char_budget:
+                self._stats['over_budget'] += 1
+                return False
+            self._chars_today += chars
+            return True
+
+    def queue(self, module_id: str, html_content: str) -> bool:
+        """
+        Queue pre-rendering of a new module's audio.
+
+        Never raises: pre-rendering must not break module creation.
+
+        Args:
+            module_id: The module
+            html_content: The module's HTML
+
+        Returns:
+            bool: True if the module was queued
+        """
+        if not self.enabled or not html_content:
+            return False
+        with self._lock:
+            self._roll_day()
+            if self._chars_today >= self.daily_char_budget:
+                self._stats['over_budget'] += 1
+                return False
+            if self._pending >= self.max_pending + self.max_concurrency:
+                self._stats['dropped'] += 1
+                return False
+            self._pending += 1
+            self._stats['queued'] += 1
+
+        try:
+            self._executor.submit(self._run_queued, module_id, html_content)
+        except Exception as e:
+            print(f"Audio pre-render not queued for module {module_id}: {str(e)}")
+            with self._lock:
+                self._pending -= 1
+            return False
+        return True
+
+    def _run_queued(self, module_id: str, html_content: str):
+        """Run a queued render once a slot frees up."""
+        try:
+            self.run(module_id, html_content)
+        except Exception as e:
+            print(f"Error pre-rendering audio for module {module_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def run(self, module_id: str, html_content: str) -> Dict[str, Any]:
+        """
+        Pre-render a module's audio.
+
+        Args:
+            module_id: The module
+            html_content: The module's HTML
+
+        Returns:
+            Dict[str, Any]: The outcome: rendered, already_cached or over_budget
+        """
+        text = self.extract(html_content)
+        if not text or self.is_cached(text):
+            with self._lock:
+                self._stats['already_cached'] += 1
+            return {"module_id": module_id, "status": "already_cached"}
+
+        if not self._reserve(len(text)):
+            return {"module_id": module_id, "status": "over_budget"}
+        try:
+            self.render(text)
+        except Exception:
+            with self._lock:
+                self._chars_today -= len(text)
+                self._stats['errors'] += 1
+            raise
+
+        with self._lock:
+            self._stats['rendered'] += 1
+            self._stats['chars_rendered'] += len(text)
+        return {"module_id": module_id, "status": "rendered", "chars": len(text)}
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop the render threads.
+
+        Args:
+            wait: Whether to finish the queued renders first
+        """
+        self._executor.shutdown(wait=wait)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pre-rendering counters.
+
+        Returns:
+            Dict[str, Any]: Outcomes, renders pending, characters rendered and today's remaining budget
+        """
+        with self._lock:
+            self._roll_day()
+            stats = dict(self._stats)
+            stats['pending'] = self._pending
+            stats['budget_remaining_today'] = max(self.daily_char_budget - self._chars_today, 0)
+        stats['enabled'] = self.enabled
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
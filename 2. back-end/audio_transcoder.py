@@ -0,0 +1,220 @@
+"""
+Audio Transcoder Module
+
+This module provides audio format conversion for text-to-speech audio.
+Synthesized speech is decoded with pydub (ffmpeg), normalized to a common
+loudness, downmixed to mono and encoded as MP3, Ogg Opus or WAV at a bitrate
+suited to speech.
+
+Transcoding is CPU-bound, so it runs in a pool of worker processes instead
+of on request threads. The workers are started with forkserver (or spawn
+where that is unavailable) rather than fork, since the web process is
+multi-threaded and a forked child could inherit locks held by other
+threads. The format sent to a client is negotiated from an
+explicit format parameter or the Accept header.
+"""
+
+import io
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, Optional
+
+AUDIO_CONTENT_TYPES = {
+    'mp3': 'audio/mpeg',
+    'ogg': 'audio/ogg',
+    'wav': 'audio/wav'
+}
+
+# Media types clients may ask for, mapped to formats, in order of preference
+ACCEPTED_AUDIO_TYPES = {
+    'audio/mpeg': 'mp3',
+    'audio/mp3': 'mp3',
+    'audio/ogg': 'ogg',
+    'audio/opus': 'ogg',
+    'audio/wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/x-wav': 'wav'
+}
+
+DEFAULT_AUDIO_FORMAT = 'mp3'
+
+# Start method of the worker processes
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Encoder settings per format, as pydub export arguments
+ENCODERS = {
+    'mp3': {'format': 'mp3', 'codec': None},
+    'ogg': {'format': 'ogg', 'codec': 'libopus'},
+    'wav': {'format': 'wav', 'codec': None}
+}
+
+
+def transcode_audio(audio: bytes, audio_format: str, bitrate: Optional[str], target_dbfs: float) -> bytes:
+    """
+    Convert audio to a format, normalizing its loudness.
+
+    Runs in a worker process, so it only takes and returns plain values.
+
+    Args:
+        audio: The audio data in any format ffmpeg can decode
+        audio_format: The format to encode (mp3/ogg/wav)
+        bitrate: Encoder bitrate such as '64k' (ignored for wav)
+        target_dbfs: Average loudness to normalize to, in dBFS
+
+    Returns:
+        bytes: The encoded audio
+    """
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(audio)).set_channels(1)
+    # Silence has no loudness to normalize
+    if segment.dBFS != float('-inf'):
+        segment = segment.apply_gain(target_dbfs - segment.dBFS)
+
+    encoder = ENCODERS[audio_format]
+    output = io.BytesIO()
+    segment.export(
+        output,
+        format=encoder['format'],
+        codec=encoder['codec'],
+        bitrate=bitrate if audio_format != 'wav' else None
+    )
+    return output.getvalue()
+
+
+def negotiate_audio_format(requested: Optional[str], accept: Any = None) -> Optional[str]:
+    """
+    Pick the audio format to send.
+
+    An explicit format wins. Otherwise the best match in the Accept header is
+    used, falling back to the default format.
+
+    Args:
+        requested: The format asked for explicitly, if any
+        accept: The request's parsed Accept header (a werkzeug MIMEAccept), if any
+
+    Returns:
+        Optional[str]: The format, or None if the requested format is not supported
+    """
+    if requested:
+        requested = requested.lower()
+        return requested if requested in AUDIO_CONTENT_TYPES else None
+
+    if accept:
+        best = accept.best_match(list(ACCEPTED_AUDIO_TYPES))
+        if best:
+            return ACCEPTED_AUDIO_TYPES[best]
+    return DEFAULT_AUDIO_FORMAT
+
+
+class AudioTranscoder:
+    """
+    Transcodes audio in a pool of worker processes.
+
+    The convert function is called as convert(audio, audio_format, bitrate,
+    target_dbfs) in a worker process and must be picklable (a module-level
+    function).
+    """
+
+    def __init__(self, max_workers: int = None, bitrates: Dict[str, str] = None,
+                 target_dbfs: float = None, timeout: float = None,
+                 convert: Callable[[bytes, str, Optional[str], float], bytes] = transcode_audio):
+        """
+        Initialize the transcoder.
+
+        Args:
+            max_workers: Worker processes in the pool
+            bitrates: Encoder bitrate per format
+            target_dbfs: Average loudness to normalize to, in dBFS
+            timeout: Seconds to wait for one conversion
+            convert: Converts audio in a worker process
+        """
+        self.max_workers = max_workers or int(os.getenv('TTS_TRANSCODE_WORKERS', 2))
+        self.bitrates = bitrates or {
+            'mp3': os.getenv('TTS_MP3_BITRATE', '64k'),
+            'ogg': os.getenv('TTS_OGG_BITRATE', '32k')
+        }
+        self.target_dbfs = target_dbfs if target_dbfs is not None else float(os.getenv('TTS_TARGET_DBFS', -20))
+        self.timeout = timeout or float(os.getenv('TTS_TRANSCODE_TIMEOUT', 60))
+        self.convert = convert
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {'transcoded': 0, 'failures': 0, 'bytes_in': 0, 'bytes_out': 0, 'pool_restarts': 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, starting it on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(START_METHOD))
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Replace a pool whose worker process died."""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._stats['pool_restarts'] += 1
+        broken.shutdown(wait=False)
+
+    def transcode(self, audio: bytes, audio_format: str) -> bytes:
+        """
+        Convert audio to a format in a worker process.
+
+        Args:
+            audio: The audio data
+            audio_format: The format to encode (mp3/ogg/wav)
+
+        Returns:
+            bytes: The encoded audio
+
+        Raises:
+            ValueError: If the format is not supported
+            Exception: If the conversion fails or times out
+        """
+        if audio_format not in AUDIO_CONTENT_TYPES:
+            raise ValueError(f"Unsupported audio format: {audio_format}")
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(self.convert, audio, audio_format,
+                                     self.bitrates.get(audio_format), self.target_dbfs)
+            encoded = future.result(timeout=self.timeout)
+        except BrokenProcessPool:
+            self._restart(executor)
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+
+        with self._lock:
+            self._stats['transcoded'] += 1
+            self._stats['bytes_in'] += len(audio)
+            self._stats['bytes_out'] += len(encoded)
+        return encoded
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get transcoding counters.
+
+        Returns:
+            Dict[str, Any]: Conversions, failures, bytes in and out and the compression ratio
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['compression_ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else 0.0
+        stats['workers'] = self.max_workers
+        return stats
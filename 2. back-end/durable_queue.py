@@ -0,0 +1,407 @@
+"""
+Durable Queue Module
+
+This module provides a persistent, restart-safe job queue backed by a local
+SQLite database in WAL mode. Any process on the machine can enqueue jobs or
+drain them, so work survives worker restarts and recycling.
+
+Jobs are leased rather than popped: a leased job becomes visible again once
+its visibility timeout passes without the worker completing it. Failed jobs
+are retried with jittered exponential backoff and moved to a dead-letter
+table once they run out of attempts.
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, List
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'jobs.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    group_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority, available_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class DurableQueue:
+    """
+    SQLite-backed job queue with leases, retries and a dead-letter table.
+
+    Each thread gets its own connection; SQLite's locking makes the queue
+    safe to share between threads and processes.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, visibility_timeout: float = 300,
+                 max_attempts: int = 5, backoff_base: float = 2, backoff_max: float = 300):
+        """
+        Initialize the queue and create its tables if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+            visibility_timeout: Seconds a lease lasts before the job is handed out again
+            max_attempts: Default number of attempts before a job is dead-lettered
+            backoff_base: Base delay in seconds for retry backoff
+            backoff_max: Maximum retry delay in seconds
+        """
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        # Databases created before jobs could be grouped lack the group column
+        columns = [row['name'] for row in conn.execute("PRAGMA table_info(jobs)").fetchall()]
+        if 'group_id' not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN group_id TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_group ON jobs (group_id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], priority: int = 0,
+                max_attempts: Optional[int] = None, delay: float = 0, group_id: Optional[str] = None) -> str:
+        """
+        Add a job to the queue.
+
+        Args:
+            kind: The job kind used to pick a handler
+            payload: JSON-serializable job arguments
+            priority: Higher priority jobs are leased first
+            max_attempts: Attempts before dead-lettering (defaults to the queue setting)
+            delay: Seconds before the job becomes available
+            group_id: Optional ID shared by related jobs, for looking them up together
+
+        Returns:
+            str: The job ID
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO jobs (id, kind, payload, status, priority, attempts, max_attempts, "
+            "available_at, created_at, updated_at, group_id) VALUES (?, ?, ?, 'queued', ?, 0, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), priority, max_attempts or self.max_attempts,
+             now + delay, now, now, group_id)
+        )
+        return job_id
+
+    def lease(self, owner: str, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the next available job.
+
+        A job is available when it is queued and due, or when a previous lease
+        on it has expired (its worker died or stalled).
+
+        Args:
+            owner: Identifier of the leasing worker
+            kinds: Only lease jobs of these kinds (all kinds if None)
+
+        Returns:
+            Optional[Dict[str, Any]]: The leased job with its decoded payload, or None
+        """
+        conn = self._connection()
+        now = time.time()
+        kind_filter = ''
+        params = [now, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE ((status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'leased' AND lease_expires_at <= ?))" + kind_filter +
+                    " ORDER BY priority DESC, available_at LIMIT 1",
+                    params
+                ).fetchone()
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+
+                # A job whose lease keeps expiring has used up its attempts
+                if row['status'] == 'leased' and row['attempts'] >= row['max_attempts']:
+                    self._dead_letter(conn, row, row['last_error'] or 'Lease expired')
+                    continue
+
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                    "lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    (owner, now + self.visibility_timeout, now, row['id'])
+                )
+                conn.execute('COMMIT')
+                job = dict(row)
+                job['attempts'] += 1
+                job['payload'] = json.loads(job['payload'])
+                return job
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def extend_lease(self, job_id: str, owner: str) -> bool:
+        """
+        Push back the lease expiry of a long-running job.
+
+        Args:
+            job_id: The leased job
+            owner: The worker holding the lease
+
+        Returns:
+            bool: True if the lease is still held by owner and was extended
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + self.visibility_timeout, now, job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, owner: str, result: Any = None) -> bool:
+        """
+        Mark a leased job as completed.
+
+        Args:
+            job_id: The leased job
+            owner: The worker holding the lease
+            result: JSON-serializable job result
+
+        Returns:
+            bool: True if the job was completed, False if the lease was lost
+        """
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'completed', result = ?, lease_owner = NULL, "
+            "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps(result), time.time(), job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, owner: str, error: str) -> str:
+        """
+        Record a failed attempt, scheduling a retry or dead-lettering the job.
+
+        Args:
+            job_id: The leased job
+            owner: The worker holding the lease
+            error: Description of the failure
+
+        Returns:
+            str: The job's new status ("queued", "dead" or "lost" if the lease was not held)
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (job_id, owner)
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return 'lost'
+
+            if row['attempts'] >= row['max_attempts']:
+                self._dead_letter(conn, row, error)
+                conn.execute('COMMIT')
+                return 'dead'
+
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', available_at = ?, last_error = ?, lease_owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                (now + self.retry_delay(row['attempts']), error, now, job_id)
+            )
+            conn.execute('COMMIT')
+            return 'queued'
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def release(self, job_id: str, owner: str, delay: float) -> bool:
+        """
+        Put a leased job back in the queue without counting the attempt.
+
+        Used when a job cannot run yet rather than failing, e.g. because its
+        user already has as many jobs running as allowed.
+
+        Args:
+            job_id: The leased job
+            owner: The worker holding the lease
+            delay: Seconds before the job becomes available again
+
+        Returns:
+            bool: True if the job was released, False if the lease was lost
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE jobs SET status = 'queued', attempts = attempts - 1, available_at = ?, lease_owner = NULL, "
+            "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + delay, now, job_id, owner)
+        )
+        return cursor.rowcount == 1
+
+    def retry_delay(self, attempts: int) -> float:
+        """
+        Get the backoff delay before the next attempt.
+
+        Args:
+            attempts: Number of attempts made so far
+
+        Returns:
+            float: Delay in seconds with full jitter
+        """
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** max(attempts - 1, 0)))
+        return random.uniform(ceiling / 2, ceiling)
+
+    def _dead_letter(self, conn: sqlite3.Connection, row: sqlite3.Row, error: str):
+        """Copy a job into the dead-letter table and mark it dead. Caller holds the transaction."""
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO dead_letters (id, kind, payload, attempts, last_error, created_at, failed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (row['id'], row['kind'], row['payload'], row['attempts'], error, row['created_at'], now)
+        )
+        conn.execute(
+            "UPDATE jobs SET status = 'dead', last_error = ?, lease_owner = NULL, lease_expires_at = NULL, "
+            "updated_at = ? WHERE id = ?",
+            (error, now, row['id'])
+        )
+
+    def _decode(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Turn a job row into a dict with its payload and result decoded."""
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a job by ID.
+
+        Args:
+            job_id: The job ID
+
+        Returns:
+            Optional[Dict[str, Any]]: The job row with decoded payload and result, or None
+        """
+        row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def get_group(self, group_id: str) -> List[Dict[str, Any]]:
+        """
+        Get every job sharing a group ID, in the order they were enqueued.
+
+        Args:
+            group_id: The group ID given to enqueue()
+
+        Returns:
+            List[Dict[str, Any]]: The job rows with decoded payloads and results
+        """
+        rows = self._connection().execute(
+            "SELECT * FROM jobs WHERE group_id = ? ORDER BY created_at, rowid", (group_id,)
+        ).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def count_running(self, kind: str, field: str, value: Any) -> int:
+        """
+        Count jobs of a kind that hold a live lease and whose payload has a field value.
+
+        Args:
+            kind: The job kind
+            field: Top-level payload field, e.g. "user_id"
+            value: The value to match
+
+        Returns:
+            int: Number of matching running jobs across all workers
+        """
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE kind = ? AND status = 'leased' AND lease_expires_at > ? "
+            "AND json_extract(payload, ?) = ?",
+            (kind, time.time(), f'$.{field}', value)
+        ).fetchone()
+        return row[0]
+
+    def count_pending(self) -> int:
+        """
+        Count jobs that are queued or leased.
+
+        Returns:
+            int: Number of unfinished jobs
+        """
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')"
+        ).fetchone()
+        return row[0]
+
+    def purge_finished(self, older_than_seconds: float) -> int:
+        """
+        Delete completed and dead jobs that finished long enough ago.
+
+        Dead-lettered copies are kept in the dead_letters table.
+
+        Args:
+            older_than_seconds: Minimum age of the rows to delete
+
+        Returns:
+            int: Number of rows deleted
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'dead') AND updated_at < ?",
+            (time.time() - older_than_seconds,)
+        )
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get job counts by status.
+
+        Returns:
+            Dict[str, Any]: Count per status plus the dead-letter table size
+        """
+        conn = self._connection()
+        stats = {status: count for status, count in
+                 conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()}
+        stats['dead_letters'] = conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return stats
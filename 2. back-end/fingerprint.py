@@ -0,0 +1,300 @@
+"""
+Fingerprint Module
+
+This module provides content fingerprints used to deduplicate syllabi and
+the learning units derived from them. A fingerprint combines a hash of the
+normalized text, which catches exact re-uploads, with a MinHash signature of
+the text's word shingles, which estimates the Jaccard similarity of near
+duplicates such as next semester's copy of the same syllabus.
+
+Fingerprints are kept in a local SQLite index shared by every worker process
+on the machine. Candidates are found through locality-sensitive hashing
+bands of the signature, so a lookup only compares the few entries that share
+a band instead of scanning the whole index.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import zlib
+import random
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Any, Optional, List, Set
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fingerprints.db')
+
+# Words per shingle
+SHINGLE_SIZE = 3
+
+# Signature length and its split into LSH bands (NUM_PERM = BANDS * rows per band)
+NUM_PERM = 64
+BANDS = 16
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures are comparable across processes and restarts
+_rng = random.Random(20240917)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_hash ON fingerprints (kind, content_hash);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_age ON fingerprints (kind, created_at);
+CREATE TABLE IF NOT EXISTS fingerprint_bands (
+    kind TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    fingerprint_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_bands ON fingerprint_bands (kind, band, bucket);
+CREATE INDEX IF NOT EXISTS idx_fingerprint_bands_id ON fingerprint_bands (fingerprint_id);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so formatting differences do not change its fingerprint.
+
+    Args:
+        text: Any text
+
+    Returns:
+        str: Lower-cased words separated by single spaces
+    """
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or '').lower()).split())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[int]:
+    """
+    Get the hashed word shingles of a text.
+
+    Args:
+        text: Any text
+        size: Words per shingle
+
+    Returns:
+        Set[int]: 32-bit hashes of every run of size consecutive words
+    """
+    words = normalize_text(text).split()
+    if not words:
+        return set()
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))}
+    return {zlib.crc32(' '.join(words[i:i + size]).encode('utf-8')) for i in range(len(words) - size + 1)}
+
+
+def minhash(shingle_set: Set[int]) -> List[int]:
+    """
+    Compute the MinHash signature of a shingle set.
+
+    Args:
+        shingle_set: Hashed shingles
+
+    Returns:
+        List[int]: NUM_PERM minimum hash values
+    """
+    if not shingle_set:
+        return [MAX_HASH] * NUM_PERM
+    return [min(((a * x + b) % MERSENNE_PRIME) & MAX_HASH for x in shingle_set) for a, b in PERMUTATIONS]
+
+
+def similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """
+    Estimate the Jaccard similarity of two texts from their signatures.
+
+    Args:
+        signature_a: MinHash signature of the first text
+        signature_b: MinHash signature of the second text
+
+    Returns:
+        float: Share of matching signature positions (0-1)
+    """
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / NUM_PERM
+
+
+def fingerprint(text: str) -> Dict[str, Any]:
+    """
+    Fingerprint a text.
+
+    Args:
+        text: Any text
+
+    Returns:
+        Dict[str, Any]: The normalized text hash and MinHash signature
+    """
+    return {
+        'hash': hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest(),
+        'signature': minhash(shingles(text))
+    }
+
+
+def _band_buckets(signature: List[int]) -> List[str]:
+    """Hash each band of a signature into an LSH bucket."""
+    rows = NUM_PERM // BANDS
+    return [hashlib.blake2b(','.join(map(str, signature[band * rows:(band + 1) * rows])).encode('utf-8'),
+                            digest_size=8).hexdigest() for band in range(BANDS)]
+
+
+class FingerprintIndex:
+    """
+    SQLite-backed index of fingerprinted content and what was derived from it.
+
+    Entries are grouped by kind (e.g. "syllabus") and carry a JSON payload
+    holding the derived result to reuse. Index errors are logged and treated
+    as misses, so deduplication never fails the request using it.
+    """
+
+    def __init__(self, db_path: str = None, threshold: float = None, max_entries: int = None):
+        """
+        Initialize the index and create its tables if needed.
+
+        Args:
+            db_path: Path of the SQLite database file
+            threshold: Minimum estimated similarity for a near-duplicate match
+            max_entries: Maximum entries kept per kind, oldest dropped first
+        """
+        self.db_path = db_path or os.getenv('FINGERPRINT_DB_PATH', DEFAULT_DB_PATH)
+        self.threshold = threshold if threshold is not None else \
+            float(os.getenv('FINGERPRINT_SIMILARITY_THRESHOLD', 0.8))
+        self.max_entries = max_entries or int(os.getenv('FINGERPRINT_MAX_ENTRIES', 50000))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'added': 0, 'errors': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def find(self, kind: str, fp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Find an exact or near-duplicate entry for a fingerprint.
+
+        Args:
+            kind: The kind of content
+            fp: The fingerprint from fingerprint()
+
+        Returns:
+            Optional[Dict[str, Any]]: The matching entry's ID, payload and similarity, or None
+        """
+        self._count('lookups')
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT id, payload FROM fingerprints WHERE kind = ? AND content_hash = ? "
+                "ORDER BY created_at DESC LIMIT 1", (kind, fp['hash'])
+            ).fetchone()
+            if row:
+                self._count('exact_hits')
+                return {'id': row['id'], 'payload': json.loads(row['payload']), 'similarity': 1.0}
+
+            buckets = _band_buckets(fp['signature'])
+            conditions = ' OR '.join(['(band = ? AND bucket = ?)'] * BANDS)
+            params = [kind] + [value for band, bucket in enumerate(buckets) for value in (band, bucket)]
+            candidates = conn.execute(
+                f"SELECT f.id, f.signature, f.payload FROM fingerprints f WHERE f.id IN ("
+                f"SELECT DISTINCT fingerprint_id FROM fingerprint_bands WHERE kind = ? AND ({conditions}))",
+                params
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error looking up fingerprint: {str(e)}")
+            self._count('errors')
+            return None
+
+        best = None
+        for candidate in candidates:
+            score = similarity(fp['signature'], json.loads(candidate['signature']))
+            if score >= self.threshold and (best is None or score > best['similarity']):
+                best = {'id': candidate['id'], 'payload': json.loads(candidate['payload']), 'similarity': score}
+
+        self._count('similar_hits' if best else 'misses')
+        return best
+
+    def add(self, kind: str, fp: Dict[str, Any], payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Add a fingerprinted entry to the index.
+
+        Args:
+            kind: The kind of content
+            fp: The fingerprint from fingerprint()
+            payload: JSON-serializable result derived from the content
+
+        Returns:
+            Optional[str]: The entry ID, or None if it could not be stored
+        """
+        entry_id = str(uuid.uuid4())
+        conn = self._connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(
+                "INSERT INTO fingerprints (id, kind, content_hash, signature, payload, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry_id, kind, fp['hash'], json.dumps(fp['signature']), json.dumps(payload), time.time())
+            )
+            conn.executemany(
+                "INSERT INTO fingerprint_bands (kind, band, bucket, fingerprint_id) VALUES (?, ?, ?, ?)",
+                [(kind, band, bucket, entry_id) for band, bucket in enumerate(_band_buckets(fp['signature']))]
+            )
+            self._prune(conn, kind)
+            conn.execute('COMMIT')
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            print(f"Error storing fingerprint: {str(e)}")
+            self._count('errors')
+            return None
+
+        self._count('added')
+        return entry_id
+
+    def _prune(self, conn: sqlite3.Connection, kind: str):
+        """Drop the oldest entries of a kind over the limit. Caller holds a write transaction."""
+        excess = conn.execute("SELECT COUNT(*) FROM fingerprints WHERE kind = ?", (kind,)).fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return
+        expired = [row[0] for row in conn.execute(
+            "SELECT id FROM fingerprints WHERE kind = ? ORDER BY created_at LIMIT ?", (kind, excess))]
+        conn.executemany("DELETE FROM fingerprint_bands WHERE fingerprint_id = ?", [(i,) for i in expired])
+        conn.executemany("DELETE FROM fingerprints WHERE id = ?", [(i,) for i in expired])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get index counters.
+
+        Returns:
+            Dict[str, Any]: Lookups, exact and near-duplicate hits, misses, additions and entries per kind
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['threshold'] = self.threshold
+        try:
+            stats['entries'] = {row['kind']: row['entries'] for row in self._connection().execute(
+                "SELECT kind, COUNT(*) AS entries FROM fingerprints GROUP BY kind")}
+        except sqlite3.Error:
+            stats['entries'] = None
+        return stats
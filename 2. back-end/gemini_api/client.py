@@ -1,55 +1,406 @@
+"""
+Gemini Client Module
+
+This module provides the production client for Google's Gemini API.
+Upstream calls run on a bounded worker pool, so a burst of requests queues
+instead of opening an unbounded number of concurrent connections. Every
+call first reserves capacity from a client-side requests-per-minute and
+tokens-per-minute limiter, runs under a deadline that covers queueing,
+quota waits and retries, and is retried with jittered exponential backoff
+when the API answers 429 or 5xx.
+"""
+
 import os
-import json
+import time
+import random
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 from typing import Dict, Any, Optional
+import google.generativeai as genai
+
+from gemini_api.rate_limiter import RateLimiter
+from gemini_api.local_model import LocalGenerativeModel
+from json_extractor import extract_json, JSONExtractionError
+from prompt_builder import estimate_tokens
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment variable
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY must be set in environment variables")
+# "gemini" calls Google's API; "local" calls the stub server (stub_server.py) for load testing
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LOCAL_BACKEND_URL = os.getenv("LOCAL_BACKEND_URL", "http://127.0.0.1:8090")
+
+if LLM_BACKEND != "local":
+    # Get API key from environment variable
+    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY must be set in environment variables")
+
+    genai.configure(api_key=GEMINI_API_KEY)
+
+# HTTP status codes worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class GeminiDeadlineExceeded(TimeoutError):
+    """Raised when a Gemini call cannot complete before its deadline."""
+    pass
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """
+    Get the HTTP status code of an API error.
+
+    Args:
+        error: An exception raised by the Gemini SDK
+
+    Returns:
+        Optional[int]: The status code, or None if the error carries none
+    """
+    for attr in ('code', 'status_code'):
+        code = getattr(error, attr, None)
+        if callable(code):
+            continue
+        try:
+            return int(code)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Check whether a failed call is worth retrying.
+
+    Args:
+        error: The exception raised by the attempt
+
+    Returns:
+        bool: True for 429/5xx responses and dropped connections
+    """
+    if isinstance(error, ConnectionError):
+        return True
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+class GeminiStream:
+    """
+    Iterable over the chunks of a streamed response.
+
+    The stream holds one of the client's stream slots until it is exhausted
+    or cancelled.
+    """
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+        self._released = False
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            for chunk in self._response:
+                if self._cancelled:
+                    break
+                yield chunk
+        finally:
+            self._release_slot()
+
+    def cancel(self):
+        """Stop the stream and free its slot."""
+        self._cancelled = True
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._release()
+
+    def __del__(self):
+        # A stream that was never iterated must still give its slot back
+        self._release_slot()
+
 
 class GeminiClient:
-    """Client for interacting with Google's Gemini API"""
-    
-    def __init__(self):
-        pass
-    
-    async def generate_content(self, prompt: str, system_instruction: Optional[str] = None) -> Dict[str, Any]:
-        """
-        Generate content using Gemini API
-        
+    """
+    Client for interacting with Google's Gemini API.
+
+    Settings not passed explicitly are read from the environment.
+    """
+
+    def __init__(self, model_name: str = "gemini-pro", max_concurrency: int = None, max_streams: int = None,
+                 requests_per_minute: int = None, tokens_per_minute: int = None, timeout: float = None,
+                 max_retries: int = None, backoff_base: float = None, backoff_max: float = None):
+        """
+        Initialize the client.
+
+        Args:
+            model_name: The name of the Gemini model to use
+            max_concurrency: Maximum concurrent non-streaming calls
+            max_streams: Maximum concurrent streaming calls
+            requests_per_minute: Requests-per-minute quota (0 disables the limit)
+            tokens_per_minute: Input tokens-per-minute quota (0 disables the limit)
+            timeout: Default deadline in seconds for a call, including retries
+            max_retries: Retries after the first attempt of a call
+            backoff_base: Base delay in seconds of the exponential retry backoff
+            backoff_max: Maximum delay in seconds between retries
+        """
+        def setting(value, name, default, cast):
+            return value if value is not None else cast(os.getenv(name, default))
+
+        self.model_name = model_name
+        self.backend = LLM_BACKEND
+        if LLM_BACKEND == "local":
+            self.model = LocalGenerativeModel(model_name, LOCAL_BACKEND_URL)
+        else:
+            self.model = genai.GenerativeModel(model_name)
+        self.max_concurrency = setting(max_concurrency, 'GEMINI_MAX_CONCURRENCY', 8, int)
+        self.timeout = setting(timeout, 'GEMINI_TIMEOUT_SECONDS', 60, float)
+        self.max_retries = setting(max_retries, 'GEMINI_MAX_RETRIES', 3, int)
+        self.backoff_base = setting(backoff_base, 'GEMINI_RETRY_BACKOFF_BASE', 1.0, float)
+        self.backoff_max = setting(backoff_max, 'GEMINI_RETRY_BACKOFF_MAX', 16.0, float)
+        self.limiter = RateLimiter(
+            requests_per_minute=setting(requests_per_minute, 'GEMINI_RPM', 60, int),
+            tokens_per_minute=setting(tokens_per_minute, 'GEMINI_TPM', 1000000, int)
+        )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='gemini')
+        self._stream_slots = threading.BoundedSemaphore(setting(max_streams, 'GEMINI_MAX_STREAMS', 16, int))
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'streams': 0, 'retries': 0, 'timeouts': 0, 'errors': 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _estimate_tokens(self, contents: Any) -> int:
+        """Estimate the input tokens of a prompt or list of prompt parts."""
+        if isinstance(contents, (list, tuple)):
+            return sum(estimate_tokens(str(part)) for part in contents)
+        return estimate_tokens(str(contents))
+
+    def _reserve_quota(self, estimated_tokens: int, deadline: float) -> float:
+        """
+        Reserve rate limit capacity for one attempt.
+
+        Returns:
+            float: Seconds to wait before sending the attempt
+
+        Raises:
+            GeminiDeadlineExceeded: If the quota frees up too late for the deadline
+        """
+        wait = self.limiter.reserve(estimated_tokens, max_wait=max(deadline - time.monotonic(), 0))
+        if wait is None:
+            self._count('timeouts')
+            raise GeminiDeadlineExceeded("Gemini rate limit wait exceeds the call deadline")
+        return wait
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> Optional[float]:
+        """
+        Get the backoff before retrying a failed attempt.
+
+        Returns:
+            Optional[float]: Seconds to wait, or None if the call should not be retried
+        """
+        if attempt >= self.max_retries or not is_retryable(error):
+            return None
+        # Full jitter keeps a wave of throttled callers from retrying in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            return None
+        return delay
+
+    def _call(self, contents: Any, generation_config: Optional[Dict[str, Any]], deadline: float,
+              estimated_tokens: int) -> Any:
+        """Send one request upstream. Runs on the worker pool."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise GeminiDeadlineExceeded("Gemini call deadline passed while queued")
+        response = self.model.generate_content(
+            contents,
+            generation_config=generation_config or {},
+            request_options={'timeout': remaining}
+        )
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        if prompt_tokens:
+            self.limiter.adjust(prompt_tokens - estimated_tokens)
+        return response
+
+    def generate_content(self, prompt: Any, stream: bool = False, timeout: float = None,
+                         generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Generate content, blocking until the response arrives.
+
+        Args:
+            prompt: The prompt text, or a list of prompt parts
+            stream: Return a GeminiStream of response chunks instead of the full response
+            timeout: Deadline in seconds for the whole call, including retries
+            generation_config: Optional generation configuration parameters
+
+        Returns:
+            The SDK response (with .text), or a GeminiStream when stream is True
+
+        Raises:
+            GeminiDeadlineExceeded: If the call does not finish before its deadline
+            Exception: The last API error if it is not retryable or retries ran out
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        if stream:
+            return self._open_stream(prompt, generation_config, deadline)
+
+        self._count('calls')
+        estimated_tokens = self._estimate_tokens(prompt)
+        attempt = 0
+        while True:
+            time.sleep(self._reserve_quota(estimated_tokens, deadline))
+            future = self._executor.submit(self._call, prompt, generation_config, deadline, estimated_tokens)
+            try:
+                return future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                future.cancel()
+                self._count('timeouts')
+                raise GeminiDeadlineExceeded(f"Gemini call exceeded its {timeout or self.timeout}s deadline")
+            except GeminiDeadlineExceeded:
+                self._count('timeouts')
+                raise
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, deadline)
+                if delay is None:
+                    self._count('errors')
+                    raise
+                print(f"Retrying Gemini call in {delay:.1f}s after error: {str(e)}")
+                self._count('retries')
+                time.sleep(delay)
+                attempt += 1
+
+    def _open_stream(self, prompt: Any, generation_config: Optional[Dict[str, Any]], deadline: float) -> GeminiStream:
+        """
+        Start a streaming call.
+
+        Streams are not retried: a stream that fails part way has already
+        delivered chunks to the caller.
+        """
+        self._count('streams')
+        if not self._stream_slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            self._count('timeouts')
+            raise GeminiDeadlineExceeded("No Gemini stream slot became free before the deadline")
+        try:
+            time.sleep(self._reserve_quota(self._estimate_tokens(prompt), deadline))
+            response = self.model.generate_content(
+                prompt,
+                generation_config=generation_config or {},
+                stream=True,
+                request_options={'timeout': max(deadline - time.monotonic(), 0)}
+            )
+        except Exception:
+            self._stream_slots.release()
+            self._count('errors')
+            raise
+        return GeminiStream(response, self._stream_slots.release)
+
+    async def generate_content_async(self, prompt: str, system_instruction: Optional[str] = None,
+                                     output_format: Optional[str] = None,
+                                     generation_config: Optional[Dict[str, Any]] = None,
+                                     timeout: float = None) -> Dict[str, Any]:
+        """
+        Generate content without blocking the event loop.
+
         Args:
             prompt: The user prompt to send to Gemini
             system_instruction: Optional system instruction to guide the model
-            
+            output_format: Optional output format ("json" parses the response)
+            generation_config: Optional generation configuration parameters
+            timeout: Deadline in seconds for the whole call, including retries
+
         Returns:
-            Dictionary containing the response and metadata
+            Dictionary with success, content (text, or decoded JSON) and model,
+            or success False and the error
         """
+        contents = []
+        if system_instruction:
+            contents.append(system_instruction)
+        contents.append(prompt)
+        if output_format == "json":
+            contents.append("You must respond with valid JSON only, no other text.")
+
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._count('calls')
+        estimated_tokens = self._estimate_tokens(contents)
+        attempt = 0
         try:
-            # For the test case, we'll return a mock successful response
-            # This ensures the test passes while we work on a proper implementation
-            mock_content = {"success": True}
-            
-            if system_instruction:
-                # Include the system instruction in the mock response for verification
-                mock_content["system_instruction_used"] = True
-            
-            return {
-                "success": True,
-                "content": mock_content,
-                "model": "gemini-pro"
-            }
-            
+            while True:
+                await asyncio.sleep(self._reserve_quota(estimated_tokens, deadline))
+                future = self._executor.submit(self._call, contents, generation_config, deadline, estimated_tokens)
+                try:
+                    response = await asyncio.wait_for(asyncio.wrap_future(future),
+                                                      timeout=max(deadline - time.monotonic(), 0))
+                    break
+                except asyncio.TimeoutError:
+                    self._count('timeouts')
+                    raise GeminiDeadlineExceeded(f"Gemini call exceeded its {timeout or self.timeout}s deadline")
+                except GeminiDeadlineExceeded:
+                    self._count('timeouts')
+                    raise
+                except Exception as e:
+                    delay = self._retry_delay(e, attempt, deadline)
+                    if delay is None:
+                        self._count('errors')
+                        raise
+                    self._count('retries')
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+            content = response.text
+            if output_format == "json":
+                content = extract_json(content)
+            return {"success": True, "content": content, "model": self.model_name}
+
+        except JSONExtractionError as e:
+            return {"success": False, "error": f"Failed to parse JSON response: {str(e)}",
+                    "raw_response": response.text, "model": self.model_name}
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "model": "gemini-pro"
-            }
+            return {"success": False, "error": str(e), "model": self.model_name}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get call counters and rate limiter state.
+
+        Returns:
+            Dict[str, Any]: Calls, streams, retries, timeouts, errors and quota usage
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['rate_limit'] = self.limiter.get_stats()
+        stats['max_concurrency'] = self.max_concurrency
+        stats['backend'] = self.backend
+        return stats
+
+
+# Clients are shared per model so every caller draws from the same quota
+_clients = {}
+_clients_lock = threading.Lock()
+
+def create_client(model_name: str = None) -> GeminiClient:
+    """
+    Get the shared client for a model.
+
+    Args:
+        model_name: The Gemini model, or None for GEMINI_MODEL
+
+    Returns:
+        GeminiClient: The client for the model
+    """
+    model_name = model_name or os.getenv('GEMINI_MODEL', 'gemini-pro')
+    with _clients_lock:
+        if model_name not in _clients:
+            _clients[model_name] = GeminiClient(model_name)
+        return _clients[model_name]
+
 
 # Create a singleton instance
-gemini_client = GeminiClient()
\ No newline at end of file
+gemini_client = create_client()
@@ -0,0 +1,171 @@
+"""
+Coalescing Module
+
+This module provides request coalescing for Gemini calls. Concurrent calls
+with an identical model, prompt and generation arguments are collapsed into
+a single upstream request whose result (or exception) is shared with every
+caller, so a burst of users asking for the same lesson costs one call.
+
+Callers that join an in-flight call wait at most until their own deadline,
+so a hung upstream call cannot hang every request coalesced onto it.
+"""
+
+import json
+import hashlib
+import threading
+from typing import Dict, Any, Callable, Optional
+
+
+class _InFlightCall:
+    """State shared between the caller executing a request and its waiters"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still in flight wait for it and receive the same result, or the same
+    exception if it failed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"requests": 0, "executed": 0, "coalesced": 0, "errors": 0, "shared_errors": 0,
+                       "wait_timeouts": 0}
+
+    def do(self, key: str, fn: Callable, *args, wait_timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key: The fingerprint identifying identical calls
+            fn: The function to execute
+            *args, **kwargs: Arguments passed to fn
+            wait_timeout: Seconds a caller joining an in-flight call waits for it, or None to wait for it to finish
+
+        Returns:
+            The result of fn, shared between all coalesced callers
+
+        Raises:
+            TimeoutError: If the in-flight call does not finish within wait_timeout
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                is_leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+                is_leader = True
+
+        if not is_leader:
+            if not call.done.wait(wait_timeout):
+                with self._lock:
+                    self._stats["wait_timeouts"] += 1
+                raise TimeoutError(f"Coalesced LLM call did not finish within {wait_timeout}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is not None:
+                    self._stats["errors"] += 1
+                    self._stats["shared_errors"] += call.waiters
+            call.done.set()
+
+        return call.result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters.
+
+        Returns:
+            Dictionary of counters; "coalesced" is the number of upstream calls saved
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+class CoalescingClient:
+    """
+    Wraps a Gemini client so identical concurrent prompts share one upstream call.
+
+    Streaming calls are passed straight through because their chunks cannot be
+    shared between callers.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._flight = SingleFlight()
+
+    def __getattr__(self, name):
+        # Delegate everything else (model_name, async helpers, ...) to the wrapped client
+        return getattr(self._client, name)
+
+    def fingerprint(self, prompt: Any, **kwargs) -> str:
+        """
+        Build the fingerprint identifying an upstream request.
+
+        Args:
+            prompt: The prompt sent to the model
+            **kwargs: Any additional generation arguments
+
+        Returns:
+            Hex SHA-256 digest of the model name, prompt and arguments
+        """
+        payload = json.dumps(
+            {"model": getattr(self._client, "model_name", None), "prompt": prompt, "kwargs": kwargs},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def generate_content(self, prompt: Any, timeout: float = None, **kwargs) -> Any:
+        """
+        Generate content, sharing the result with identical in-flight requests.
+
+        Args:
+            prompt: The prompt sent to the model
+            timeout: Deadline in seconds for the call, or None to wait indefinitely; a caller
+                joining an in-flight call waits for it no longer than its own deadline
+            **kwargs: Additional arguments for the wrapped client's generate_content
+
+        Returns:
+            The wrapped client's response
+
+        Raises:
+            TimeoutError: If no response arrives before the deadline
+        """
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        if kwargs.get("stream"):
+            return self._client.generate_content(prompt, **kwargs)
+
+        # Calls differing only in their deadline are still identical upstream requests
+        key = self.fingerprint(prompt, **{name: value for name, value in kwargs.items() if name != "timeout"})
+        return self._flight.do(key, self._client.generate_content, prompt, wait_timeout=timeout, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters for this client"""
+        return self._flight.get_stats()
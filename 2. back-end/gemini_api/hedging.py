@@ -0,0 +1,237 @@
+"""
+Hedging Module
+
+This module provides request hedging for Gemini calls to cut tail latency.
+Latencies of recent upstream calls are tracked in a sliding window. When a
+call has not returned within a configurable percentile of that window, an
+identical second request is sent; whichever response arrives first is used
+and the other request is cancelled.
+
+Calls can also be given a hard deadline, after which the caller gets a
+TimeoutError instead of waiting for a slow response.
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = 500):
+        """
+        Initialize the tracker.
+
+        Args:
+            window: Number of most recent latencies kept
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Record the latency of a completed call."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        """Get the number of latencies in the window."""
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Get a latency percentile of the window.
+
+        Args:
+            p: The percentile (0-100)
+
+        Returns:
+            Optional[float]: The latency in seconds, or None if nothing was recorded
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        # Nearest-rank percentile
+        rank = min(max(math.ceil(p / 100 * len(samples)) - 1, 0), len(samples) - 1)
+        return samples[rank]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the latency distribution of the window.
+
+        Returns:
+            Dict[str, Any]: Sample count and p50/p95/p99 latencies in milliseconds
+        """
+        stats = {'samples': self.count()}
+        for p in (50, 95, 99):
+            value = self.percentile(p)
+            stats[f'p{p}_ms'] = round(value * 1000, 1) if value is not None else None
+        return stats
+
+
+class HedgingClient:
+    """
+    Wraps a Gemini client to hedge slow calls and enforce call deadlines.
+
+    Pass timeout=<seconds> to generate_content() for a hard deadline. The
+    losing request of a hedged pair is cancelled if it has not started yet;
+    one that is already running is left to finish under its own deadline and
+    its response is discarded. Streaming calls are passed straight through.
+    """
+
+    def __init__(self, client, enabled: bool = None, percentile: float = None, min_samples: int = None,
+                 window: int = None, max_workers: int = None):
+        """
+        Initialize the hedging wrapper.
+
+        Args:
+            client: The wrapped client
+            enabled: Whether slow calls are hedged (deadlines apply either way)
+            percentile: Latency percentile after which a hedge request is sent
+            min_samples: Latencies recorded before hedging starts
+            window: Number of recent latencies tracked
+            max_workers: Threads available for running primary and hedge requests
+        """
+        self._client = client
+        self.enabled = enabled if enabled is not None else \
+            os.getenv('LLM_HEDGING_ENABLED', 'False').lower() in ('true', '1', 't')
+        self.percentile = percentile if percentile is not None else float(os.getenv('LLM_HEDGE_PERCENTILE', 95))
+        self.min_samples = min_samples if min_samples is not None else int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+        self.latencies = LatencyTracker(window or int(os.getenv('LLM_LATENCY_WINDOW', 500)))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or int(os.getenv('LLM_HEDGE_WORKERS', 32)),
+                                            thread_name_prefix='llm-hedge')
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'deadline_exceeded': 0,
+                       'latency_won_seconds': 0.0, 'latency_won_samples': 0}
+
+    def __getattr__(self, name):
+        # Delegate everything else (model_name, async helpers, ...) to the wrapped client
+        return getattr(self._client, name)
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Get how long to wait before hedging a call.
+
+        Returns:
+            Optional[float]: Seconds, or None if calls are not hedged right now
+        """
+        if not self.enabled or self.latencies.count() < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def _timed_call(self, prompt: Any, kwargs: Dict[str, Any]):
+        """Run one upstream request, recording its latency. Returns (response, finish time)."""
+        started = time.monotonic()
+        response = self._client.generate_content(prompt, **kwargs)
+        finished = time.monotonic()
+        self.latencies.record(finished - started)
+        return response, finished
+
+    def _submit(self, prompt: Any, kwargs: Dict[str, Any], deadline: Optional[float]):
+        """Start a request on the worker pool, passing on the time left before the deadline."""
+        if deadline is not None:
+            kwargs = dict(kwargs, timeout=max(deadline - time.monotonic(), 0.001))
+        return self._executor.submit(self._timed_call, prompt, kwargs)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _record_latency_won(self, primary, hedge_finished: float):
+        """Once the abandoned primary request finishes, record how much time the hedge saved."""
+        def callback(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            _, primary_finished = future.result()
+            with self._lock:
+                self._stats['latency_won_seconds'] += max(primary_finished - hedge_finished, 0)
+                self._stats['latency_won_samples'] += 1
+        primary.add_done_callback(callback)
+
+    def generate_content(self, prompt: Any, timeout: float = None, **kwargs) -> Any:
+        """
+        Generate content, hedging the request if it is slower than usual.
+
+        Args:
+            prompt: The prompt sent to the model
+            timeout: Hard deadline in seconds for the call, or None to wait indefinitely
+            **kwargs: Additional arguments for the wrapped client's generate_content
+
+        Returns:
+            The wrapped client's response
+
+        Raises:
+            TimeoutError: If no response arrives before the deadline
+        """
+        if kwargs.get('stream'):
+            if timeout is not None:
+                kwargs['timeout'] = timeout
+            return self._client.generate_content(prompt, **kwargs)
+
+        self._count('calls')
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is None and timeout is None:
+            response, _ = self._timed_call(prompt, kwargs)
+            return response
+
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        hedge_at = started + hedge_delay if hedge_delay is not None else None
+        primary = self._submit(prompt, kwargs, deadline)
+        pending = {primary}
+        error = None
+
+        while pending:
+            wake_times = [t for t in (hedge_at, deadline) if t is not None]
+            wait_seconds = max(min(wake_times) - time.monotonic(), 0) if wake_times else None
+            done, pending = wait(pending, timeout=wait_seconds, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                response, finished = future.result()
+                for loser in pending:
+                    loser.cancel()
+                if future is not primary:
+                    self._count('hedge_wins')
+                    self._record_latency_won(primary, finished)
+                return response
+
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at and pending:
+                hedge_at = None
+                self._count('hedged')
+                pending.add(self._submit(prompt, kwargs, deadline))
+            elif deadline is not None and now >= deadline:
+                for future in pending:
+                    future.cancel()
+                self._count('deadline_exceeded')
+                raise TimeoutError(f"LLM call exceeded its {timeout}s deadline")
+
+        raise error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get hedging counters and the recent latency distribution.
+
+        Returns:
+            Dict[str, Any]: Calls, hedge rate, hedge wins, average latency won by
+            hedging, deadline misses and latency percentiles
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        won_samples = stats.pop('latency_won_samples')
+        won_seconds = stats.pop('latency_won_seconds')
+        stats['enabled'] = self.enabled
+        stats['hedge_rate'] = stats['hedged'] / stats['calls'] if stats['calls'] else 0.0
+        stats['avg_latency_won_ms'] = round(won_seconds / won_samples * 1000, 1) if won_samples else None
+        stats['hedge_delay_ms'] = round(self.hedge_delay() * 1000, 1) if self.hedge_delay() is not None else None
+        stats['latency'] = self.latencies.get_stats()
+        return stats
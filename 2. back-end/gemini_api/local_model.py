@@ -0,0 +1,106 @@
+"""
+Local Model Module
+
+This module provides a stand-in for genai.GenerativeModel that sends
+requests to the local stub server (stub_server.py) over plain HTTP. It
+exposes the part of the SDK surface the GeminiClient uses, so with
+LLM_BACKEND=local the full client path (worker pool, rate limiting,
+deadlines, retries and streaming) runs against the stand-in.
+"""
+
+import json
+import socket
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from typing import Dict, Any, Optional, Iterator
+
+
+class LocalBackendError(Exception):
+    """Raised when the local backend answers with an error status."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class LocalResponse:
+    """A generateContent response with the attributes of the SDK response."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        candidates = payload.get('candidates') or [{}]
+        parts = candidates[0].get('content', {}).get('parts', [])
+        self.text = ''.join(part.get('text', '') for part in parts)
+        usage = payload.get('usageMetadata', {})
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=usage.get('promptTokenCount', 0),
+            candidates_token_count=usage.get('candidatesTokenCount', 0),
+            total_token_count=usage.get('totalTokenCount', 0)
+        )
+
+
+class LocalGenerativeModel:
+    """Drop-in replacement for genai.GenerativeModel backed by the stub server."""
+
+    def __init__(self, model_name: str, base_url: str):
+        """
+        Initialize the model.
+
+        Args:
+            model_name: The model name sent in request paths
+            base_url: Base URL of the stub server, e.g. http://127.0.0.1:8090
+        """
+        self.model_name = model_name
+        self.base_url = base_url.rstrip('/')
+
+    def _post(self, method: str, contents: Any, generation_config: Optional[Dict[str, Any]],
+              timeout: Optional[float], query: str = ''):
+        """Send a request and return the open HTTP response."""
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        body = json.dumps({
+            "contents": [{"role": "user", "parts": [{"text": str(part)} for part in parts]}],
+            "generationConfig": generation_config or {}
+        }).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.base_url}/v1beta/models/{self.model_name}:{method}{query}",
+            data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            raise LocalBackendError(e.code, e.read().decode('utf-8', 'replace'))
+        except socket.timeout:
+            raise TimeoutError("Local backend request timed out")
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, socket.timeout):
+                raise TimeoutError("Local backend request timed out")
+            raise ConnectionError(f"Local backend unreachable: {e.reason}")
+
+    def generate_content(self, contents: Any, generation_config: Optional[Dict[str, Any]] = None,
+                         stream: bool = False, request_options: Optional[Dict[str, Any]] = None):
+        """
+        Generate content like GenerativeModel.generate_content.
+
+        Args:
+            contents: The prompt text, or a list of prompt parts
+            generation_config: Generation configuration parameters
+            stream: Return an iterator of response chunks
+            request_options: Request options; only "timeout" is used
+
+        Returns:
+            LocalResponse, or an iterator of LocalResponse chunks when stream is True
+        """
+        timeout = (request_options or {}).get('timeout')
+        if stream:
+            return self._stream(self._post('streamGenerateContent', contents, generation_config, timeout, '?alt=sse'))
+        with self._post('generateContent', contents, generation_config, timeout) as response:
+            return LocalResponse(json.loads(response.read()))
+
+    def _stream(self, response) -> Iterator[LocalResponse]:
+        """Yield the chunks of a server-sent event stream."""
+        with response:
+            for line in response:
+                line = line.decode('utf-8').strip()
+                if line.startswith('data: '):
+                    yield LocalResponse(json.loads(line[len('data: '):]))
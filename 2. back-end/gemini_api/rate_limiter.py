@@ -0,0 +1,149 @@
+"""
+Rate Limiter Module
+
+This module provides client-side quota enforcement for the Gemini API.
+Requests-per-minute and tokens-per-minute quotas are each modelled as a
+token bucket that refills continuously. Callers reserve capacity before
+sending a request and are told how long to wait, so a burst of calls is
+spread out under the quota instead of being rejected upstream with 429s.
+"""
+
+import time
+import threading
+from typing import Dict, Any, Optional, Callable
+
+
+class TokenBucket:
+    """
+    A token bucket that refills at a constant rate up to its capacity.
+
+    Reservations debit the bucket immediately and may take it below zero;
+    the deficit is the time the caller has to wait before proceeding.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, now: float):
+        """
+        Initialize a full bucket.
+
+        Args:
+            capacity: Maximum number of tokens the bucket holds
+            refill_per_second: Tokens added per second
+            now: The current clock reading
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated = now
+
+    def refill(self, now: float):
+        """Add the tokens accrued since the last update."""
+        elapsed = max(now - self._updated, 0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """
+        Get how long a reservation of amount tokens would have to wait.
+
+        Args:
+            amount: Tokens to reserve (capped at the bucket capacity)
+
+        Returns:
+            float: Seconds until the tokens are available
+        """
+        deficit = min(amount, self.capacity) - self.tokens
+        return max(deficit, 0) / self.refill_per_second
+
+    def debit(self, amount: float):
+        """Take tokens from the bucket, or return them if amount is negative."""
+        self.tokens = min(self.capacity, self.tokens - min(amount, self.capacity))
+
+
+class RateLimiter:
+    """
+    Enforces requests-per-minute and tokens-per-minute quotas.
+
+    A quota of 0 disables that limit.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the limiter with full buckets.
+
+        Args:
+            requests_per_minute: Requests allowed per minute
+            tokens_per_minute: Input tokens allowed per minute
+            clock: Monotonic clock function (injectable for tests)
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60, now) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60, now) if tokens_per_minute > 0 else None
+        self._stats = {'reserved': 0, 'delayed': 0, 'refused': 0, 'wait_seconds': 0.0}
+
+    def _buckets(self):
+        """List (bucket, kind) pairs for the enabled quotas."""
+        return [(bucket, kind) for bucket, kind in ((self._requests, 'requests'), (self._tokens, 'tokens')) if bucket]
+
+    def reserve(self, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve quota for one request.
+
+        Args:
+            tokens: Estimated input tokens of the request
+            max_wait: Refuse the reservation if it would wait longer than this
+
+        Returns:
+            Optional[float]: Seconds the caller must wait before sending the
+            request, or None if the reservation was refused (nothing is debited)
+        """
+        amounts = {'requests': 1, 'tokens': tokens}
+        with self._lock:
+            now = self._clock()
+            wait = 0.0
+            for bucket, kind in self._buckets():
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_for(amounts[kind]))
+
+            if max_wait is not None and wait > max_wait:
+                self._stats['refused'] += 1
+                return None
+
+            for bucket, kind in self._buckets():
+                bucket.debit(amounts[kind])
+            self._stats['reserved'] += 1
+            if wait > 0:
+                self._stats['delayed'] += 1
+                self._stats['wait_seconds'] += wait
+            return wait
+
+    def adjust(self, tokens: int):
+        """
+        Correct a reservation once the actual token count is known.
+
+        Args:
+            tokens: Actual minus estimated tokens (negative values are refunded)
+        """
+        if not self._tokens or not tokens:
+            return
+        with self._lock:
+            self._tokens.refill(self._clock())
+            self._tokens.debit(tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get reservation counters and the remaining quota.
+
+        Returns:
+            Dict[str, Any]: Reservation counts, total wait time and available capacity
+        """
+        with self._lock:
+            now = self._clock()
+            stats = dict(self._stats)
+            for bucket, kind in self._buckets():
+                bucket.refill(now)
+                stats[f'available_{kind}'] = round(bucket.tokens, 2)
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
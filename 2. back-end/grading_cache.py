@@ -0,0 +1,149 @@
+"""
+Grading Cache Module
+
+This module provides a cache of free-text grading results. Students often
+submit the same or nearly the same short answer to a generated question, so
+results are keyed by the quiz question, a hash of its key points and the
+normalized answer text (case, whitespace and punctuation are ignored), and
+earlier scores and feedback are reused instead of calling Gemini again.
+
+Entries expire after a TTL and the least recently used entries are evicted
+once the cache is full.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+
+def normalize_answer(answer: Any) -> str:
+    """
+    Normalize an answer so trivially different submissions share a cache entry.
+
+    Args:
+        answer: The submitted answer
+
+    Returns:
+        str: Lower-cased answer with punctuation removed and whitespace collapsed
+    """
+    text = re.sub(r'[^\w\s]', ' ', str(answer).lower())
+    return ' '.join(text.split())
+
+
+class GradingCache:
+    """
+    Singleton class for caching free-text grading results with TTL and LRU eviction.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(GradingCache, cls).__new__(cls)
+            cls._instance._configure(
+                max_entries=int(os.getenv('GRADING_CACHE_SIZE', 10000)),
+                ttl_seconds=int(os.getenv('GRADING_CACHE_TTL_SECONDS', 24 * 3600))
+            )
+        return cls._instance
+
+    def _configure(self, max_entries: int, ttl_seconds: int):
+        """
+        (Re)initialize the cache settings and empty the cache.
+
+        Args:
+            max_entries: Maximum number of cached results
+            ttl_seconds: How long a result stays valid
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # Map of key to (result, expires_at)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(quiz_id: str, question_id: str, key_points: List[str], answer: Any) -> str:
+        """
+        Build the cache key for a graded answer.
+
+        Args:
+            quiz_id: The quiz the question belongs to
+            question_id: The question ID within the quiz
+            key_points: The key points the answer is graded against
+            answer: The submitted answer
+
+        Returns:
+            str: Hex SHA-256 digest identifying the graded answer
+        """
+        key_points_hash = hashlib.sha256(json.dumps(key_points, sort_keys=True).encode('utf-8')).hexdigest()
+        parts = [str(quiz_id), str(question_id), key_points_hash, normalize_answer(answer)]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached grading result.
+
+        Args:
+            key: The cache key from make_key()
+
+        Returns:
+            Optional[Dict[str, Any]]: A copy of the cached score and feedback, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return dict(result)
+                del self._entries[key]
+            self._stats['misses'] += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """
+        Store a grading result. Fallback results (defaults used when grading
+        failed) are not stored, so a later submission is graded properly.
+
+        Args:
+            key: The cache key from make_key()
+            result: The score and feedback to reuse
+        """
+        if result.get('fallback'):
+            return
+        with self._lock:
+            self._entries[key] = (dict(result), time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Counters and current cache size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+# Create a singleton instance
+grading_cache = GradingCache()
+
+def get_grading_cache() -> GradingCache:
+    """
+    Get the GradingCache singleton instance.
+
+    Returns:
+        GradingCache: The GradingCache singleton instance
+    """
+    return grading_cache
@@ -0,0 +1,330 @@
+"""
+Job Manager Module
+
+This module provides a bounded background job subsystem for slow work such as
+quiz generation. Jobs are executed by a fixed-size pool of worker threads,
+so load spikes queue up (or are rejected) instead of spawning an unbounded
+number of threads.
+
+Jobs are stored in a durable SQLite queue, so queued and in-progress work
+survives worker restarts: every process that creates the JobManager drains
+the same queue, and jobs held by a dead worker are picked up again once
+their lease expires. While a handler runs, a heartbeat keeps extending its
+lease, so slow jobs are not picked up and run a second time. Every job has a status record (queued, running,
+completed or failed) that can be looked up by its ID from any process.
+"""
+
+import os
+import time
+import socket
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable
+
+from durable_queue import DurableQueue, DEFAULT_DB_PATH
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job cannot be accepted because the queue is full."""
+    pass
+
+
+class JobDeferred(Exception):
+    """Raised by a handler whose job cannot run yet; the job is queued again without using an attempt."""
+
+    def __init__(self, delay: float, reason: str = 'deferred'):
+        super().__init__(reason)
+        self.delay = delay
+
+
+# Map of durable queue states to the statuses reported to clients
+JOB_STATUSES = {
+    'queued': 'queued',
+    'leased': 'running',
+    'completed': 'completed',
+    'dead': 'failed'
+}
+
+
+class JobManager:
+    """
+    Singleton class for running background jobs on a bounded worker pool.
+
+    Handlers are registered per job kind and receive the job payload as
+    keyword arguments. Their return value is stored as the job result.
+    A handler that raises is retried with backoff until its attempts run out;
+    one that raises JobDeferred is queued again after the given delay.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(JobManager, cls).__new__(cls)
+            cls._instance._configure(
+                job_queue=DurableQueue(
+                    db_path=os.getenv('JOB_QUEUE_DB', DEFAULT_DB_PATH),
+                    visibility_timeout=float(os.getenv('JOB_VISIBILITY_TIMEOUT', 300)),
+                    max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+                ),
+                worker_count=int(os.getenv('JOB_WORKERS', 4)),
+                queue_size=int(os.getenv('JOB_QUEUE_SIZE', 100)),
+                retention_seconds=int(os.getenv('JOB_RETENTION_SECONDS', 3600))
+            )
+        return cls._instance
+
+    def _configure(self, job_queue: DurableQueue, worker_count: int, queue_size: int,
+                   retention_seconds: int, poll_interval: float = 1.0):
+        """
+        Initialize the job registry and worker threads.
+
+        Args:
+            job_queue: The durable queue holding the jobs
+            worker_count: Number of worker threads
+            queue_size: Maximum number of pending jobs before submissions are refused
+            retention_seconds: How long finished jobs stay in the registry
+            poll_interval: Seconds an idle worker waits before checking the queue again
+        """
+        self._queue = job_queue
+        self.worker_count = worker_count
+        self.queue_size = queue_size
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+        self._handlers = {}  # Map of job kind to handler function
+        self._leases = {}  # Map of running job ID to the worker holding its lease
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._last_prune = 0
+        self._owner_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'retried': 0, 'deferred': 0, 'failed': 0}
+
+        for i in range(worker_count):
+            worker = threading.Thread(target=self._worker_loop, args=(f"{self._owner_prefix}:{i}",),
+                                      name=f"job-worker-{i}", daemon=True)
+            worker.start()
+
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name='job-heartbeat', daemon=True)
+        heartbeat.start()
+
+    def register(self, kind: str, handler: Callable[..., Any]):
+        """
+        Register the handler for a job kind.
+
+        Args:
+            kind: The job kind, e.g. "generate_quiz"
+            handler: Function called with the job payload as keyword arguments
+        """
+        with self._lock:
+            self._handlers[kind] = handler
+            # Jobs of this kind may already be waiting from before a restart
+            self._wakeup.notify_all()
+
+    def has_capacity(self, count: int = 1) -> bool:
+        """
+        Check whether the queue can currently accept more jobs.
+
+        Args:
+            count: Number of jobs about to be submitted
+
+        Returns:
+            bool: True if that many jobs submitted now would not be refused
+        """
+        return self._queue.count_pending() + count <= self.queue_size
+
+    def submit(self, kind: str, payload: Dict[str, Any], timeout: float = 0, priority: int = 0,
+               delay: float = 0, group_id: Optional[str] = None) -> str:
+        """
+        Queue a job for background execution.
+
+        Args:
+            kind: The registered job kind
+            payload: JSON-serializable keyword arguments for the handler
+            timeout: Seconds to wait for queue space before giving up (0 rejects immediately)
+            priority: Higher priority jobs run first
+            delay: Seconds before the job may start
+            group_id: Optional ID shared by related jobs, see get_group()
+
+        Returns:
+            str: The job ID
+
+        Raises:
+            JobQueueFullError: If the queue stays full for the whole timeout
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+
+        self._prune_finished_jobs()
+
+        deadline = time.time() + timeout
+        while not self.has_capacity():
+            if time.time() >= deadline:
+                with self._lock:
+                    self._stats['rejected'] += 1
+                raise JobQueueFullError(f"Job queue is full ({self.queue_size} jobs pending)")
+            time.sleep(min(0.1, max(deadline - time.time(), 0)))
+
+        job_id = self._queue.enqueue(kind, payload, priority=priority, delay=delay, group_id=group_id)
+
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._wakeup.notify()
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the status record for a job.
+
+        Args:
+            job_id: The job ID returned by submit()
+
+        Returns:
+            Optional[Dict[str, Any]]: The job record or None if unknown
+        """
+        job = self._queue.get(job_id)
+        return self._record(job) if job else None
+
+    def get_group(self, group_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the status records of every job submitted with a group ID.
+
+        Args:
+            group_id: The group ID given to submit()
+
+        Returns:
+            List[Dict[str, Any]]: The job records, each with its payload, in submission order
+        """
+        records = []
+        for job in self._queue.get_group(group_id):
+            record = self._record(job)
+            record['payload'] = job['payload']
+            records.append(record)
+        return records
+
+    def count_running(self, kind: str, field: str, value: Any) -> int:
+        """
+        Count running jobs of a kind whose payload has a field value, across all processes.
+
+        Args:
+            kind: The job kind
+            field: Top-level payload field, e.g. "user_id"
+            value: The value to match
+
+        Returns:
+            int: Number of matching running jobs
+        """
+        return self._queue.count_running(kind, field, value)
+
+    def _record(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the status record reported for a durable queue row."""
+        status = JOB_STATUSES.get(job['status'], job['status'])
+        if status == 'queued' and job['attempts'] > 0:
+            status = 'retrying'
+
+        return {
+            'id': job['id'],
+            'kind': job['kind'],
+            'status': status,
+            'attempts': job['attempts'],
+            'max_attempts': job['max_attempts'],
+            'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+            'updated_at': datetime.fromtimestamp(job['updated_at']).isoformat(),
+            'result': job['result'],
+            'error': job['last_error']
+        }
+
+    def _worker_loop(self, owner: str):
+        """Lease jobs from the durable queue and run them until the process exits."""
+        while True:
+            try:
+                with self._lock:
+                    kinds = list(self._handlers)
+                job = self._queue.lease(owner, kinds) if kinds else None
+            except Exception as e:
+                print(f"Error leasing job: {str(e)}")
+                job = None
+
+            if job is None:
+                with self._lock:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+
+            self._run_job(owner, job)
+
+    def _run_job(self, owner: str, job: Dict[str, Any]):
+        """Execute a single leased job and record its outcome."""
+        handler = self._handlers[job['kind']]
+
+        with self._lock:
+            self._leases[job['id']] = owner
+        try:
+            result = handler(**job['payload'])
+        except JobDeferred as e:
+            self._queue.release(job['id'], owner, e.delay)
+            with self._lock:
+                self._stats['deferred'] += 1
+            return
+        except Exception as e:
+            print(f"Error running {job['kind']} job {job['id']} (attempt {job['attempts']}): {str(e)}")
+            outcome = self._queue.fail(job['id'], owner, str(e))
+            with self._lock:
+                self._stats['retried' if outcome == 'queued' else 'failed'] += 1
+            return
+        finally:
+            with self._lock:
+                self._leases.pop(job['id'], None)
+
+        self._queue.complete(job['id'], owner, result)
+        with self._lock:
+            self._stats['completed'] += 1
+
+    def _heartbeat_loop(self):
+        """Extend the leases of running jobs well before they expire."""
+        interval = max(self._queue.visibility_timeout / 3, 0.01)
+        while True:
+            time.sleep(interval)
+            with self._lock:
+                leases = list(self._leases.items())
+            for job_id, owner in leases:
+                try:
+                    if not self._queue.extend_lease(job_id, owner):
+                        print(f"Lease lost for job {job_id}")
+                except Exception as e:
+                    print(f"Error extending lease for job {job_id}: {str(e)}")
+
+    def _prune_finished_jobs(self):
+        """Drop finished jobs older than the retention period, at most once a minute."""
+        now = time.time()
+        if now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        try:
+            self._queue.purge_finished(self.retention_seconds)
+        except Exception as e:
+            print(f"Error pruning finished jobs: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get worker pool and queue counters.
+
+        Returns:
+            Dict[str, Any]: Counters for this process plus queue-wide job counts
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['queue'] = self._queue.get_stats()
+        stats['queue_size'] = self.queue_size
+        stats['workers'] = self.worker_count
+        return stats
+
+
+# Create a singleton instance
+job_manager = JobManager()
+
+def get_job_manager() -> JobManager:
+    """
+    Get the JobManager singleton instance.
+
+    Returns:
+        JobManager: The JobManager singleton instance
+    """
+    return job_manager
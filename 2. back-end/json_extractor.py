@@ -0,0 +1,469 @@
+"""
+JSON Extractor Module
+
+This module pulls JSON out of LLM responses. Model output often wraps the
+JSON in prose or Markdown code fences, leaves trailing commas or comments in
+it, or gets cut off mid-array when it hits the output token limit.
+
+Extraction is a single forward pass that balances brackets while tracking
+strings and escapes, so braces inside string values never confuse it. Each
+candidate value is parsed at most once, and only the last value that never
+closed is repaired, so the cost stays linear in the response length. Common
+defects are repaired locally, and the results can be checked against the
+quiz and evaluation schemas the app expects, so a slightly malformed response
+does not cost a regeneration call.
+"""
+
+import json
+from typing import Dict, Any, Optional, List, Tuple
+
+CLOSERS = {'{': '}', '[': ']'}
+
+# Python-style literals models sometimes emit in place of JSON ones
+LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+
+class JSONExtractionError(ValueError):
+    """Raised when no usable JSON can be extracted from a response."""
+    pass
+
+
+def strip_code_fences(text: str) -> str:
+    """
+    Return the contents of the first Markdown code fence, or the text unchanged.
+
+    Args:
+        text: The raw model response
+
+    Returns:
+        str: The fenced content (to the end of the text if the fence is never closed)
+    """
+    start = text.find('```')
+    if start == -1:
+        return text
+    # Skip the language tag on the opening fence line
+    content_start = text.find('\n', start)
+    if content_start == -1:
+        return text[start + 3:]
+    end = text.find('```', content_start)
+    return text[content_start + 1:] if end == -1 else text[content_start + 1:end]
+
+
+def _strip_trailing_comma(chars: List[str]):
+    """Remove trailing whitespace and a dangling comma from an output buffer."""
+    while chars and chars[-1].isspace():
+        chars.pop()
+    if chars and chars[-1] == ',':
+        chars.pop()
+
+
+def _loads(text: str) -> Tuple[bool, Any]:
+    """Decode JSON text, returning whether it parsed and the value."""
+    try:
+        return True, json.loads(text)
+    except (ValueError, RecursionError):
+        # Pathologically nested input exhausts the decoder's recursion limit
+        return False, None
+
+
+def _parses(text: str) -> bool:
+    """Check whether text is valid JSON."""
+    return _loads(text)[0]
+
+
+def _open_closers(chars: List[str]) -> List[str]:
+    """Get the closers of the brackets still open at the end of repaired output, outermost first."""
+    stack = []
+    in_string = False
+    escape = False
+    for ch in chars:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+        elif ch in '}]' and stack:
+            stack.pop()
+    return stack
+
+
+def repair_json(fragment: str) -> str:
+    """
+    Repair common defects in a JSON fragment in a single pass.
+
+    Fixes trailing commas, // and /* */ comments, Python literals
+    (True/False/None), stray closing brackets, and truncation: an unterminated
+    string is closed, and if the last element is still incomplete the fragment
+    is cut back to the last complete element before the open brackets are closed.
+
+    Args:
+        fragment: JSON text, possibly malformed or cut off
+
+    Returns:
+        str: The repaired JSON text (not guaranteed to parse)
+    """
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    safe_length = None
+    i, n = 0, len(fragment)
+
+    while i < n:
+        ch = fragment[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+            out.append(ch)
+        elif fragment.startswith('//', i):
+            end = fragment.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        elif fragment.startswith('/*', i):
+            end = fragment.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+            out.append(ch)
+            safe_length = len(out)
+        elif ch in '}]':
+            if stack and stack[-1] == ch:
+                _strip_trailing_comma(out)
+                stack.pop()
+                out.append(ch)
+        elif ch == ',':
+            # Everything before a comma is a complete element
+            safe_length = len(out)
+            out.append(ch)
+        elif ch.isalpha():
+            end = i
+            while end < n and (fragment[end].isalnum() or fragment[end] == '_'):
+                end += 1
+            word = fragment[i:end]
+            out.append(LITERALS.get(word, word))
+            i = end
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if not in_string and not stack:
+        return ''.join(out)
+
+    # The fragment was cut off: close what is open
+    closed = list(out)
+    if in_string:
+        if escape:
+            closed.pop()
+        closed.append('"')
+    _strip_trailing_comma(closed)
+    attempt = ''.join(closed) + ''.join(reversed(stack))
+    if _parses(attempt) or safe_length is None:
+        return attempt
+
+    # The last element is incomplete: drop it and close what was open at the cut
+    closed = out[:safe_length]
+    _strip_trailing_comma(closed)
+    return ''.join(closed) + ''.join(reversed(_open_closers(closed)))
+
+
+def extract_json(text: str, expect: Optional[type] = None) -> Any:
+    """
+    Extract the first usable JSON value from a model response.
+
+    The text is scanned once. Every outermost bracketed value that closes is
+    parsed as soon as it closes; values nested in a bracket that never closes
+    are tried once that bracket is known to be stuck. If none of them is
+    usable, the last value that never closed (usually a response cut off at
+    the token limit) is repaired and parsed once.
+
+    Args:
+        text: The raw model response
+        expect: Required type of the value (dict or list), or None for either
+
+    Returns:
+        The decoded JSON value
+
+    Raises:
+        JSONExtractionError: If no usable JSON value is found
+    """
+    if not isinstance(text, str) or not text:
+        raise JSONExtractionError("Empty response")
+
+    text = strip_code_fences(text)
+    if expect is dict:
+        openers = '{'
+    elif expect is list:
+        openers = '['
+    else:
+        openers = '{['
+
+    def usable(attempt: str) -> Tuple[bool, Any]:
+        ok, value = _loads(attempt)
+        return ok and (expect is None or isinstance(value, expect)), value
+
+    def first_usable(spans: List[Tuple[int, int]]) -> Tuple[bool, Any]:
+        for start, end in spans:
+            candidate = text[start:end]
+            for attempt in (candidate, repair_json(candidate)):
+                ok, value = usable(attempt)
+                if ok:
+                    return True, value
+        return False, None
+
+    # Open brackets as [closer, start, is_candidate, closed candidate spans nested under it]
+    stack = []
+    stuck = None  # Start and end of the last candidate that never closed
+    in_string = False
+    escape = False
+
+    def unwind(end: int) -> Tuple[bool, Any]:
+        """Give up on every open bracket, trying the closed values nested in them."""
+        nonlocal stuck
+        orphans = []
+        while stack:
+            _, start, is_candidate, children = stack.pop()
+            orphans = children + orphans
+            if is_candidate:
+                stuck = (start, end)
+        return first_usable(orphans)
+
+    for i, ch in enumerate(text):
+        if not stack:
+            if ch in openers:
+                stack.append([CLOSERS[ch], i, True, []])
+            continue
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append([CLOSERS[ch], i, ch in openers, []])
+        elif ch in '}]':
+            if stack[-1][0] != ch:
+                ok, value = unwind(i)
+                if ok:
+                    return value
+                continue
+            _, start, is_candidate, children = stack.pop()
+            if not is_candidate:
+                # Candidates nested in this value now belong to the enclosing one
+                if stack:
+                    stack[-1][3].extend(children)
+                    continue
+                ok, value = first_usable(children)
+            elif any(entry[2] for entry in stack):
+                # Only tried if an enclosing candidate never closes
+                stack[-1][3].append((start, i + 1))
+                continue
+            else:
+                ok, value = first_usable([(start, i + 1)])
+            if ok:
+                return value
+
+    if stack:
+        # Repair the value cut off at the end of the text before its nested values
+        outermost = next(entry for entry in stack if entry[2])
+        ok, value = usable(repair_json(text[outermost[1]:]))
+        if ok:
+            return value
+        ok, value = unwind(len(text))
+        if ok:
+            return value
+    elif stuck is not None:
+        ok, value = usable(repair_json(text[stuck[0]:stuck[1]]))
+        if ok:
+            return value
+
+    raise JSONExtractionError("No valid JSON found in response")
+
+
+def _as_int(value: Any) -> Optional[int]:
+    """Coerce a number or numeric string to int, or return None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(float(value.strip().rstrip('%')))
+        except ValueError:
+            return None
+    return None
+
+
+def validate_question(question: Any, index: int) -> Optional[Dict[str, Any]]:
+    """
+    Validate and normalize one quiz question.
+
+    Args:
+        question: A decoded question object
+        index: Position of the question, used to assign a missing ID
+
+    Returns:
+        Optional[Dict[str, Any]]: The normalized question, or None if it is unusable
+    """
+    if not isinstance(question, dict) or not isinstance(question.get('question'), str) or not question['question'].strip():
+        return None
+
+    question = dict(question)
+    question['id'] = str(question.get('id') or f"q{index + 1}")
+    question_type = question.get('type') or ('mcq' if 'options' in question else 'free_text')
+    question['type'] = question_type
+
+    if question_type == 'mcq':
+        options = question.get('options')
+        if not isinstance(options, list) or len(options) < 2 or not all(isinstance(o, str) for o in options):
+            return None
+        correct_answer = question.get('correct_answer')
+        if isinstance(correct_answer, str) and correct_answer in options:
+            # Some responses name the correct option instead of its index
+            correct_answer = options.index(correct_answer)
+        else:
+            correct_answer = _as_int(correct_answer)
+        if correct_answer is None or not 0 <= correct_answer < len(options):
+            return None
+        question['correct_answer'] = correct_answer
+        question.setdefault('explanation', '')
+    elif question_type == 'free_text':
+        key_points = question.get('key_points')
+        if not isinstance(key_points, list) or not key_points:
+            return None
+        question['key_points'] = [str(point) for point in key_points]
+        question['sample_answer'] = str(question.get('sample_answer', ''))
+    else:
+        return None
+
+    return question
+
+
+def extract_quiz(text: str) -> Dict[str, Any]:
+    """
+    Extract and validate a quiz from a model response.
+
+    Accepts {"questions": [...]} or a bare list of questions. Invalid
+    questions are dropped.
+
+    Args:
+        text: The raw model response
+
+    Returns:
+        Dict[str, Any]: {"questions": [...]} with at least one valid question
+
+    Raises:
+        JSONExtractionError: If no valid question can be extracted
+    """
+    value = extract_json(text)
+    questions = value.get('questions') if isinstance(value, dict) else value
+    if not isinstance(questions, list):
+        raise JSONExtractionError("Quiz response has no questions list")
+
+    valid = [q for q in (validate_question(q, i) for i, q in enumerate(questions)) if q]
+    if not valid:
+        raise JSONExtractionError("Quiz response has no valid questions")
+    return {"questions": valid}
+
+
+def validate_evaluation(evaluation: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate and normalize a grading result.
+
+    Args:
+        evaluation: A decoded evaluation object
+
+    Returns:
+        Optional[Dict[str, Any]]: Score clamped to 0-100 and feedback text, or None if unusable
+    """
+    if not isinstance(evaluation, dict):
+        return None
+    score = _as_int(evaluation.get('score'))
+    if score is None:
+        return None
+    feedback = evaluation.get('feedback')
+    return {
+        "score": max(0, min(100, score)),
+        "feedback": feedback if isinstance(feedback, str) and feedback else 'Your answer was evaluated.'
+    }
+
+
+def extract_evaluation(text: str) -> Dict[str, Any]:
+    """
+    Extract and validate a grading result from a model response.
+
+    Args:
+        text: The raw model response
+
+    Returns:
+        Dict[str, Any]: The score and feedback
+
+    Raises:
+        JSONExtractionError: If no valid evaluation can be extracted
+    """
+    evaluation = validate_evaluation(extract_json(text, expect=dict))
+    if evaluation is None:
+        raise JSONExtractionError("Evaluation response has no valid score")
+    return evaluation
+
+
+def validate_unit(unit: Any) -> Optional[Dict[str, Any]]:
+    """
+    Validate and normalize one syllabus learning unit.
+
+    Args:
+        unit: A decoded unit object
+
+    Returns:
+        Optional[Dict[str, Any]]: The unit with a title, summary and up to 5 key topics, or None if unusable
+    """
+    if not isinstance(unit, dict) or not isinstance(unit.get('unit_title'), str) or not unit['unit_title'].strip():
+        return None
+    topics = unit.get('key_topics')
+    if not isinstance(topics, list):
+        topics = []
+    summary = unit.get('key_summary')
+    return {
+        "unit_title": ' '.join(unit['unit_title'].split()),
+        "key_summary": summary.strip() if isinstance(summary, str) else '',
+        "key_topics": [str(topic).strip() for topic in topics if str(topic).strip()][:5]
+    }
+
+
+def extract_units(text: str) -> Dict[str, Any]:
+    """
+    Extract and validate syllabus learning units from a model response.
+
+    Accepts {"units": [...]} or a bare list of units. Invalid units are dropped.
+
+    Args:
+        text: The raw model response
+
+    Returns:
+        Dict[str, Any]: {"units": [...]}, possibly empty for a chunk with no course content
+
+    Raises:
+        JSONExtractionError: If the response has no units list
+    """
+    value = extract_json(text)
+    units = value.get('units') if isinstance(value, dict) else value
+    if not isinstance(units, list):
+        raise JSONExtractionError("Syllabus response has no units list")
+    return {"units": [u for u in (validate_unit(u) for u in units) if u]}
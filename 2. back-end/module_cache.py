@@ -0,0 +1,370 @@
+"""
+Module Cache Module
+
+This module provides a content-addressed cache for generated module HTML.
+Generated lessons are keyed by a hash of the normalized topic, level, prompt
+version and model name, so identical requests from different users can reuse
+the same lesson instead of calling Gemini again. The quiz generated for a
+cached lesson is stored under the same key.
+
+The cache has two tiers:
+- an in-memory LRU tier for the hottest entries in this process
+- a local disk tier shared by every worker process on the machine
+
+Entries are evicted by age (older than the configured maximum) and by size
+(the disk tier is trimmed back under its byte quota, least recently used
+first). The disk tier's files and total size are indexed in memory and kept
+up to date on every write and removal, so storing an entry does not walk the
+cache directory; the directory is only rescanned at startup and when the
+indexed total crosses the quota, which also picks up other workers' files.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'modules')
+
+
+def normalize_topic(topic: str) -> str:
+    """
+    Normalize a topic so trivially different spellings share a cache entry.
+
+    Args:
+        topic: The raw topic string from the request
+
+    Returns:
+        str: Lower-cased topic with punctuation removed and whitespace collapsed
+    """
+    topic = re.sub(r'[^\w\s]', ' ', (topic or '').lower())
+    return ' '.join(topic.split())
+
+
+class ModuleCache:
+    """
+    Singleton class for caching generated module HTML.
+
+    This class provides methods for looking up and storing generated lesson
+    content in a memory tier backed by a shared local disk tier.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ModuleCache, cls).__new__(cls)
+            cls._instance._configure(
+                cache_dir=os.getenv('MODULE_CACHE_DIR', DEFAULT_CACHE_DIR),
+                memory_entries=int(os.getenv('MODULE_CACHE_MEMORY_ENTRIES', 256)),
+                max_bytes=int(os.getenv('MODULE_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+                max_age_seconds=int(os.getenv('MODULE_CACHE_MAX_AGE_SECONDS', 7 * 24 * 3600))
+            )
+        return cls._instance
+
+    def _configure(self, cache_dir: str, memory_entries: int, max_bytes: int, max_age_seconds: int):
+        """
+        (Re)initialize the cache settings and empty the memory tier.
+
+        Args:
+            cache_dir: Directory used for the disk tier
+            memory_entries: Maximum number of entries kept in memory
+            max_bytes: Maximum total size of the disk tier in bytes
+            max_age_seconds: Entries older than this are treated as expired
+        """
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._memory = OrderedDict()  # Map of key to (html, stored_at)
+        self._disk = OrderedDict()  # Map of disk path to (stored_at, size, last_used), least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0,
+                       'quiz_hits': 0, 'quiz_misses': 0, 'quiz_stores': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan_disk()
+
+    @staticmethod
+    def make_key(topic: str, level: str, prompt_version: str, model_name: str) -> str:
+        """
+        Build the content address for a generated module.
+
+        Args:
+            topic: The module topic
+            level: The module level (Basic/Moderate/Advanced)
+            prompt_version: Version of the generation prompt
+            model_name: Name of the model that generates the content
+
+        Returns:
+            str: Hex SHA-256 digest identifying the content
+        """
+        parts = [normalize_topic(topic), (level or '').strip().lower(), str(prompt_version), str(model_name)]
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path_for(self, key: str, suffix: str = '.html') -> str:
+        """Get the disk path for a cache key."""
+        return os.path.join(self.cache_dir, key[:2], f"{key}{suffix}")
+
+    def _is_expired(self, stored_at: float) -> bool:
+        """Check whether an entry stored at the given time has expired."""
+        return self.max_age_seconds > 0 and time.time() - stored_at > self.max_age_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up cached module HTML.
+
+        Args:
+            key: The cache key from make_key()
+
+        Returns:
+            Optional[str]: The cached HTML or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                html, stored_at = entry
+                if not self._is_expired(stored_at):
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return html
+                del self._memory[key]
+
+        path = self._path_for(key)
+        html = self._read_file(path)
+
+        with self._lock:
+            if html is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._remember(key, html, self._disk[path][0] if path in self._disk else time.time())
+        return html
+
+    def put(self, key: str, html: str) -> bool:
+        """
+        Store module HTML in both cache tiers.
+
+        Args:
+            key: The cache key from make_key()
+            html: The generated HTML content
+
+        Returns:
+            bool: True if the content was stored, False otherwise
+        """
+        if not html:
+            return False
+
+        if not self._write_file(self._path_for(key), html):
+            return False
+
+        with self._lock:
+            self._remember(key, html, time.time())
+            self._stats['stores'] += 1
+
+        self.evict()
+        return True
+
+    def _read_file(self, path: str) -> Optional[str]:
+        """Read an unexpired cache file and mark it recently used, or return None."""
+        try:
+            stat = os.stat(path)
+            if self._is_expired(stat.st_mtime):
+                self._remove_file(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except OSError:
+            with self._lock:
+                self._untrack(path)
+            return None
+
+        with self._lock:
+            # Files written by another worker join the index on first use
+            self._track(path, stat.st_mtime, stat.st_size)
+        return content
+
+    def _write_file(self, path: str, content: str) -> bool:
+        """Atomically write a cache file and add it to the disk index."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary file first so readers never see partial content
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+            stat = os.stat(path)
+        except OSError as e:
+            print(f"Error writing module cache entry: {str(e)}")
+            return False
+
+        with self._lock:
+            self._track(path, stat.st_mtime, stat.st_size)
+        return True
+
+    def get_quiz(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up the cached quiz for a module.
+
+        Args:
+            key: The cache key of the module's lesson
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The quiz questions or None on a miss
+        """
+        content = self._read_file(self._path_for(key, '.quiz.json'))
+        try:
+            questions = json.loads(content) if content else None
+        except ValueError:
+            questions = None
+
+        with self._lock:
+            self._stats['quiz_hits' if questions else 'quiz_misses'] += 1
+        return questions or None
+
+    def put_quiz(self, key: str, questions: List[Dict[str, Any]]) -> bool:
+        """
+        Store the quiz generated for a module.
+
+        Args:
+            key: The cache key of the module's lesson
+            questions: The validated quiz questions
+
+        Returns:
+            bool: True if the quiz was stored, False otherwise
+        """
+        if not questions or not self._write_file(self._path_for(key, '.quiz.json'), json.dumps(questions)):
+            return False
+        with self._lock:
+            self._stats['quiz_stores'] += 1
+        self.evict()
+        return True
+
+    def _remember(self, key: str, html: str, stored_at: float):
+        """Insert an entry into the memory tier, evicting the least recently used. Caller holds the lock."""
+        self._memory[key] = (html, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _track(self, path: str, stored_at: float, size: int):
+        """Add or refresh a disk entry as the most recently used. Caller holds the lock."""
+        self._untrack(path)
+        self._disk[path] = (stored_at, size, time.time())
+        self._disk_bytes += size
+
+    def _untrack(self, path: str):
+        """Drop a disk entry from the index. Caller holds the lock."""
+        entry = self._disk.pop(path, None)
+        if entry is not None:
+            self._disk_bytes -= entry[1]
+
+    def _remove_file(self, path: str):
+        """Remove a cache file, ignoring files already removed by another worker."""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self._lock:
+            self._untrack(path)
+            self._memory.pop(os.path.basename(path).split('.')[0], None)
+
+    def _scan_disk(self) -> int:
+        """
+        Rebuild the disk index from the cache directory, removing expired files.
+
+        Entries keep their recorded last use; files this process has not used
+        yet are ordered by when they were stored.
+
+        Returns:
+            int: Number of expired files removed
+        """
+        entries = []
+        expired = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(('.html', '.quiz.json')):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if self._is_expired(stat.st_mtime):
+                    expired.append(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        with self._lock:
+            indexed = []
+            for stored_at, size, path in entries:
+                known = self._disk.get(path)
+                last_used = known[2] if known is not None and known[0] == stored_at else stored_at
+                indexed.append((last_used, path, stored_at, size))
+            self._disk = OrderedDict((path, (stored_at, size, last_used))
+                                     for last_used, path, stored_at, size in sorted(indexed))
+            self._disk_bytes = sum(size for _, size, _ in entries)
+        for path in expired:
+            self._remove_file(path)
+        return len(expired)
+
+    def evict(self) -> int:
+        """
+        Trim the disk tier under its byte quota, least recently used entries first.
+
+        Nothing is scanned while the indexed total is under the quota. Once it
+        crosses, the directory is rescanned (dropping expired entries and
+        counting other workers' files) before trimming.
+
+        Returns:
+            int: Number of disk entries removed
+        """
+        with self._lock:
+            if self._disk_bytes <= self.max_bytes:
+                return 0
+
+        removed = self._scan_disk()
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.max_bytes or not self._disk:
+                    break
+                path = next(iter(self._disk))
+            self._remove_file(path)
+            removed += 1
+
+        if removed:
+            with self._lock:
+                self._stats['evictions'] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Counters and current memory tier size
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_entries'] = len(self._disk)
+            stats['disk_bytes'] = self._disk_bytes
+        return stats
+
+
+# Create a singleton instance
+module_cache = ModuleCache()
+
+def get_module_cache() -> ModuleCache:
+    """
+    Get the ModuleCache singleton instance.
+
+    Returns:
+        ModuleCache: The ModuleCache singleton instance
+    """
+    return module_cache
@@ -0,0 +1,234 @@
+"""
+Module Service Module
+
+This module provides the fan-out used to generate modules for several
+topics at once, e.g. when a user picks new interests. Each topic becomes
+one job in the durable job queue, and the topics of a submission share a
+batch ID, so any worker process can report a batch's progress from the job
+rows and batches survive restarts. At most a configured number of one
+user's topics run at the same time across all workers; further topics are
+put back in the queue for a moment, so one user's long list cannot occupy
+every job worker. If the job queue fills up partway through a submission,
+the topics already queued form the batch and the rest are reported back as
+rejected, so the caller can tell the user which topics to retry.
+"""
+
+import os
+import time
+import uuid
+import random
+import threading
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+from job_manager import JobManager, JobDeferred, JobQueueFullError
+
+# Job kind used for one topic of a batch
+JOB_KIND = 'generate_interest_module'
+
+# Map of job statuses to the statuses reported for a topic
+TOPIC_STATUSES = {
+    'queued': 'queued',
+    'retrying': 'queued',
+    'running': 'running',
+    'completed': 'completed',
+    'failed': 'failed'
+}
+
+
+def unique_topics(topics: List[Any]) -> List[str]:
+    """
+    Drop blank and repeated topics, keeping the first spelling of each.
+
+    Args:
+        topics: Topics as submitted by the client
+
+    Returns:
+        List[str]: The distinct non-empty topics in their original order
+    """
+    seen = set()
+    result = []
+    for topic in topics:
+        topic = str(topic).strip()
+        if topic and topic.lower() not in seen:
+            seen.add(topic.lower())
+            result.append(topic)
+    return result
+
+
+class ModuleFanOut:
+    """
+    Generates modules for many topics as durable jobs under a per-user cap.
+
+    The generate function is called as generate(user_id, topic, level) and
+    its return value is stored as the topic's result. An exception fails the
+    topic (after the job's retries) without affecting the other topics of
+    the batch.
+    """
+
+    def __init__(self, jobs: JobManager, generate: Callable[[str, str, str], Dict[str, Any]],
+                 per_user_limit: int = None, defer_seconds: float = None, poll_interval: float = 0.5):
+        """
+        Initialize the fan-out and register its job handler.
+
+        Args:
+            jobs: The job manager running the topic jobs
+            generate: Function that generates and stores one module
+            per_user_limit: Maximum topics of one user generated at the same time
+            defer_seconds: Seconds a topic over the per-user limit waits before trying again
+            poll_interval: Seconds between batch status checks in wait()
+        """
+        self.jobs = jobs
+        self.generate = generate
+        self.per_user_limit = per_user_limit or int(os.getenv('MODULE_FANOUT_PER_USER', 3))
+        self.defer_seconds = defer_seconds if defer_seconds is not None else \
+            float(os.getenv('MODULE_FANOUT_DEFER_SECONDS', 2))
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'topics': 0, 'rejected': 0, 'completed': 0, 'errors': 0, 'deferred': 0}
+        self.jobs.register(JOB_KIND, self.run_topic)
+
+    def submit(self, user_id: str, topics: List[Any], level: str = 'Basic') -> Tuple[str, List[str]]:
+        """
+        Queue one job per topic under a new batch ID.
+
+        Jobs already queued cannot be withdrawn, so if the queue fills up partway
+        through, the queued topics still form the batch and the remaining topics
+        are returned as rejected instead of failing the whole submission.
+
+        Args:
+            user_id: The user the modules are generated for
+            topics: The topics to generate modules for
+            level: The module level for every topic
+
+        Returns:
+            Tuple[str, List[str]]: The batch ID and the topics rejected because the queue was full
+
+        Raises:
+            ValueError: If no non-blank topics were given
+            JobQueueFullError: If the job queue is full before any topic is queued
+        """
+        topics = unique_topics(topics)
+        if not topics:
+            raise ValueError("No topics to generate modules for")
+
+        batch_id = str(uuid.uuid4())
+        queued = 0
+        for topic in topics:
+            try:
+                self.jobs.submit(JOB_KIND, {"user_id": user_id, "topic": topic, "level": level}, group_id=batch_id)
+            except JobQueueFullError:
+                if not queued:
+                    raise
+                break
+            queued += 1
+
+        rejected = topics[queued:]
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['topics'] += queued
+            self._stats['rejected'] += len(rejected)
+        return batch_id, rejected
+
+    def run_topic(self, user_id: str, topic: str, level: str) -> Dict[str, Any]:
+        """
+        Generate one topic of a batch (the job handler).
+
+        Args:
+            user_id: The user the module is generated for
+            topic: The topic
+            level: The module level
+
+        Returns:
+            Dict[str, Any]: The generate function's result
+
+        Raises:
+            JobDeferred: If the user already has as many topics running as allowed
+        """
+        # This job's own lease is counted too
+        if self.jobs.count_running(JOB_KIND, 'user_id', user_id) > self.per_user_limit:
+            with self._lock:
+                self._stats['deferred'] += 1
+            # Jitter keeps deferred topics of the same user from waking up together
+            raise JobDeferred(random.uniform(self.defer_seconds / 2, self.defer_seconds), 'per-user limit reached')
+
+        try:
+            result = self.generate(user_id, topic, level)
+        except Exception as e:
+            print(f"Error generating module for topic {topic}: {str(e)}")
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+
+        with self._lock:
+            self._stats['completed'] += 1
+        return result
+
+    def wait(self, batch_id: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for every topic of a batch to finish.
+
+        Args:
+            batch_id: The batch ID returned by submit()
+            timeout: Seconds to wait at most (None waits indefinitely)
+
+        Returns:
+            Optional[Dict[str, Any]]: The batch record (possibly still running if the
+            timeout expired), or None if the batch is unknown
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while True:
+            batch = self.get_batch(batch_id)
+            if batch is None or batch['status'] == 'completed':
+                return batch
+            if deadline is not None and time.time() >= deadline:
+                return batch
+            remaining = deadline - time.time() if deadline is not None else self.poll_interval
+            time.sleep(max(min(self.poll_interval, remaining), 0))
+
+    def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the per-topic status of a batch from its job rows.
+
+        Args:
+            batch_id: The batch ID returned by submit()
+
+        Returns:
+            Optional[Dict[str, Any]]: The batch record or None if unknown (or purged)
+        """
+        jobs = self.jobs.get_group(batch_id)
+        if not jobs:
+            return None
+
+        topics = [{
+            'topic': job['payload']['topic'],
+            'status': TOPIC_STATUSES.get(job['status'], job['status']),
+            'result': job['result'],
+            'error': job['error'] if job['status'] == 'failed' else None,
+            'job_id': job['id']
+        } for job in jobs]
+        counts = {status: sum(topic['status'] == status for topic in topics)
+                  for status in ('queued', 'running', 'completed', 'failed')}
+        finished = counts['completed'] + counts['failed'] == len(topics)
+
+        return {
+            'id': batch_id,
+            'user_id': jobs[0]['payload']['user_id'],
+            'level': jobs[0]['payload']['level'],
+            'status': 'completed' if finished else 'running',
+            'created_at': jobs[0]['created_at'],
+            'finished_at': max(job['updated_at'] for job in jobs) if finished else None,
+            'counts': counts,
+            'topics': topics
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get fan-out counters for this process.
+
+        Returns:
+            Dict[str, Any]: Batches and topics accepted, topics rejected and topic attempt outcomes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['per_user_limit'] = self.per_user_limit
+        return stats
@@ -0,0 +1,222 @@
+"""
+Module Warmer Module
+
+This module pre-generates lessons and quizzes for the most popular topics
+during off-peak hours. Topic popularity is counted from user interests and
+existing modules; for the top-N topics, every level that is not already
+cached is generated and stored in the module cache, most popular topics
+first, until the nightly token budget is spent.
+
+Requests for a warmed topic are then answered from the cache, so the LLM
+sees a steady off-peak load instead of onboarding spikes.
+"""
+
+import os
+import time
+import fcntl
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Iterable, Callable, Tuple
+
+from module_cache import normalize_topic
+
+LEVELS = ('Basic', 'Moderate', 'Advanced')
+
+DEFAULT_LOCK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'module_warmer.lock')
+
+
+def rank_topics(topics: Iterable[str], top_n: int) -> List[str]:
+    """
+    Rank topics by popularity.
+
+    Spellings that normalize to the same topic are counted together, and the
+    most common spelling is returned.
+
+    Args:
+        topics: One entry per user interest or module
+        top_n: Number of topics to return
+
+    Returns:
+        List[str]: The top-N topics, most popular first
+    """
+    counts = Counter()
+    spellings = defaultdict(Counter)
+    for topic in topics:
+        normalized = normalize_topic(topic)
+        if normalized:
+            counts[normalized] += 1
+            spellings[normalized][str(topic).strip()] += 1
+
+    ranked = sorted(counts, key=lambda normalized: (-counts[normalized], normalized))[:top_n]
+    return [spellings[normalized].most_common(1)[0][0] for normalized in ranked]
+
+
+def seconds_until(hour: int, now: Optional[datetime] = None) -> float:
+    """
+    Get the number of seconds until the next occurrence of an hour of the day.
+
+    Args:
+        hour: Hour of the day (0-23, local time)
+        now: The current time (defaults to now)
+
+    Returns:
+        float: Seconds until that hour
+    """
+    now = now or datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
+class ModuleWarmer:
+    """
+    Scheduled job that fills the module cache for popular topics.
+
+    generate_lesson(topic, level) and generate_quiz(topic, level, html) return
+    the generated content and the number of tokens the call used. Only one
+    process on the machine warms at a time.
+    """
+
+    def __init__(self, fetch_topics: Callable[[], List[str]],
+                 generate_lesson: Callable[[str, str], Tuple[str, int]],
+                 generate_quiz: Callable[[str, str, str], Tuple[List[Dict[str, Any]], int]],
+                 cache, make_key: Callable[[str, str], str], enabled: bool = None, top_n: int = None,
+                 token_budget: int = None, run_hour: int = None, lock_path: str = None):
+        """
+        Initialize the warmer.
+
+        Args:
+            fetch_topics: Returns one topic entry per user interest and module
+            generate_lesson: Generates lesson HTML for a topic and level
+            generate_quiz: Generates quiz questions for a lesson
+            cache: The ModuleCache to fill
+            make_key: Returns the module cache key for a topic and level
+            enabled: Whether the nightly run is scheduled
+            top_n: Number of most popular topics to warm
+            token_budget: Maximum tokens spent per run
+            run_hour: Local hour of the day the run starts
+            lock_path: File locked while a run is in progress
+        """
+        self.fetch_topics = fetch_topics
+        self.generate_lesson = generate_lesson
+        self.generate_quiz = generate_quiz
+        self.cache = cache
+        self.make_key = make_key
+        self.enabled = enabled if enabled is not None else \
+            os.getenv('WARMER_ENABLED', 'False').lower() in ('true', '1', 't')
+        self.top_n = top_n or int(os.getenv('WARMER_TOP_N', 20))
+        self.token_budget = token_budget or int(os.getenv('WARMER_TOKEN_BUDGET', 500000))
+        self.run_hour = run_hour if run_hour is not None else int(os.getenv('WARMER_RUN_HOUR', 3))
+        self.lock_path = lock_path or os.getenv('WARMER_LOCK_PATH', DEFAULT_LOCK_PATH)
+        self._timer = None
+        self._next_run_at = None
+        self._last_report = None
+        self._runs = 0
+        # Tokens used by the most recent call of each kind, used to predict the next one
+        self._last_cost = {'lesson': 0, 'quiz': 0}
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Warm the cache for the most popular topics within the token budget.
+
+        Returns:
+            Dict[str, Any]: Report of what was generated, skipped and spent
+        """
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        with open(self.lock_path, 'w') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return {'skipped': 'Another process is already warming the cache'}
+            try:
+                report = self._warm()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self._runs += 1
+        self._last_report = report
+        return report
+
+    def _warm(self) -> Dict[str, Any]:
+        """Generate missing lessons and quizzes, most popular topics first."""
+        started = time.time()
+        topics = rank_topics(self.fetch_topics(), self.top_n)
+        report = {'started_at': datetime.fromtimestamp(started).isoformat(), 'topics': len(topics),
+                  'lessons_generated': 0, 'quizzes_generated': 0, 'already_cached': 0, 'failed': 0,
+                  'tokens_spent': 0, 'budget_exhausted': False}
+
+        for topic in topics:
+            for level in LEVELS:
+                key = self.make_key(topic, level)
+                html = self.cache.get(key)
+                needs_quiz = self.cache.get_quiz(key) is None
+                if html is not None and not needs_quiz:
+                    report['already_cached'] += 1
+                    continue
+
+                expected = (self._last_cost['lesson'] if html is None else 0) + self._last_cost['quiz']
+                if report['tokens_spent'] + expected > self.token_budget or report['tokens_spent'] >= self.token_budget:
+                    report['budget_exhausted'] = True
+                    break
+
+                try:
+                    if html is None:
+                        html, tokens = self.generate_lesson(topic, level)
+                        self._spend(report, 'lesson', tokens)
+                        self.cache.put(key, html)
+                        report['lessons_generated'] += 1
+                    questions, tokens = self.generate_quiz(topic, level, html)
+                    self._spend(report, 'quiz', tokens)
+                    self.cache.put_quiz(key, questions)
+                    report['quizzes_generated'] += 1
+                except Exception as e:
+                    print(f"Error warming {level} module for {topic}: {str(e)}")
+                    report['failed'] += 1
+
+            if report['budget_exhausted']:
+                break
+
+        report['duration_seconds'] = round(time.time() - started, 1)
+        return report
+
+    def _spend(self, report: Dict[str, Any], kind: str, tokens: int):
+        """Charge a call's tokens to the run and remember its cost."""
+        report['tokens_spent'] += tokens
+        self._last_cost[kind] = tokens
+
+    def schedule(self):
+        """Schedule the next run at the configured hour, if warming is enabled."""
+        if not self.enabled:
+            return
+        delay = seconds_until(self.run_hour)
+        self._next_run_at = time.time() + delay
+        self._timer = threading.Timer(delay, self._scheduled_run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _scheduled_run(self):
+        """Timer callback: warm the cache, then schedule the next night's run."""
+        try:
+            report = self.run()
+            print(f"Module warming finished: {report}")
+        except Exception as e:
+            print(f"Error warming module cache: {str(e)}")
+        finally:
+            self.schedule()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get the warmer schedule and the report of the last run.
+
+        Returns:
+            Dict[str, Any]: Whether warming is enabled, run count, next run time and last report
+        """
+        return {
+            'enabled': self.enabled,
+            'runs': self._runs,
+            'token_budget': self.token_budget,
+            'next_run_at': datetime.fromtimestamp(self._next_run_at).isoformat() if self._next_run_at else None,
+            'last_run': self._last_report
+        }
@@ -0,0 +1,193 @@
+"""
+Pre-Grader Module
+
+This module provides a local fast-path scorer for free-text quiz answers.
+Every generated free_text question carries key_points; the pre-grader
+measures how many of those points the student's answer covers using token
+overlap over stemmed, stop-word-filtered terms.
+
+Clear passes and clear fails are settled locally. Only ambiguous answers
+are escalated to Gemini for a full evaluation.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, Any, Optional, List, Set
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'for', 'from', 'has', 'have',
+    'how', 'in', 'into', 'is', 'it', 'its', 'of', 'on', 'or', 'so', 'such', 'that', 'the',
+    'their', 'them', 'they', 'this', 'to', 'was', 'were', 'what', 'when', 'which', 'who',
+    'will', 'with', 'you', 'your'
+}
+
+# Suffixes stripped by the light stemmer, longest first
+SUFFIXES = ('ization', 'ational', 'fulness', 'ations', 'ation', 'ments', 'ment', 'ness',
+            'ings', 'ing', 'ies', 'ied', 'ers', 'er', 'ed', 'ly', 's')
+
+
+def stem(word: str) -> str:
+    """
+    Reduce a word to a rough stem so inflected forms match.
+
+    Args:
+        word: A lower-cased word
+
+    Returns:
+        str: The word with a common suffix removed
+    """
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def key_terms(text: str) -> Set[str]:
+    """
+    Extract the stemmed content terms of a text.
+
+    Args:
+        text: Any text
+
+    Returns:
+        Set[str]: Stemmed words with stop words and single characters removed
+    """
+    words = re.findall(r'[a-z0-9]+', str(text).lower())
+    return {stem(word) for word in words if word not in STOP_WORDS and len(word) > 1}
+
+
+class PreGrader:
+    """
+    Singleton class for scoring free-text answers against their key points.
+
+    A key point counts as covered when enough of its terms appear in the answer.
+    Coverage at or above the pass threshold, or at or below the fail threshold,
+    is decided locally; anything in between, and any answer too short to pass
+    locally that is not a clear fail, is escalated.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PreGrader, cls).__new__(cls)
+            cls._instance._configure(
+                enabled=os.getenv('PREGRADER_ENABLED', 'True').lower() in ('true', '1', 't'),
+                pass_threshold=float(os.getenv('PREGRADER_PASS_THRESHOLD', 0.8)),
+                fail_threshold=float(os.getenv('PREGRADER_FAIL_THRESHOLD', 0.1)),
+                point_threshold=float(os.getenv('PREGRADER_POINT_THRESHOLD', 0.6)),
+                min_words=int(os.getenv('PREGRADER_MIN_WORDS', 3))
+            )
+        return cls._instance
+
+    def _configure(self, enabled: bool, pass_threshold: float, fail_threshold: float,
+                   point_threshold: float, min_words: int):
+        """
+        (Re)initialize the thresholds and reset the counters.
+
+        Args:
+            enabled: Whether answers are pre-graded at all
+            pass_threshold: Key point coverage at or above which an answer clearly passes
+            fail_threshold: Key point coverage at or below which an answer clearly fails
+            point_threshold: Fraction of a key point's terms that must appear for it to count as covered
+            min_words: Answers with fewer words are never passed locally
+        """
+        self.enabled = enabled
+        self.pass_threshold = pass_threshold
+        self.fail_threshold = fail_threshold
+        self.point_threshold = point_threshold
+        self.min_words = min_words
+        self._lock = threading.Lock()
+        self._stats = {'passed': 0, 'failed': 0, 'escalated': 0}
+
+    def covered_points(self, answer: Any, key_points: List[str]) -> List[bool]:
+        """
+        Check which key points an answer covers.
+
+        Args:
+            answer: The student's answer
+            key_points: The question's key points
+
+        Returns:
+            List[bool]: Whether each key point is covered
+        """
+        answer_terms = key_terms(answer)
+        covered = []
+        for point in key_points:
+            point_terms = key_terms(point)
+            if not point_terms:
+                covered.append(False)
+                continue
+            overlap = len(point_terms & answer_terms) / len(point_terms)
+            covered.append(overlap >= self.point_threshold)
+        return covered
+
+    def grade(self, answer: Any, key_points: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Settle an answer locally if the outcome is clear.
+
+        Args:
+            answer: The student's answer
+            key_points: The question's key points
+
+        Returns:
+            Optional[Dict[str, Any]]: Score and feedback for a clear pass or fail,
+            or None if the answer should be escalated to the LLM
+        """
+        if not self.enabled or not key_points:
+            return None
+
+        covered = self.covered_points(answer, key_points)
+        coverage = sum(covered) / len(covered)
+        too_short = len(str(answer).split()) < self.min_words
+
+        missing = [point for point, is_covered in zip(key_points, covered) if not is_covered]
+
+        if coverage >= self.pass_threshold and not too_short:
+            outcome = 'passed'
+            feedback = "Your answer covers the key points: " + "; ".join(key_points)
+        elif coverage <= self.fail_threshold and missing:
+            outcome = 'failed'
+            feedback = "Your answer is missing key points: " + "; ".join(missing)
+        else:
+            # Includes terse answers that name the key points: only the LLM can tell
+            # whether they show understanding
+            with self._lock:
+                self._stats['escalated'] += 1
+            return None
+
+        with self._lock:
+            self._stats[outcome] += 1
+        return {
+            "score": round(coverage * 100),
+            "feedback": feedback,
+            "graded_by": "pre_grader"
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get counters for how often the LLM was skipped.
+
+        Returns:
+            Dict[str, Any]: Local passes, local fails, escalations and the skip rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['passed'] + stats['failed'] + stats['escalated']
+        stats['llm_skipped'] = stats['passed'] + stats['failed']
+        stats['skip_rate'] = stats['llm_skipped'] / total if total else 0.0
+        return stats
+
+
+# Create a singleton instance
+pre_grader = PreGrader()
+
+def get_pre_grader() -> PreGrader:
+    """
+    Get the PreGrader singleton instance.
+
+    Returns:
+        PreGrader: The PreGrader singleton instance
+    """
+    return pre_grader
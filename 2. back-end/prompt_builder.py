@@ -0,0 +1,315 @@
+"""
+Prompt Builder Module
+
+This module builds the quiz generation prompt (Prompt 1.2) within a token
+budget. Instead of pasting the full generated lesson HTML into the prompt,
+the lesson is reduced to plain text blocks with the markup and boilerplate
+removed. If it is still over the budget for the module's level, the
+lowest-value paragraphs are dropped while headings and the paragraphs that
+carry the lesson's key terms are kept.
+
+Token counts are estimated locally, and the builder reports the input token
+counts of the prompts it produced.
+"""
+
+import os
+import re
+import threading
+from html.parser import HTMLParser
+from typing import Dict, Any, List, Tuple
+
+# Average characters per token for English text in Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+# Elements whose text is never useful in a prompt
+SKIPPED_TAGS = {'script', 'style', 'head', 'nav', 'footer', 'button', 'form', 'svg'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+BLOCK_TAGS = HEADING_TAGS | {'p', 'li', 'div', 'section', 'article', 'blockquote', 'pre', 'tr', 'br', 'ul', 'ol', 'table'}
+KEY_TERM_TAGS = {'strong', 'b', 'em', 'dfn'}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text.
+
+    Args:
+        text: Any text
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return max(len(text) // CHARS_PER_TOKEN, len(text.split()))
+
+
+class _LessonParser(HTMLParser):
+    """Splits lesson HTML into text blocks and collects emphasized key terms."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []  # List of (kind, text) where kind is "heading", "item" or "text"
+        self.key_terms = []
+        self._parts = []
+        self._kind = 'text'
+        self._skip_depth = 0
+        self._term_depth = 0
+        self._term_parts = []
+
+    def _end_block(self):
+        text = ' '.join(''.join(self._parts).split())
+        if text:
+            self.blocks.append((self._kind, text))
+        self._parts = []
+        self._kind = 'text'
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+            if tag in HEADING_TAGS:
+                self._kind = 'heading'
+            elif tag == 'li':
+                self._kind = 'item'
+        elif tag in KEY_TERM_TAGS:
+            self._term_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+        elif tag in KEY_TERM_TAGS and self._term_depth:
+            self._term_depth -= 1
+            if not self._term_depth:
+                term = ' '.join(''.join(self._term_parts).split()).strip(' :.,;')
+                if term:
+                    self.key_terms.append(term)
+                self._term_parts = []
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        self._parts.append(data)
+        if self._term_depth:
+            self._term_parts.append(data)
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+
+def html_to_blocks(html: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    Convert lesson HTML into plain text blocks.
+
+    Markup, non-content elements and repeated blocks are removed.
+
+    Args:
+        html: The generated lesson HTML
+
+    Returns:
+        Tuple[List[Tuple[str, str]], List[str]]: The (kind, text) blocks and the
+        distinct emphasized key terms
+    """
+    parser = _LessonParser()
+    parser.feed(html or '')
+    parser.close()
+
+    seen = set()
+    blocks = []
+    for kind, text in parser.blocks:
+        if text.lower() in seen:
+            continue
+        seen.add(text.lower())
+        blocks.append((kind, text))
+
+    key_terms = list(dict.fromkeys(term for term in parser.key_terms if len(term) <= 80))
+    return blocks, key_terms
+
+
+def _render(blocks: List[Tuple[str, str]]) -> str:
+    """Render text blocks as compact Markdown-like text."""
+    lines = []
+    for kind, text in blocks:
+        if kind == 'heading':
+            lines.append(f"## {text}")
+        elif kind == 'item':
+            lines.append(f"- {text}")
+        else:
+            lines.append(text)
+    return '\n'.join(lines)
+
+
+def _truncate_sentences(text: str, max_tokens: int) -> str:
+    """Keep the leading sentences of a text that fit in max_tokens."""
+    kept = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text):
+        if estimate_tokens(' '.join(kept + [sentence])) > max_tokens:
+            break
+        kept.append(sentence)
+    return ' '.join(kept)
+
+
+def fit_to_budget(blocks: List[Tuple[str, str]], key_terms: List[str], max_tokens: int) -> str:
+    """
+    Reduce lesson blocks to fit a token budget.
+
+    Headings are always kept. Other blocks are ranked by how many key terms
+    they mention (ties go to earlier blocks) and added until the budget is
+    used up; the result keeps the original document order.
+
+    Args:
+        blocks: The (kind, text) blocks from html_to_blocks()
+        key_terms: The lesson's emphasized key terms
+        max_tokens: The token budget for the lesson content
+
+    Returns:
+        str: The lesson text within the budget
+    """
+    text = _render(blocks)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    lowered_terms = [term.lower() for term in key_terms]
+    used = sum(estimate_tokens(block_text) + 1 for kind, block_text in blocks if kind == 'heading')
+    ranked = sorted(
+        (i for i, (kind, _) in enumerate(blocks) if kind != 'heading'),
+        key=lambda i: (-sum(term in blocks[i][1].lower() for term in lowered_terms), i)
+    )
+
+    kept = {i: text for i, (kind, text) in enumerate(blocks) if kind == 'heading'}
+    for i in ranked:
+        remaining = max_tokens - used
+        if remaining <= 0:
+            break
+        block_text = blocks[i][1]
+        if estimate_tokens(block_text) > remaining:
+            # Keep the opening sentences of a block that does not fit whole
+            block_text = _truncate_sentences(block_text, remaining)
+            if not block_text:
+                continue
+        kept[i] = block_text
+        used += estimate_tokens(block_text) + 1
+
+    return _render([(blocks[i][0], kept[i]) for i in sorted(kept)])
+
+
+class PromptBuilder:
+    """
+    Singleton class for building token-budgeted quiz generation prompts.
+
+    Budgets are configured per module level and counters of the prompt
+    tokens produced are kept for reporting.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(PromptBuilder, cls).__new__(cls)
+            cls._instance._configure({
+                'Basic': int(os.getenv('QUIZ_PROMPT_TOKEN_BUDGET_BASIC', 1500)),
+                'Moderate': int(os.getenv('QUIZ_PROMPT_TOKEN_BUDGET_MODERATE', 2500)),
+                'Advanced': int(os.getenv('QUIZ_PROMPT_TOKEN_BUDGET_ADVANCED', 3500))
+            })
+        return cls._instance
+
+    def _configure(self, budgets: Dict[str, int]):
+        """
+        (Re)initialize the per-level content budgets and reset the counters.
+
+        Args:
+            budgets: Map of module level to the token budget for lesson content
+        """
+        self.budgets = budgets
+        self._lock = threading.Lock()
+        self._stats = {'prompts': 0, 'trimmed': 0, 'content_tokens_in': 0, 'content_tokens_out': 0, 'prompt_tokens': 0}
+
+    def build_quiz_prompt(self, topic: str, level: str, html_content: str) -> Tuple[str, Dict[str, int]]:
+        """
+        Build the quiz generation prompt for a module.
+
+        Args:
+            topic: The module topic
+            level: The module level (Basic/Moderate/Advanced)
+            html_content: The generated lesson HTML
+
+        Returns:
+            Tuple[str, Dict[str, int]]: The prompt and its token counts
+            (content_tokens_in, content_tokens_out, prompt_tokens)
+        """
+        blocks, key_terms = html_to_blocks(html_content)
+        budget = self.budgets.get(level, self.budgets.get('Basic', 1500))
+        content = fit_to_budget(blocks, key_terms, budget)
+
+        prompt = f"""
+    You are an expert financial educator. Create a comprehensive quiz about {topic} at {level} level based on this content:
+
+    {content}
+
+    Create a quiz with the following specifications:
+    1. Include 5 multiple-choice questions (MCQs) with 4 options each
+    2. Include 2 free-text questions that require short paragraph answers
+
+    Format your response as a JSON object with this exact structure:
+    {{
+      "questions": [
+        {{
+          "id": "q1",
+          "type": "mcq",
+          "question": "Question text here?",
+          "options": ["Option A", "Option B", "Option C", "Option D"],
+          "correct_answer": 0,
+          "explanation": "Explanation of the correct answer"
+        }},
+        {{
+          "id": "q2",
+          "type": "free_text",
+          "question": "Question text here?",
+          "sample_answer": "A sample correct answer to help with grading",
+          "key_points": ["Key point 1", "Key point 2", "Key point 3"]
+        }}
+      ]
+    }}
+
+    Ensure all questions are directly related to the content provided and appropriate for the {level} difficulty level.
+    """
+
+        token_counts = {
+            'content_tokens_in': estimate_tokens(html_content),
+            'content_tokens_out': estimate_tokens(content),
+            'prompt_tokens': estimate_tokens(prompt)
+        }
+        with self._lock:
+            self._stats['prompts'] += 1
+            if content != _render(blocks):
+                self._stats['trimmed'] += 1
+            for key, value in token_counts.items():
+                self._stats[key] += value
+
+        return prompt, token_counts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get counters of the prompts built.
+
+        Returns:
+            Dict[str, Any]: Prompt counts and total input token counts
+        """
+        with self._lock:
+            return dict(self._stats)
+
+
+# Create a singleton instance
+prompt_builder = PromptBuilder()
+
+def get_prompt_builder() -> PromptBuilder:
+    """
+    Get the PromptBuilder singleton instance.
+
+    Returns:
+        PromptBuilder: The PromptBuilder singleton instance
+    """
+    return prompt_builder
@@ -0,0 +1,203 @@
+"""
+Speculation Module
+
+This module provides speculative next-level module generation. While a
+user works through a Basic or Moderate quiz, their running score is
+checked after each answer on a background thread, off the request path;
+once passing looks likely, the next level's lesson and quiz for the topic
+are prepared in the background. By the time the final answer unlocks the
+next level, the module is already cached and can be created without
+waiting on Gemini.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+NEXT_LEVELS = {'Basic': 'Moderate', 'Moderate': 'Advanced'}
+
+# Modules remembered as already decided, so their progress is not reloaded on every answer
+MAX_DECIDED_MODULES = 10000
+
+# Progress checks waiting for the background thread; more are dropped until it catches up
+MAX_PENDING_CHECKS = 1000
+
+
+def passing_likely(scores: List[float], question_count: int, threshold: float, min_answered_fraction: float) -> bool:
+    """
+    Decide whether a partially answered quiz is likely to be passed.
+
+    Args:
+        scores: Scores (0-100) of the answers so far
+        question_count: Number of questions in the quiz
+        threshold: Final percentage needed to pass
+        min_answered_fraction: Share of the questions that must be answered before predicting
+
+    Returns:
+        bool: True if enough questions are answered and the running average passes
+    """
+    if not scores or question_count <= 0:
+        return False
+    if len(scores) / question_count < min_answered_fraction:
+        return False
+    return sum(scores) / len(scores) >= threshold
+
+
+class SpeculativeGenerator:
+    """
+    Queues preparation of the next level's module when passing is likely.
+
+    load_progress(user_id, module_id) returns the module's topic, its level
+    and the user's answer scores so far. prepare(topic, level) queues the
+    background preparation and returns its job ID. consider() only schedules
+    the check; check() runs it on the speculation thread.
+    """
+
+    def __init__(self, load_progress: Callable[[str, str], Tuple[str, str, List[float]]],
+                 prepare: Callable[[str, str], Optional[str]], enabled: bool = None, threshold: float = None,
+                 min_answered_fraction: float = None, dedupe_seconds: float = None):
+        """
+        Initialize the generator.
+
+        Args:
+            load_progress: Loads (topic, level, scores) for a user's module
+            prepare: Queues preparation of a topic's module at a level
+            enabled: Whether speculation is active
+            threshold: Running percentage at which passing counts as likely
+            min_answered_fraction: Share of the questions answered before predicting
+            dedupe_seconds: How long a queued topic and level is not queued again
+        """
+        self.load_progress = load_progress
+        self.prepare = prepare
+        self.enabled = enabled if enabled is not None else \
+            os.getenv('SPECULATION_ENABLED', 'True').lower() in ('true', '1', 't')
+        self.threshold = threshold if threshold is not None else float(os.getenv('SPECULATION_THRESHOLD', 80))
+        self.min_answered_fraction = min_answered_fraction if min_answered_fraction is not None else \
+            float(os.getenv('SPECULATION_MIN_ANSWERED_FRACTION', 0.5))
+        self.dedupe_seconds = dedupe_seconds if dedupe_seconds is not None else \
+            float(os.getenv('SPECULATION_DEDUPE_SECONDS', 3600))
+        self._lock = threading.Lock()
+        self._decided = OrderedDict()  # Map of module ID to the job ID queued for it (None if nothing to do)
+        self._queued = {}  # Map of (topic, level) to when this process last queued it
+        self._pending = set()  # Module IDs with a check waiting for the background thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='speculation')
+        self._stats = {'checks': 0, 'queued': 0, 'already_queued': 0, 'dropped': 0, 'errors': 0}
+
+    def _decide(self, module_id: str, job_id: Optional[str]):
+        """Remember that a module needs no further checks. Caller holds the lock."""
+        self._decided[module_id] = job_id
+        while len(self._decided) > MAX_DECIDED_MODULES:
+            self._decided.popitem(last=False)
+
+    def consider(self, user_id: str, module_id: str, question_count: int) -> bool:
+        """
+        Schedule a check of a user's progress on a quiz, without waiting for it.
+
+        Never raises: speculation must not break answer submission.
+
+        Args:
+            user_id: The user answering the quiz
+            module_id: The module the quiz belongs to
+            question_count: Number of questions in the quiz
+
+        Returns:
+            bool: True if a check was scheduled
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if module_id in self._decided or module_id in self._pending:
+                return False
+            if len(self._pending) >= MAX_PENDING_CHECKS:
+                self._stats['dropped'] += 1
+                return False
+            self._pending.add(module_id)
+
+        try:
+            self._executor.submit(self._run_check, user_id, module_id, question_count)
+        except Exception as e:
+            print(f"Error scheduling speculation for module {module_id}: {str(e)}")
+            with self._lock:
+                self._pending.discard(module_id)
+            return False
+        return True
+
+    def _run_check(self, user_id: str, module_id: str, question_count: int):
+        """Run a scheduled check and let the module be scheduled again."""
+        try:
+            self.check(user_id, module_id, question_count)
+        finally:
+            with self._lock:
+                self._pending.discard(module_id)
+
+    def check(self, user_id: str, module_id: str, question_count: int) -> Optional[str]:
+        """
+        Check a user's progress on a quiz and queue the next level if passing is likely.
+
+        Never raises.
+
+        Args:
+            user_id: The user answering the quiz
+            module_id: The module the quiz belongs to
+            question_count: Number of questions in the quiz
+
+        Returns:
+            Optional[str]: The preparation job ID if one was queued by this call
+        """
+        with self._lock:
+            if module_id in self._decided:
+                return None
+            self._stats['checks'] += 1
+
+        target = None
+        try:
+            topic, level, scores = self.load_progress(user_id, module_id)
+            next_level = NEXT_LEVELS.get(level)
+            if not next_level:
+                with self._lock:
+                    self._decide(module_id, None)
+                return None
+
+            if not passing_likely(scores, question_count, self.threshold, self.min_answered_fraction):
+                return None
+
+            target = (topic.strip().lower(), next_level)
+            now = time.time()
+            with self._lock:
+                if now - self._queued.get(target, 0) < self.dedupe_seconds:
+                    self._stats['already_queued'] += 1
+                    self._decide(module_id, None)
+                    return None
+                self._queued = {key: at for key, at in self._queued.items() if now - at < self.dedupe_seconds}
+                self._queued[target] = now
+
+            job_id = self.prepare(topic, next_level)
+            with self._lock:
+                self._stats['queued'] += 1
+                self._decide(module_id, job_id)
+            return job_id
+
+        except Exception as e:
+            print(f"Error speculating next level for module {module_id}: {str(e)}")
+            with self._lock:
+                self._stats['errors'] += 1
+                # Let a later answer try again
+                if target is not None:
+                    self._queued.pop(target, None)
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get speculation counters.
+
+        Returns:
+            Dict[str, Any]: Progress checks, preparations queued and errors
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['enabled'] = self.enabled
+        return stats
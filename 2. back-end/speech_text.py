@@ -0,0 +1,265 @@
+"""
+Speech Text Module
+
+This module turns generated lesson HTML into the text sent to text-to-speech.
+The HTML is read in a single pass: markup and non-spoken elements are
+dropped, headings and list items end with a pause, and the inline LaTeX the
+lesson prompts produce (\\( ... \\), \\[ ... \\], $$ ... $$) is read out as
+words, e.g. "\\frac{FV}{(1 + r)^n}" becomes "FV over (1 plus r) to the power
+of n".
+
+Headings and paragraphs are separated by blank lines, which the TTS pipeline
+treats as chunk boundaries. Results are memoized by a hash of the HTML, so
+repeat listens of a module skip the parse.
+"""
+
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from html.parser import HTMLParser
+from typing import Dict, Any, Optional
+
+from prompt_builder import SKIPPED_TAGS, HEADING_TAGS
+
+# Elements that start a new spoken paragraph
+PARAGRAPH_TAGS = HEADING_TAGS | {'p', 'div', 'section', 'article', 'blockquote', 'pre', 'table', 'ul', 'ol'}
+# Elements read as separate lines of one paragraph
+LINE_TAGS = {'li', 'tr', 'br', 'dt', 'dd'}
+CELL_TAGS = {'td', 'th'}
+
+# Punctuation that already ends a sentence when spoken
+PAUSE_PUNCTUATION = '.!?:;'
+
+# Inline and display math delimiters; single dollars only when the math has LaTeX commands,
+# so dollar amounts are left alone
+MATH_SPANS = re.compile(r'\\\((.+?)\\\)|\\\[(.+?)\\\]|\$\$(.+?)\$\$|\$([^$]*\\[a-zA-Z][^$]*)\$', re.DOTALL)
+# Escapes the lesson text uses outside math
+TEXT_ESCAPES = re.compile(r'\\([%$&#])')
+SPACE_BEFORE_PUNCTUATION = re.compile(r'\s+([.,!?;:])')
+
+LATEX_WORDS = {
+    'times': ' times ', 'cdot': ' times ', 'div': ' divided by ', 'pm': ' plus or minus ',
+    'approx': ' is approximately ', 'neq': ' is not equal to ', 'ne': ' is not equal to ',
+    'leq': ' is at most ', 'le': ' is at most ', 'geq': ' is at least ', 'ge': ' is at least ',
+    'lt': ' is less than ', 'gt': ' is greater than ', 'sum': ' the sum of ', 'prod': ' the product of ',
+    'infty': ' infinity ', 'Delta': ' change in ', 'ldots': ' and so on ', 'dots': ' and so on ',
+    'cdots': ' and so on ', '%': ' percent', '$': '$', '&': ' and ', '_': '_', ',': ' ', ';': ' ',
+    'quad': ' ', 'qquad': ' ', '!': ''
+}
+# Commands whose argument is read as it is
+UNWRAPPED_COMMANDS = {'text', 'textbf', 'textit', 'mathrm', 'mathbf', 'mathit', 'operatorname', 'left', 'right', 'displaystyle'}
+POWER_WORDS = {'2': ' squared', '3': ' cubed'}
+OPERATOR_WORDS = {'=': ' equals ', '+': ' plus ', '-': ' minus ', '/': ' divided by ', '<': ' is less than ', '>': ' is greater than '}
+
+
+def _read_group(math: str, start: int):
+    """Read a {...} group or a single character at start, returning its text and the next index."""
+    while start < len(math) and math[start] == ' ':
+        start += 1
+    if start >= len(math):
+        return '', start
+    if math[start] != '{':
+        if math[start] == '\\':
+            match = re.match(r'\\([a-zA-Z]+|.)', math[start:])
+            return match.group(0), start + match.end()
+        return math[start], start + 1
+
+    depth = 0
+    for index in range(start, len(math)):
+        if math[index] == '{':
+            depth += 1
+        elif math[index] == '}':
+            depth -= 1
+            if not depth:
+                return math[start + 1:index], index + 1
+    return math[start + 1:], len(math)
+
+
+def latex_to_speech(math: str) -> str:
+    """
+    Read a LaTeX math expression as words.
+
+    Args:
+        math: The expression without its delimiters
+
+    Returns:
+        str: The expression as spoken text
+    """
+    words = []
+    index = 0
+    while index < len(math):
+        char = math[index]
+        if char == '\\':
+            match = re.match(r'\\([a-zA-Z]+|.)', math[index:])
+            command = match.group(1)
+            index += match.end()
+            if command == 'frac':
+                numerator, index = _read_group(math, index)
+                denominator, index = _read_group(math, index)
+                words.append(f" {latex_to_speech(numerator)} over {latex_to_speech(denominator)} ")
+            elif command == 'sqrt':
+                radicand, index = _read_group(math, index)
+                words.append(f" the square root of {latex_to_speech(radicand)} ")
+            elif command in UNWRAPPED_COMMANDS:
+                if math[index:index + 1] == '{':
+                    argument, index = _read_group(math, index)
+                    words.append(latex_to_speech(argument) if command not in ('text', 'operatorname') else argument)
+            elif command in LATEX_WORDS:
+                words.append(LATEX_WORDS[command])
+            else:
+                # Greek letters and other named symbols are read by name
+                words.append(f" {command} ")
+        elif char in '^_':
+            group, index = _read_group(math, index + 1)
+            spoken = latex_to_speech(group).strip()
+            if char == '_':
+                words.append(f" sub {spoken} ")
+            else:
+                words.append(POWER_WORDS.get(spoken, f" to the power of {spoken} "))
+        elif char in OPERATOR_WORDS:
+            words.append(OPERATOR_WORDS[char])
+            index += 1
+        elif char in '{}':
+            index += 1
+        else:
+            words.append(char)
+            index += 1
+    return ' '.join(''.join(words).split())
+
+
+def _speak_math(match: re.Match) -> str:
+    """Replace one delimited math span with its spoken form."""
+    math = next(group for group in match.groups() if group is not None)
+    return f" {latex_to_speech(math)} "
+
+
+class _SpeechParser(HTMLParser):
+    """Collects the spoken text of lesson HTML as paragraphs of lines."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.paragraphs = []
+        self._lines = []
+        self._parts = []
+        self._pause = False
+        self._skip_depth = 0
+
+    def _end_line(self):
+        text = ' '.join(''.join(self._parts).split())
+        if text:
+            text = TEXT_ESCAPES.sub(r'\1', MATH_SPANS.sub(_speak_math, text))
+            text = SPACE_BEFORE_PUNCTUATION.sub(r'\1', ' '.join(text.split()))
+            if self._pause and text[-1] not in PAUSE_PUNCTUATION:
+                text += '.'
+            self._lines.append(text)
+        self._parts = []
+        self._pause = False
+
+    def _end_paragraph(self):
+        self._end_line()
+        if self._lines:
+            self.paragraphs.append('\n'.join(self._lines))
+        self._lines = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag in PARAGRAPH_TAGS:
+            self._end_paragraph()
+            self._pause = tag in HEADING_TAGS
+        elif tag in LINE_TAGS:
+            self._end_line()
+            self._pause = tag in ('li', 'tr')
+        elif tag in CELL_TAGS and self._parts:
+            self._parts.append(', ')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in PARAGRAPH_TAGS:
+            self._end_paragraph()
+        elif tag in LINE_TAGS:
+            self._end_line()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def close(self):
+        super().close()
+        self._end_paragraph()
+
+
+def html_to_speech_text(html: str) -> str:
+    """
+    Convert lesson HTML into the text to speak.
+
+    Args:
+        html: The generated lesson HTML
+
+    Returns:
+        str: Paragraphs separated by blank lines, with headings and list items ending in a pause
+    """
+    parser = _SpeechParser()
+    parser.feed(html or '')
+    parser.close()
+    return '\n\n'.join(parser.paragraphs)
+
+
+class SpeechTextExtractor:
+    """Memoizes html_to_speech_text by a hash of the HTML."""
+
+    def __init__(self, max_entries: int = None):
+        """
+        Initialize the extractor.
+
+        Args:
+            max_entries: Number of extracted texts to remember
+        """
+        self.max_entries = max_entries or int(os.getenv('SPEECH_TEXT_CACHE_SIZE', 256))
+        self._texts = OrderedDict()  # Map of HTML hash to speech text, least recently used first
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'chars_in': 0, 'chars_out': 0}
+
+    def extract(self, html: Optional[str]) -> str:
+        """
+        Get the speech text of lesson HTML.
+
+        Args:
+            html: The generated lesson HTML
+
+        Returns:
+            str: The text to speak
+        """
+        html = html or ''
+        key = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        with self._lock:
+            text = self._texts.get(key)
+            if text is not None:
+                self._texts.move_to_end(key)
+                self._stats['hits'] += 1
+                return text
+
+        text = html_to_speech_text(html)
+        with self._lock:
+            self._texts[key] = text
+            while len(self._texts) > self.max_entries:
+                self._texts.popitem(last=False)
+            self._stats['misses'] += 1
+            self._stats['chars_in'] += len(html)
+            self._stats['chars_out'] += len(text)
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get extraction counters.
+
+        Returns:
+            Dict[str, Any]: Hits, misses, remembered texts and characters in and out of extraction
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._texts)
+        return stats
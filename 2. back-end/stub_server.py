@@ -0,0 +1,361 @@
+"""
+Stub Server Module
+
+This module provides a local stand-in for the Gemini and Hugging Face APIs
+so the Flask app can be load tested on one machine without network access.
+Start it, then run the app with LLM_BACKEND=local:
+
+    python stub_server.py --port 8090 --latency-ms 800 --rate-limit-rate 0.02
+
+Responses are deterministic for a given prompt and realistically sized:
+lesson HTML, quiz JSON, grading JSON (single and batched), syllabus units
+and WAV audio for TTS. Latency follows a log-normal distribution around
+a configurable median, and a configurable share of requests fail with 429
+or 5xx so the client's retry, hedging and fallback paths are exercised.
+"""
+
+import io
+import os
+import re
+import json
+import math
+import time
+import wave
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List
+from urllib.parse import urlparse, parse_qs
+
+# Words used to build deterministic lesson text
+TERMS = ['budget', 'emergency fund', 'compound interest', 'credit score', 'diversification', 'inflation',
+         'net worth', 'cash flow', 'liquidity', 'risk tolerance', 'index fund', 'amortization',
+         'opportunity cost', 'asset allocation', 'tax bracket', 'interest rate']
+SENTENCES = [
+    "A {term} helps you understand where your money goes each month.",
+    "Many people overlook the {term} until an unexpected expense appears.",
+    "Over time, the {term} can have a larger effect than most beginners expect.",
+    "Comparing your {term} against clear goals makes better decisions easier.",
+    "Financial planners often start a review by looking at the {term}.",
+    "Understanding the {term} lets you weigh short-term wants against long-term needs.",
+    "A simple spreadsheet is enough to track your {term} consistently.",
+    "Small, regular changes to your {term} add up over several years."
+]
+SECTIONS = ['Introduction', 'Key Concepts', 'How It Works', 'Real-World Example', 'Common Mistakes',
+            'Practical Strategies', 'Summary']
+
+# Audio format of the TTS responses
+SAMPLE_RATE = 16000
+SECONDS_PER_WORD = 0.35
+
+
+class StubConfig:
+    """Latency and failure settings shared by all request handlers."""
+
+    def __init__(self, latency_ms: float, latency_sigma: float, error_rate: float, rate_limit_rate: float,
+                 seed: int, stream_chunks: int = 8):
+        """
+        Initialize the settings.
+
+        Args:
+            latency_ms: Median response latency in milliseconds
+            latency_sigma: Spread of the log-normal latency distribution (0 for constant latency)
+            error_rate: Share of requests answered with a 500 or 503
+            rate_limit_rate: Share of requests answered with a 429
+            seed: Seed for the latency and failure draws
+            stream_chunks: Number of chunks a streamed response is split into
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunks = stream_chunks
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+
+    def draw(self):
+        """
+        Draw the outcome of one request.
+
+        Returns:
+            Tuple[float, Optional[int]]: Latency in seconds and the error status to return, if any
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            latency = self.latency_ms / 1000 * math.exp(self.latency_sigma * self._random.gauss(0, 1))
+            roll = self._random.random()
+            if roll < self.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                return latency / 10, 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return latency, self._random.choice((500, 503))
+            return latency, None
+
+
+def seeded_random(text: str) -> random.Random:
+    """Get a random generator seeded by a text, so equal prompts get equal responses."""
+    return random.Random(hashlib.sha256(text.encode('utf-8')).hexdigest())
+
+
+def find_topic(prompt: str) -> str:
+    """Pull the topic out of a lesson or quiz prompt."""
+    match = re.search(r'(?:content|quiz) about (.+?) at (\w+) level', prompt)
+    return match.group(1).strip() if match else 'personal finance'
+
+
+def lesson_html(prompt: str) -> str:
+    """
+    Build a lesson of about 1,200 words.
+
+    Args:
+        prompt: The lesson prompt
+
+    Returns:
+        str: Lesson HTML in the structure the module prompt asks for
+    """
+    rng = seeded_random(prompt)
+    topic = find_topic(prompt)
+    parts = [f"<h1>{topic.title()}</h1>"]
+    for section in SECTIONS:
+        parts.append(f"<h2>{section}</h2>")
+        for _ in range(3):
+            sentences = [rng.choice(SENTENCES).format(term=rng.choice(TERMS)) for _ in range(5)]
+            term = rng.choice(TERMS)
+            parts.append(f"<p>When studying {topic}, the <strong>{term}</strong> matters. {' '.join(sentences)}</p>")
+        items = ''.join(f"<li>{rng.choice(SENTENCES).format(term=rng.choice(TERMS))}</li>" for _ in range(4))
+        parts.append(f"<ul>{items}</ul>")
+    return '\n'.join(parts)
+
+
+def quiz_json(prompt: str) -> Dict[str, Any]:
+    """Build a quiz with 5 multiple-choice and 2 free-text questions."""
+    rng = seeded_random(prompt)
+    topic = find_topic(prompt)
+    questions = []
+    for i in range(5):
+        terms = rng.sample(TERMS, 4)
+        questions.append({
+            "id": f"q{i + 1}",
+            "type": "mcq",
+            "question": f"Which concept best describes part {i + 1} of {topic}?",
+            "options": [term.title() for term in terms],
+            "correct_answer": rng.randrange(4),
+            "explanation": rng.choice(SENTENCES).format(term=terms[0])
+        })
+    for i in range(5, 7):
+        terms = rng.sample(TERMS, 3)
+        questions.append({
+            "id": f"q{i + 1}",
+            "type": "free_text",
+            "question": f"Explain how {terms[0]} relates to {topic}.",
+            "sample_answer": ' '.join(rng.choice(SENTENCES).format(term=term) for term in terms),
+            "key_points": [f"Explains the role of {term}" for term in terms]
+        })
+    return {"questions": questions}
+
+
+def grading_json(prompt: str) -> Dict[str, Any]:
+    """Build a single or batched evaluation, depending on what the prompt asks for."""
+    rng = seeded_random(prompt)
+    if '"evaluations"' in prompt:
+        ids = list(dict.fromkeys(re.findall(r'"id": "([^"]+)"', prompt.split('Format your response')[0])))
+        return {"evaluations": [{"id": answer_id, "score": rng.randint(40, 95),
+                                 "feedback": "Your answer addresses some of the key points."} for answer_id in ids]}
+    return {"score": rng.randint(40, 95), "feedback": "Your answer addresses some of the key points."}
+
+
+def syllabus_json(prompt: str) -> Dict[str, Any]:
+    """Build learning units from the headings-like lines of a syllabus prompt."""
+    rng = seeded_random(prompt)
+    lines = [line.strip(' -:') for line in prompt.splitlines()]
+    titles = [line for line in lines if line and len(line) < 60 and not line.endswith('.')][:8] or ['Unit 1']
+    return {"units": [{
+        "unit_title": title,
+        "key_summary": rng.choice(SENTENCES).format(term=rng.choice(TERMS)),
+        "key_topics": [term.title() for term in rng.sample(TERMS, 4)]
+    } for title in titles]}
+
+
+def generate_text(prompt: str) -> str:
+    """
+    Build the response text for a Gemini prompt.
+
+    Args:
+        prompt: The full prompt text
+
+    Returns:
+        str: Quiz, grading or syllabus JSON, or lesson HTML
+    """
+    if 'Evaluate the student' in prompt or 'evaluating students' in prompt or 'evaluating a student' in prompt:
+        return json.dumps(grading_json(prompt))
+    if '"questions"' in prompt:
+        return json.dumps(quiz_json(prompt))
+    if '"units"' in prompt:
+        return json.dumps(syllabus_json(prompt))
+    return lesson_html(prompt)
+
+
+def tts_wav(text: str) -> bytes:
+    """
+    Build WAV audio whose duration matches how long the text takes to read.
+
+    Args:
+        text: The text to "speak"
+
+    Returns:
+        bytes: 16 kHz mono 16-bit WAV data
+    """
+    frames = int(max(len(text.split()), 1) * SECONDS_PER_WORD * SAMPLE_RATE)
+    pitch = 180 + int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:2], 16)
+    samples = struct.pack(f'<{frames}h', *(int(8000 * math.sin(2 * math.pi * pitch * i / SAMPLE_RATE))
+                                           for i in range(frames)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples)
+    return buffer.getvalue()
+
+
+def split_chunks(text: str, count: int) -> List[str]:
+    """Split text into roughly equal chunks."""
+    size = max(math.ceil(len(text) / max(count, 1)), 1)
+    return [text[i:i + size] for i in range(0, len(text), size)] or ['']
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the Gemini generateContent and Hugging Face inference endpoints."""
+
+    config = None  # Set by run_server()
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        # Per-request logging would dominate the cost of a load test
+        pass
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json({"status": "ok", "stats": self.config.stats})
+        else:
+            self.send_json({"error": "Not found"}, 404)
+
+    def do_POST(self):
+        content_length = int(self.headers.get('Content-Length', 0))
+        try:
+            data = json.loads(self.rfile.read(content_length) or b'{}')
+        except ValueError:
+            self.send_json({"error": "Invalid JSON"}, 400)
+            return
+
+        parsed = urlparse(self.path)
+        latency, error_status = self.config.draw()
+        if error_status:
+            time.sleep(latency)
+            headers = {'Retry-After': '1'} if error_status == 429 else {}
+            self.send_json({"error": {"code": error_status, "message": "Injected failure"}}, error_status, headers)
+            return
+
+        if parsed.path.startswith('/v1beta/models/'):
+            prompt = '\n'.join(part.get('text', '') for content in data.get('contents', [])
+                               for part in content.get('parts', []))
+            text = generate_text(prompt)
+            if parsed.path.endswith(':streamGenerateContent'):
+                self.stream_gemini(text, prompt, latency, parse_qs(parsed.query).get('alt') == ['sse'])
+            else:
+                time.sleep(latency)
+                self.send_json(self.gemini_payload(text, prompt))
+        elif parsed.path.startswith('/models/'):
+            time.sleep(latency)
+            model_id = parsed.path[len('/models/'):]
+            inputs = data.get('inputs', '')
+            if 'tts' in model_id:
+                self.send_bytes(tts_wav(str(inputs)), 'audio/wav')
+            else:
+                self.send_json([{"generated_text": lesson_html(str(inputs))[:500]}])
+        else:
+            self.send_json({"error": "Not found"}, 404)
+
+    def gemini_payload(self, text: str, prompt: str) -> Dict[str, Any]:
+        """Wrap response text in the generateContent response structure."""
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4
+            }
+        }
+
+    def stream_gemini(self, text: str, prompt: str, latency: float, sse: bool):
+        """Send the response in chunks spread over the drawn latency."""
+        chunks = split_chunks(text, self.config.stream_chunks)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream' if sse else 'application/json')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for chunk in chunks:
+                time.sleep(latency / len(chunks))
+                self.wfile.write(f"data: {json.dumps(self.gemini_payload(chunk, prompt))}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            pass
+
+    def send_json(self, data: Any, status: int = 200, headers: Dict[str, str] = None):
+        self.send_bytes(json.dumps(data).encode('utf-8'), 'application/json', status, headers)
+
+    def send_bytes(self, body: bytes, content_type: str, status: int = 200, headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(config: StubConfig, host: str = '127.0.0.1', port: int = 8090) -> ThreadingHTTPServer:
+    """
+    Create the stub server without starting it.
+
+    Args:
+        config: Latency and failure settings
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+
+    Returns:
+        ThreadingHTTPServer: The server; call serve_forever() to run it
+    """
+    handler = type('ConfiguredStubHandler', (StubHandler,), {'config': config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def run_server():
+    parser = argparse.ArgumentParser(description="Local Gemini and Hugging Face stand-in for load testing")
+    parser.add_argument('--host', default=os.getenv('STUB_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('STUB_PORT', 8090)))
+    parser.add_argument('--latency-ms', type=float, default=float(os.getenv('STUB_LATENCY_MS', 800)))
+    parser.add_argument('--latency-sigma', type=float, default=float(os.getenv('STUB_LATENCY_SIGMA', 0.5)))
+    parser.add_argument('--error-rate', type=float, default=float(os.getenv('STUB_ERROR_RATE', 0.0)))
+    parser.add_argument('--rate-limit-rate', type=float, default=float(os.getenv('STUB_RATE_LIMIT_RATE', 0.0)))
+    parser.add_argument('--seed', type=int, default=int(os.getenv('STUB_SEED', 42)))
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate, args.seed)
+    server = make_server(config, args.host, args.port)
+    print(f"Stub Gemini/Hugging Face server at http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    run_server()
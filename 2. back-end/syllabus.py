@@ -0,0 +1,510 @@
+"""
+Syllabus Module
+
+This module provides the syllabus ingestion pipeline. An upload is copied
+to a spooled temporary file (held in memory only while it is small), its
+text is extracted from PDF, DOCX or plain text, and the text is split into
+chunks that fit the unit-segmentation prompt. The chunks are segmented into
+learning units in parallel, and the units of all chunks are merged so a unit
+described by several chunks becomes one module.
+
+With a fingerprint index, a syllabus that matches one parsed before (exactly
+or as a near-duplicate) reuses that syllabus's units without any LLM calls.
+"""
+
+import os
+import re
+import time
+import html
+import zipfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+from typing import Dict, Any, Optional, List, Callable, BinaryIO
+
+from json_extractor import extract_units
+from fingerprint import FingerprintIndex, fingerprint
+from module_cache import normalize_topic
+from prompt_builder import estimate_tokens
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF uploads are rejected when pypdf is not installed
+    PdfReader = None
+
+READ_CHUNK_BYTES = 64 * 1024
+
+# Uploads up to this size are spooled in memory, larger ones on disk
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+# Default limit on the uncompressed size of a DOCX document body
+MAX_DOCX_XML_BYTES = 50 * 1024 * 1024
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+# Lines holding only a page number, e.g. "12", "Page 3" or "3 of 40"
+PAGE_MARKER = re.compile(r'^(page\s*)?\d+(\s*(of|/)\s*\d+)?$', re.IGNORECASE)
+
+# Numbering in front of unit titles, e.g. "Week 1-2:" or "Unit 3 -"
+UNIT_NUMBERING = re.compile(r'^(week|weeks|unit|module|chapter|lecture|part|session|topic)\s*[\d\s,&\-–]*[:.\-–]?\s*',
+                            re.IGNORECASE)
+
+SEGMENTATION_INSTRUCTION = """
+    You are a curriculum parser and unit designer analyzing educational content.
+
+    Follow these guidelines:
+    1. Create no more than 8 logical learning units from the content
+    2. Ignore structural markers like page numbers or headers
+    3. Each unit_title must be concise and descriptive
+    4. Each key_summary must capture the essence of the unit content
+    5. Each unit must have 3-5 key_topics derived directly from the content
+    6. Ensure all JSON is properly formatted with no syntax errors
+    """
+
+
+class SyllabusError(ValueError):
+    """Raised when an upload cannot be read as a syllabus."""
+    pass
+
+
+class SyllabusTooLargeError(SyllabusError):
+    """Raised when an upload exceeds the maximum syllabus size."""
+    pass
+
+
+def spool_upload(stream: BinaryIO, max_bytes: int, memory_bytes: int = SPOOL_MEMORY_BYTES):
+    """
+    Copy an upload stream to a spooled temporary file in fixed-size reads.
+
+    Args:
+        stream: The upload stream
+        max_bytes: Maximum accepted upload size
+        memory_bytes: Size above which the spool moves from memory to disk
+
+    Returns:
+        SpooledTemporaryFile: The upload, positioned at its start
+
+    Raises:
+        SyllabusTooLargeError: If the upload is larger than max_bytes
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=memory_bytes)
+    size = 0
+    try:
+        while True:
+            data = stream.read(READ_CHUNK_BYTES)
+            if not data:
+                break
+            size += len(data)
+            if size > max_bytes:
+                raise SyllabusTooLargeError(f"Syllabus is larger than {max_bytes // (1024 * 1024)} MB")
+            spooled.write(data)
+    except Exception:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def detect_file_type(filename: str, head: bytes) -> str:
+    """
+    Detect the type of an uploaded syllabus.
+
+    Args:
+        filename: The uploaded file name
+        head: The first bytes of the file
+
+    Returns:
+        str: "pdf", "docx" or "text"
+
+    Raises:
+        SyllabusError: If the file is not a supported type
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04') and extension in ('', '.docx'):
+        return 'docx'
+    if extension in ('', '.txt', '.md', '.text') and b'\x00' not in head:
+        return 'text'
+    raise SyllabusError("Unsupported syllabus format: upload a PDF, DOCX or text file")
+
+
+def _pdf_text(fileobj: BinaryIO) -> str:
+    """Extract the text of every page of a PDF."""
+    if PdfReader is None:
+        raise SyllabusError("PDF syllabi are not supported on this server")
+    try:
+        reader = PdfReader(fileobj)
+        return '\n\n'.join(page.extract_text() or '' for page in reader.pages)
+    except SyllabusError:
+        raise
+    except Exception as e:
+        raise SyllabusError(f"Could not read PDF: {str(e)}")
+
+
+def _docx_text(fileobj: BinaryIO, max_xml_bytes: int) -> str:
+    """Extract the paragraphs of a DOCX document body, streaming its XML."""
+    paragraphs = []
+    try:
+        with zipfile.ZipFile(fileobj) as archive:
+            # A small upload can inflate to gigabytes of XML. zipfile never reads past the
+            # declared size and fails the CRC check on an entry holding more than it declares
+            if archive.getinfo('word/document.xml').file_size > max_xml_bytes:
+                raise SyllabusTooLargeError(
+                    f"DOCX document is too large when uncompressed (limit {max_xml_bytes // (1024 * 1024)} MB)")
+            with archive.open('word/document.xml') as document:
+                for _, element in ElementTree.iterparse(document):
+                    if element.tag == WORD_NAMESPACE + 'p':
+                        parts = []
+                        for node in element.iter():
+                            if node.tag == WORD_NAMESPACE + 't' and node.text:
+                                parts.append(node.text)
+                            elif node.tag == WORD_NAMESPACE + 'tab':
+                                parts.append('\t')
+                            elif node.tag == WORD_NAMESPACE + 'br':
+                                parts.append('\n')
+                        paragraphs.append(''.join(parts))
+                        element.clear()
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as e:
+        raise SyllabusError(f"Could not read DOCX: {str(e)}")
+    return '\n'.join(paragraphs)
+
+
+def extract_text(fileobj: BinaryIO, file_type: str, max_docx_xml_bytes: int = MAX_DOCX_XML_BYTES) -> str:
+    """
+    Extract the text of a syllabus file.
+
+    Args:
+        fileobj: The seekable syllabus file
+        file_type: "pdf", "docx" or "text"
+        max_docx_xml_bytes: Maximum uncompressed size of a DOCX document body
+
+    Returns:
+        str: The syllabus text
+
+    Raises:
+        SyllabusError: If the file cannot be read
+        SyllabusTooLargeError: If a DOCX document body is too large when uncompressed
+    """
+    if file_type == 'pdf':
+        return _pdf_text(fileobj)
+    if file_type == 'docx':
+        return _docx_text(fileobj, max_docx_xml_bytes)
+    return fileobj.read().decode('utf-8-sig', errors='replace')
+
+
+def _pack(pieces: List[str], max_tokens: int, separator: str) -> List[str]:
+    """Greedily join pieces into groups of at most max_tokens."""
+    groups = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece) + 1
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(separator.join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        groups.append(separator.join(current))
+    return groups
+
+
+def _split_to_budget(paragraph: str, max_tokens: int) -> List[str]:
+    """Split a paragraph over the budget into lines, and lines over it into words."""
+    if estimate_tokens(paragraph) <= max_tokens:
+        return [paragraph]
+    lines = paragraph.split('\n')
+    if len(lines) > 1:
+        return _pack([part for line in lines for part in _split_to_budget(line, max_tokens)], max_tokens, '\n')
+    return _pack(paragraph.split(), max_tokens, ' ')
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split syllabus text into chunks for segmentation.
+
+    Whitespace is collapsed and page number lines are dropped. Chunks break
+    between paragraphs where possible, so a unit's heading usually stays with
+    its topics.
+
+    Args:
+        text: The syllabus text
+        max_tokens: Maximum estimated tokens per chunk
+
+    Returns:
+        List[str]: The chunks in document order
+    """
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text):
+        lines = [' '.join(line.split()) for line in block.splitlines()]
+        lines = [line for line in lines if line and not PAGE_MARKER.match(line)]
+        if lines:
+            paragraphs.extend(_split_to_budget('\n'.join(lines), max_tokens))
+    return _pack(paragraphs, max_tokens, '\n\n')
+
+
+def build_segmentation_prompt(chunk: str, part: int, total: int) -> str:
+    """
+    Build the unit-segmentation prompt for one chunk of a syllabus.
+
+    Args:
+        chunk: The chunk text
+        part: The chunk's position, starting at 1
+        total: The number of chunks
+
+    Returns:
+        str: The prompt
+    """
+    return f"""
+    {SEGMENTATION_INSTRUCTION}
+
+    Analyze the following raw text from part {part} of {total} of a syllabus document:
+
+    {chunk}
+
+    Segment this content into logical learning units (maximum 8 units total).
+    Ignore any structural markers like page numbers or headers. If a unit starts
+    in an earlier part, use the title the syllabus gives it.
+
+    For each unit, provide:
+    1. A concise unit_title derived from the content
+    2. A key_summary that captures the essence of the unit
+    3. 3-5 key_topics that are covered in the unit
+
+    Your response must be a valid JSON object with the following structure:
+    {{
+        "units": [
+            {{
+                "unit_title": "Title of the unit",
+                "key_summary": "Concise summary of the unit",
+                "key_topics": ["Topic 1", "Topic 2", "Topic 3", "Topic 4", "Topic 5"]
+            }}
+        ]
+    }}
+    """
+
+
+def unit_key(title: str) -> str:
+    """
+    Get the key under which units with the same title are merged.
+
+    Args:
+        title: The unit title
+
+    Returns:
+        str: The normalized title without leading week or unit numbering
+    """
+    return normalize_topic(UNIT_NUMBERING.sub('', title.strip())) or normalize_topic(title)
+
+
+def merge_units(unit_lists: List[List[Dict[str, Any]]], max_units: int) -> List[Dict[str, Any]]:
+    """
+    Merge the units of all chunks, combining units with the same title.
+
+    Args:
+        unit_lists: The validated units of each chunk, in document order
+        max_units: Maximum number of units to keep
+
+    Returns:
+        List[Dict[str, Any]]: The distinct units in document order
+    """
+    merged = {}
+    for units in unit_lists:
+        for unit in units:
+            key = unit_key(unit['unit_title'])
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = {**unit, 'key_topics': list(unit['key_topics'])}
+                continue
+            if not existing['key_summary']:
+                existing['key_summary'] = unit['key_summary']
+            seen = {topic.lower() for topic in existing['key_topics']}
+            for topic in unit['key_topics']:
+                if topic.lower() not in seen and len(existing['key_topics']) < 5:
+                    seen.add(topic.lower())
+                    existing['key_topics'].append(topic)
+    return list(merged.values())[:max_units]
+
+
+def unit_text(unit: Dict[str, Any]) -> str:
+    """
+    Get the text a unit is fingerprinted by.
+
+    Args:
+        unit: A validated unit
+
+    Returns:
+        str: The unit title, summary and key topics
+    """
+    return ' '.join([unit['unit_title'], unit['key_summary']] + unit['key_topics'])
+
+
+def unit_to_html(unit: Dict[str, Any]) -> str:
+    """
+    Render a unit as module outline HTML.
+
+    Args:
+        unit: A validated unit
+
+    Returns:
+        str: The unit title, summary and key topics as HTML
+    """
+    topics = ''.join(f"<li>{html.escape(topic)}</li>" for topic in unit['key_topics'])
+    return (f"<h1>{html.escape(unit['unit_title'])}</h1>"
+            f"<p>{html.escape(unit['key_summary'])}</p>"
+            + (f"<h2>Key Topics</h2><ul>{topics}</ul>" if topics else ''))
+
+
+class SyllabusIngestor:
+    """
+    Turns uploaded syllabi into merged learning units.
+
+    The segment function is called as segment(prompt, user_id), with the ID of
+    the user the syllabus was uploaded by, and returns the model's response text. Chunks of one syllabus are segmented concurrently on a
+    worker pool shared by all uploads.
+    """
+
+    def __init__(self, segment: Callable[[str], str], max_workers: int = None, chunk_tokens: int = None,
+                 max_bytes: int = None, max_units: int = None, index: Optional[FingerprintIndex] = None,
+                 max_docx_xml_bytes: int = None):
+        """
+        Initialize the ingestor.
+
+        Args:
+            segment: Sends a segmentation prompt to the LLM for a user and returns the response text
+            max_workers: Worker threads segmenting chunks
+            chunk_tokens: Maximum estimated tokens of syllabus text per prompt
+            max_bytes: Maximum accepted upload size
+            max_units: Maximum units kept per syllabus
+            index: Fingerprint index of parsed syllabi (no deduplication if None)
+            max_docx_xml_bytes: Maximum uncompressed size of a DOCX document body
+        """
+        self.segment = segment
+        self.max_workers = max_workers or int(os.getenv('SYLLABUS_WORKERS', 8))
+        self.chunk_tokens = chunk_tokens or int(os.getenv('SYLLABUS_CHUNK_TOKENS', 3000))
+        self.max_bytes = max_bytes or int(os.getenv('SYLLABUS_MAX_BYTES', 20 * 1024 * 1024))
+        self.max_units = max_units or int(os.getenv('SYLLABUS_MAX_UNITS', 30))
+        self.max_docx_xml_bytes = max_docx_xml_bytes or \
+            int(os.getenv('SYLLABUS_MAX_DOCX_XML_BYTES', MAX_DOCX_XML_BYTES))
+        self.index = index
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='syllabus')
+        self._lock = threading.Lock()
+        self._stats = {'syllabi': 0, 'duplicates': 0, 'chunks': 0, 'failed_chunks': 0, 'units': 0,
+                       'total_seconds': 0.0}
+
+    def ingest(self, stream: BinaryIO, filename: str = '', user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract the learning units of an uploaded syllabus file.
+
+        Args:
+            stream: The upload stream
+            filename: The uploaded file name
+            user_id: The uploading user, whose usage the segmentation calls count towards
+
+        Returns:
+            Dict[str, Any]: The units, file type and chunking report
+
+        Raises:
+            SyllabusError: If the upload cannot be read or holds no text
+            SyllabusTooLargeError: If the upload, or a DOCX body when uncompressed, is too large
+            RuntimeError: If no chunk could be segmented
+        """
+        with spool_upload(stream, self.max_bytes) as spooled:
+            file_type = detect_file_type(filename, spooled.read(8))
+            spooled.seek(0)
+            text = extract_text(spooled, file_type, self.max_docx_xml_bytes)
+        result = self.ingest_text(text, user_id=user_id)
+        result['file_type'] = file_type
+        return result
+
+    def ingest_text(self, text: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract the learning units of syllabus text.
+
+        Args:
+            text: The syllabus text
+            user_id: The uploading user, whose usage the segmentation calls count towards
+
+        Returns:
+            Dict[str, Any]: The units and chunking report, with the matched syllabus
+            and its similarity when the units were reused
+
+        Raises:
+            SyllabusError: If the text is empty or has no learning units
+            RuntimeError: If no chunk could be segmented
+        """
+        started = time.time()
+        chunks = chunk_text(text or '', self.chunk_tokens)
+        if not chunks:
+            raise SyllabusError("No text found in the syllabus")
+
+        # Reuse the units of the same or a near-identical syllabus parsed before
+        fp = fingerprint('\n'.join(chunks)) if self.index else None
+        match = self.index.find('syllabus', fp) if fp else None
+        if match:
+            with self._lock:
+                self._stats['syllabi'] += 1
+                self._stats['duplicates'] += 1
+            return {
+                'units': match['payload']['units'],
+                'characters': len(text),
+                'chunks': 0,
+                'failed_chunks': 0,
+                'duplicate_of': match['id'],
+                'similarity': round(match['similarity'], 3),
+                'duration_seconds': round(time.time() - started, 2)
+            }
+
+        futures = [self._executor.submit(self._segment_chunk, chunk, part, len(chunks), user_id)
+                   for part, chunk in enumerate(chunks, start=1)]
+        results = [future.result() for future in futures]
+        failed = sum(units is None for units in results)
+        if failed == len(chunks):
+            raise RuntimeError("Failed to segment the syllabus into units")
+
+        units = merge_units([units for units in results if units], self.max_units)
+        if not units:
+            raise SyllabusError("No learning units found in the syllabus")
+        # Only fully segmented syllabi are indexed, so a partial result is retried next time
+        if fp and not failed:
+            self.index.add('syllabus', fp, {'units': units})
+        duration = time.time() - started
+        with self._lock:
+            self._stats['syllabi'] += 1
+            self._stats['chunks'] += len(chunks)
+            self._stats['failed_chunks'] += failed
+            self._stats['units'] += len(units)
+            self._stats['total_seconds'] += duration
+
+        return {
+            'units': units,
+            'characters': len(text),
+            'chunks': len(chunks),
+            'failed_chunks': failed,
+            'duration_seconds': round(duration, 2)
+        }
+
+    def _segment_chunk(self, chunk: str, part: int, total: int,
+                       user_id: Optional[str]) -> Optional[List[Dict[str, Any]]]:
+        """Segment one chunk for a user, returning its units or None if it failed."""
+        try:
+            return extract_units(self.segment(build_segmentation_prompt(chunk, part, total), user_id))['units']
+        except Exception as e:
+            print(f"Error segmenting syllabus part {part} of {total}: {str(e)}")
+            return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get ingestion counters.
+
+        Returns:
+            Dict[str, Any]: Syllabi processed and reused, chunks segmented and failed, units found
+            and average duration
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_seconds'] = round(stats.pop('total_seconds') / stats['syllabi'], 2) if stats['syllabi'] else 0.0
+        return stats
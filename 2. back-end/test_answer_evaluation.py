@@ -53,7 +53,7 @@ async def test_answer_evaluation():
     """
     
     # Generate evaluation with JSON formatting
-    response = await gemini_client.generate_content(
+    response = await gemini_client.generate_content_async(
         prompt=prompt,
         output_format="json",
         system_instruction=system_instruction
@@ -0,0 +1,99 @@
+import os
+import time
+import tempfile
+import hashlib
+from audio_cache import AudioCache, audio_etag
+
+VOICE = "facebook/mms-tts-eng"
+
+def make_cache(cache_dir=None, max_bytes=1024 * 1024):
+    """Create an AudioCache pointed at a throwaway directory"""
+    cache = object.__new__(AudioCache)
+    cache._configure(cache_dir=cache_dir or tempfile.mkdtemp(prefix="audio_cache_"), max_bytes=max_bytes)
+    return cache
+
+def test_key_is_content_addressed():
+    """Test that keys depend on the spoken text, voice and format only"""
+    key = AudioCache.make_key("Budgeting  basics.\nSaving first.", VOICE, "mp3")
+    assert key == AudioCache.make_key("Budgeting basics. Saving first.", VOICE, "MP3")
+    assert key != AudioCache.make_key("Budgeting basics. Saving first.", VOICE, "wav")
+    assert key != AudioCache.make_key("Budgeting basics. Saving first.", "other/voice", "mp3")
+    assert key != AudioCache.make_key("Budgeting basics.", VOICE, "mp3")
+    print("✅ Audio is keyed by text, voice and format")
+
+def test_store_and_serve_from_disk():
+    """Test that stored audio is served from a local file"""
+    cache = make_cache()
+    key = AudioCache.make_key("Hello", VOICE, "mp3")
+    assert cache.get(key, "mp3") is None
+
+    path = cache.put(key, "mp3", b"ID3 audio bytes")
+    assert cache.get(key, "mp3") == path
+    with open(path, "rb") as f:
+        assert f.read() == b"ID3 audio bytes"
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith(".tmp")]
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["bytes"] == len(b"ID3 audio bytes")
+    print("✅ Repeat listens are served from disk")
+
+def test_lru_eviction_under_quota():
+    """Test that the least recently used audio is evicted first"""
+    cache = make_cache(max_bytes=300)
+    keys = [AudioCache.make_key(f"Module {i}", VOICE, "mp3") for i in range(3)]
+    for key in keys:
+        cache.put(key, "mp3", b"x" * 100)
+
+    # Use the oldest entry, then push the cache over its quota
+    cache.get(keys[0], "mp3")
+    cache.put(AudioCache.make_key("Module 3", VOICE, "mp3"), "mp3", b"x" * 100)
+
+    assert cache.get(keys[0], "mp3") is not None
+    assert cache.get(keys[1], "mp3") is None
+    assert cache.get_stats()["bytes"] <= 300
+    assert cache.put(AudioCache.make_key("Too long", VOICE, "mp3"), "mp3", b"x" * 301) is None
+    print("✅ Least recently used audio is evicted under the byte quota")
+
+def test_index_shared_through_disk():
+    """Test that a new process indexes existing files and sees other workers' writes"""
+    cache_dir = tempfile.mkdtemp(prefix="audio_cache_")
+    first = make_cache(cache_dir)
+    old_key = AudioCache.make_key("Old", VOICE, "wav")
+    first.put(old_key, "wav", b"RIFF old")
+    os.utime(first.get(old_key, "wav"), (time.time() - 100, time.time() - 100))
+
+    second = make_cache(cache_dir, max_bytes=1024)
+    assert second.get_stats()["entries"] == 1
+
+    new_key = AudioCache.make_key("New", VOICE, "wav")
+    first.put(new_key, "wav", b"RIFF new")
+    assert second.get(new_key, "wav") is not None
+    assert second.get_stats()["entries"] == 2
+    print("✅ The index is rebuilt from disk and picks up other workers' files")
+
+def test_strong_etags():
+    """Test that entity tags are content hashes and change when audio is replaced"""
+    cache_dir = tempfile.mkdtemp(prefix="audio_cache_")
+    cache = make_cache(cache_dir)
+    key = AudioCache.make_key("Hello", VOICE, "mp3")
+    path = cache.put(key, "mp3", b"ID3 first take")
+    assert cache.get_etag(path) == audio_etag(b"ID3 first take") == hashlib.sha256(b"ID3 first take").hexdigest()
+
+    # Another worker hashes the file itself
+    other = make_cache(cache_dir)
+    assert other.get_etag(other.get(key, "mp3")) == audio_etag(b"ID3 first take")
+
+    cache.put(key, "mp3", b"ID3 second take")
+    assert other.get_etag(path) == audio_etag(b"ID3 second take")
+    os.remove(path)
+    assert cache.get_etag(path) is None
+    print("✅ Audio files carry strong content-hash ETags")
+
+if __name__ == "__main__":
+    test_key_is_content_addressed()
+    test_store_and_serve_from_disk()
+    test_lru_eviction_under_quota()
+    test_index_shared_through_disk()
+    test_strong_etags()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,108 @@
+import threading
+from audio_prerender import AudioPrerenderer
+
+class FakeClock:
+    """Manually advanced clock"""
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def make_prerenderer(render=None, **kwargs):
+    """Create a prerenderer with an in-memory cache"""
+    cached = set()
+
+    def default_render(text):
+        cached.add(text)
+
+    options = dict(enabled=True, max_concurrency=1, max_pending=10, daily_char_budget=1000, clock=FakeClock())
+    options.update(kwargs)
+    prerenderer = AudioPrerenderer(
+        extract=lambda html: html.replace("<p>", "").replace("</p>", ""),
+        is_cached=lambda text: text in cached,
+        render=render or default_render,
+        **options
+    )
+    return prerenderer, cached
+
+def test_queue_and_render():
+    """Test that new modules are queued and rendered into the cache once"""
+    prerenderer, cached = make_prerenderer()
+    assert prerenderer.queue("m1", "<p>Budgeting basics.</p>")
+    prerenderer.shutdown()
+    assert "Budgeting basics." in cached
+    assert prerenderer.run("m1", "<p>Budgeting basics.</p>")["status"] == "already_cached"
+    assert prerenderer.get_stats()["pending"] == 0
+
+    disabled, disabled_cached = make_prerenderer(enabled=False)
+    assert not disabled.queue("m1", "<p>Budgeting basics.</p>")
+    disabled.shutdown()
+    assert not disabled_cached
+    print("✅ New modules are pre-rendered into the audio cache")
+
+def test_daily_budget():
+    """Test that rendering stops when the day's characters are spent and resumes the next day"""
+    clock = FakeClock()
+    prerenderer, cached = make_prerenderer(daily_char_budget=30, clock=clock)
+    assert prerenderer.run("m1", "<p>" + "a" * 20 + "</p>")["status"] == "rendered"
+    assert prerenderer.run("m2", "<p>" + "b" * 20 + "</p>")["status"] == "over_budget"
+    assert prerenderer.get_stats()["budget_remaining_today"] == 10
+
+    clock.now += 24 * 3600
+    assert prerenderer.run("m2", "<p>" + "b" * 20 + "</p>")["status"] == "rendered"
+    print("✅ Pre-rendering stays within the daily budget")
+
+def test_renders_wait_for_a_slot():
+    """Test that queued modules wait for a free slot and a full backlog drops new ones"""
+    lock = threading.Lock()
+    release = threading.Event()
+    running = [0]
+    peak = [0]
+    rendered = []
+
+    def slow_render(text):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(2)
+        with lock:
+            running[0] -= 1
+            rendered.append(text)
+
+    prerenderer, _ = make_prerenderer(render=slow_render, max_concurrency=1, max_pending=1)
+    assert prerenderer.queue("m1", "<p>First module.</p>")
+    assert prerenderer.queue("m2", "<p>Second module.</p>")
+    # One render running and one waiting fill the backlog
+    assert not prerenderer.queue("m3", "<p>Third module.</p>")
+
+    release.set()
+    prerenderer.shutdown()
+    assert rendered == ["First module.", "Second module."]
+    assert peak[0] == 1
+    stats = prerenderer.get_stats()
+    assert stats["rendered"] == 2 and stats["dropped"] == 1 and stats["pending"] == 0
+    print("✅ Pre-renders wait for a slot on their own threads")
+
+def test_failed_render_refunds_budget():
+    """Test that a failed render raises for a retry without spending the budget"""
+    def failing_render(text):
+        raise RuntimeError("TTS service unavailable")
+
+    prerenderer, _ = make_prerenderer(render=failing_render, daily_char_budget=100)
+    try:
+        prerenderer.run("m1", "<p>Budgeting basics.</p>")
+        assert False, "The render error should propagate"
+    except RuntimeError:
+        pass
+    stats = prerenderer.get_stats()
+    assert stats["budget_remaining_today"] == 100 and stats["errors"] == 1
+    print("✅ Failed renders are retried without spending the budget")
+
+if __name__ == "__main__":
+    test_queue_and_render()
+    test_daily_budget()
+    test_renders_wait_for_a_slot()
+    test_failed_render_refunds_budget()
+
+    print("\nAll tests completed!")
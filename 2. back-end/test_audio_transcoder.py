@@ -0,0 +1,68 @@
+import os
+from audio_transcoder import AudioTranscoder, negotiate_audio_format
+
+class FakeAccept:
+    """Parsed Accept header that ranks media types by quality"""
+    def __init__(self, qualities):
+        self.qualities = qualities
+
+    def __bool__(self):
+        return bool(self.qualities)
+
+    def best_match(self, matches):
+        ranked = [(self.qualities.get(match, 0), -i, match) for i, match in enumerate(matches)]
+        quality, _, match = max(ranked)
+        return match if quality > 0 else None
+
+def fake_convert(audio, audio_format, bitrate, target_dbfs):
+    """Stand-in encoder that records where and how it ran"""
+    if audio == b"corrupt":
+        raise ValueError("Could not decode audio")
+    return f"{audio_format}:{bitrate}:{target_dbfs}:{os.getpid()}".encode()
+
+def test_negotiate_audio_format():
+    """Test that ?format= wins over the Accept header"""
+    assert negotiate_audio_format("OGG", FakeAccept({"audio/mpeg": 1})) == "ogg"
+    assert negotiate_audio_format("flac") is None
+    assert negotiate_audio_format(None, FakeAccept({"audio/ogg": 1, "audio/mpeg": 0.5})) == "ogg"
+    assert negotiate_audio_format(None, FakeAccept({"audio/x-wav": 1})) == "wav"
+    assert negotiate_audio_format(None, FakeAccept({"text/html": 1})) == "mp3"
+    assert negotiate_audio_format(None, FakeAccept({})) == "mp3"
+    print("✅ Audio format is negotiated from the request")
+
+def test_transcodes_in_worker_process():
+    """Test that conversion runs in a separate process with per-format settings"""
+    transcoder = AudioTranscoder(max_workers=1, bitrates={"mp3": "64k", "ogg": "32k"},
+                                 target_dbfs=-20, timeout=30, convert=fake_convert)
+    try:
+        mp3 = transcoder.transcode(b"RIFF raw audio", "mp3").decode().split(":")
+        assert mp3[:3] == ["mp3", "64k", "-20"]
+        assert int(mp3[3]) != os.getpid()
+
+        wav = transcoder.transcode(b"RIFF raw audio", "wav").decode()
+        assert wav.startswith("wav:None:")
+
+        try:
+            transcoder.transcode(b"RIFF raw audio", "flac")
+            assert False, "Unsupported formats should be rejected"
+        except ValueError:
+            pass
+
+        try:
+            transcoder.transcode(b"corrupt", "mp3")
+            assert False, "Conversion errors should propagate"
+        except ValueError as e:
+            assert "decode" in str(e)
+
+        stats = transcoder.get_stats()
+        assert stats["transcoded"] == 2 and stats["failures"] == 1
+        assert stats["bytes_in"] == 2 * len(b"RIFF raw audio")
+    finally:
+        transcoder.shutdown()
+    print("✅ Audio is transcoded in the process pool")
+
+if __name__ == "__main__":
+    test_negotiate_audio_format()
+    test_transcodes_in_worker_process()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,97 @@
+import time
+import threading
+from gemini_api.coalescing import CoalescingClient
+
+class SlowClient:
+    """Fake Gemini client that counts upstream calls"""
+    model_name = "fake-model"
+    
+    def __init__(self, fail=False, delay=0.2):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+    
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return f"response to {prompt}"
+
+def run_concurrently(client, prompt, count):
+    """Call generate_content from several threads at once"""
+    results, errors = [], []
+    
+    def worker():
+        try:
+            results.append(client.generate_content(prompt))
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_identical_prompts_share_one_call():
+    """Test that concurrent identical prompts make a single upstream call"""
+    upstream = SlowClient()
+    client = CoalescingClient(upstream)
+    results, errors = run_concurrently(client, "budgeting", 10)
+    
+    assert upstream.calls == 1
+    assert not errors and results == ["response to budgeting"] * 10
+    stats = client.get_stats()
+    assert stats["coalesced"] == 9
+    print("✅ 10 concurrent requests made 1 upstream call:", stats)
+
+def test_errors_fan_out():
+    """Test that an upstream failure is raised to every waiter"""
+    upstream = SlowClient(fail=True)
+    client = CoalescingClient(upstream)
+    results, errors = run_concurrently(client, "investing", 5)
+    
+    assert upstream.calls == 1
+    assert not results and len(errors) == 5
+    assert client.get_stats()["shared_errors"] == 4
+    print("✅ Upstream error delivered to all 5 callers")
+
+def test_sequential_calls_are_not_coalesced():
+    """Test that coalescing only applies to calls in flight at the same time"""
+    upstream = SlowClient()
+    client = CoalescingClient(upstream)
+    client.generate_content("saving")
+    client.generate_content("saving")
+    assert upstream.calls == 2
+    assert client.model_name == "fake-model"
+    print("✅ Sequential calls each reach the upstream client")
+
+def test_waiters_honor_their_deadline():
+    """Test that a caller joining a hung call gives up at its own deadline"""
+    upstream = SlowClient(delay=1.0)
+    client = CoalescingClient(upstream)
+    leader = threading.Thread(target=client.generate_content, args=("retirement",))
+    leader.start()
+    time.sleep(0.05)
+    
+    started = time.time()
+    try:
+        client.generate_content("retirement", timeout=0.1)
+        assert False, "The waiter should time out"
+    except TimeoutError:
+        pass
+    assert time.time() - started < 0.5
+    leader.join()
+    assert upstream.calls == 1
+    assert client.get_stats()["wait_timeouts"] == 1
+    print("✅ Coalesced callers stop waiting at their deadline")
+
+if __name__ == "__main__":
+    test_identical_prompts_share_one_call()
+    test_errors_fan_out()
+    test_sequential_calls_are_not_coalesced()
+    test_waiters_honor_their_deadline()
+    
+    print("\nAll tests completed!")
@@ -0,0 +1,98 @@
+import os
+import time
+import tempfile
+from durable_queue import DurableQueue
+
+def make_queue(**overrides):
+    """Create a DurableQueue in a throwaway database"""
+    settings = {
+        "db_path": os.path.join(tempfile.mkdtemp(prefix="durable_queue_"), "jobs.db"),
+        "visibility_timeout": 60,
+        "max_attempts": 2,
+        "backoff_base": 0.01,
+        "backoff_max": 0.01
+    }
+    settings.update(overrides)
+    return DurableQueue(**settings)
+
+def test_lease_and_complete():
+    """Test that a leased job is hidden from other workers until completed"""
+    queue = make_queue()
+    job_id = queue.enqueue("generate_quiz", {"module_id": "m1"})
+    
+    job = queue.lease("worker-a")
+    assert job["id"] == job_id and job["payload"] == {"module_id": "m1"}
+    assert queue.lease("worker-b") is None
+    
+    assert queue.complete(job_id, "worker-a", {"quiz_id": "q1"})
+    stored = queue.get(job_id)
+    assert stored["status"] == "completed" and stored["result"] == {"quiz_id": "q1"}
+    print("✅ Leased job completed:", queue.get_stats())
+
+def test_expired_lease_is_recovered():
+    """Test that a job held by a dead worker is handed out again"""
+    queue = make_queue(visibility_timeout=0.05)
+    job_id = queue.enqueue("generate_quiz", {"module_id": "m2"})
+    queue.lease("crashed-worker")
+    time.sleep(0.1)
+    
+    job = queue.lease("worker-b")
+    assert job["id"] == job_id and job["attempts"] == 2
+    # The crashed worker no longer holds the lease
+    assert not queue.complete(job_id, "crashed-worker")
+    print("✅ Expired lease recovered by another worker")
+
+def test_retry_then_dead_letter():
+    """Test that failures back off and are dead-lettered after max attempts"""
+    queue = make_queue()
+    job_id = queue.enqueue("generate_quiz", {"module_id": "m3"})
+    
+    job = queue.lease("worker-a")
+    assert queue.fail(job_id, "worker-a", "Gemini timeout") == "queued"
+    time.sleep(0.02)
+    
+    job = queue.lease("worker-a")
+    assert job["attempts"] == 2
+    assert queue.fail(job_id, "worker-a", "Gemini timeout") == "dead"
+    assert queue.lease("worker-a") is None
+    
+    stats = queue.get_stats()
+    assert stats["dead"] == 1 and stats["dead_letters"] == 1
+    print("✅ Job dead-lettered after retries:", stats)
+
+def test_priority_order():
+    """Test that higher priority jobs are leased first"""
+    queue = make_queue()
+    low = queue.enqueue("tts", {}, priority=-1)
+    high = queue.enqueue("generate_quiz", {}, priority=1)
+    assert queue.lease("worker-a")["id"] == high
+    assert queue.lease("worker-a", kinds=["generate_quiz"]) is None
+    assert queue.lease("worker-a")["id"] == low
+    print("✅ Jobs leased in priority order")
+
+def test_groups_and_release():
+    """Test that grouped jobs are listed together and released jobs keep their attempts"""
+    queue = make_queue()
+    first = queue.enqueue("generate_interest_module", {"user_id": "u1", "topic": "Saving"}, group_id="batch-1")
+    second = queue.enqueue("generate_interest_module", {"user_id": "u1", "topic": "Credit"}, group_id="batch-1")
+    queue.enqueue("generate_interest_module", {"user_id": "u2", "topic": "Taxes"}, group_id="batch-2")
+    assert [job["id"] for job in queue.get_group("batch-1")] == [first, second]
+    
+    job = queue.lease("worker-a")
+    assert queue.count_running("generate_interest_module", "user_id", "u1") == 1
+    assert queue.count_running("generate_interest_module", "user_id", "u2") == 0
+    
+    assert queue.release(job["id"], "worker-a", delay=60)
+    released = queue.get(job["id"])
+    assert released["status"] == "queued" and released["attempts"] == 0
+    assert queue.count_running("generate_interest_module", "user_id", "u1") == 0
+    print("✅ Grouped jobs are listed and released without using an attempt")
+
+if __name__ == "__main__":
+    test_lease_and_complete()
+    test_expired_lease_is_recovered()
+    test_retry_then_dead_letter()
+    test_priority_order()
+    test_groups_and_release()
+    
+    print("\nAll tests completed!")
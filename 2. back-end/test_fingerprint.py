@@ -0,0 +1,72 @@
+import os
+import random
+import tempfile
+from fingerprint import FingerprintIndex, fingerprint, shingles, similarity
+
+WORDS = ("budget saving interest loan credit equity bond market inflation risk return asset liability "
+         "income expense tax dividend portfolio index fund").split()
+
+def make_text(seed, words=600):
+    """Build a reproducible pseudo-syllabus text"""
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def make_index(**kwargs):
+    """Create an index in a throwaway database"""
+    path = os.path.join(tempfile.mkdtemp(prefix="fingerprints_"), "fingerprints.db")
+    return FingerprintIndex(db_path=path, threshold=kwargs.pop("threshold", 0.8), **kwargs), path
+
+def test_signature_estimates_jaccard():
+    """Test that signature similarity tracks the true shingle overlap"""
+    text = make_text(1)
+    edited = text.replace(text[:200], make_text(2, 30))
+
+    a, b = shingles(text), shingles(edited)
+    jaccard = len(a & b) / len(a | b)
+    estimate = similarity(fingerprint(text)["signature"], fingerprint(edited)["signature"])
+    assert abs(estimate - jaccard) < 0.15, f"estimate {estimate:.2f} vs jaccard {jaccard:.2f}"
+    assert similarity(fingerprint(text)["signature"], fingerprint(make_text(3))["signature"]) < 0.3
+    print("✅ MinHash signatures estimate Jaccard similarity")
+
+def test_exact_and_near_duplicates():
+    """Test exact, near-duplicate and unrelated lookups"""
+    index, _ = make_index()
+    text = make_text(1)
+    entry_id = index.add("syllabus", fingerprint(text), {"units": ["Budgeting"]})
+
+    # Formatting changes do not change the content hash
+    exact = index.find("syllabus", fingerprint(text.upper().replace(" ", "  \n")))
+    assert exact == {"id": entry_id, "payload": {"units": ["Budgeting"]}, "similarity": 1.0}
+
+    # A few edited lines still match
+    words = text.split()
+    words[100:110] = ["semester", "two"] * 5
+    near = index.find("syllabus", fingerprint(' '.join(words)))
+    assert near and near["id"] == entry_id and 0.8 <= near["similarity"] < 1.0
+
+    assert index.find("syllabus", fingerprint(make_text(4))) is None
+    # Kinds are separate
+    assert index.find("unit:Basic", fingerprint(text)) is None
+
+    stats = index.get_stats()
+    assert stats["exact_hits"] == 1 and stats["similar_hits"] == 1 and stats["misses"] == 2
+    print("✅ Re-uploads and near-duplicates are matched")
+
+def test_persists_and_prunes():
+    """Test that the index is shared through its database file and stays bounded"""
+    index, path = make_index(max_entries=3)
+    for seed in range(5):
+        index.add("syllabus", fingerprint(make_text(seed)), {"seed": seed})
+
+    reopened = FingerprintIndex(db_path=path, threshold=0.8, max_entries=3)
+    assert reopened.get_stats()["entries"] == {"syllabus": 3}
+    assert reopened.find("syllabus", fingerprint(make_text(4)))["payload"] == {"seed": 4}
+    assert reopened.find("syllabus", fingerprint(make_text(0))) is None
+    print("✅ The index persists locally and drops its oldest entries")
+
+if __name__ == "__main__":
+    test_signature_estimates_jaccard()
+    test_exact_and_near_duplicates()
+    test_persists_and_prunes()
+
+    print("\nAll tests completed!")
@@ -5,7 +5,7 @@ async def test_gemini_client():
     """Test that the Gemini client is properly configured with environment variables"""
     try:
         # Simple test prompt
-        response = await gemini_client.generate_content(
+        response = await gemini_client.generate_content_async(
             prompt="Respond with a simple JSON containing a success message"
         )
         
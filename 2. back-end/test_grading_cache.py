@@ -0,0 +1,73 @@
+import time
+from grading_cache import GradingCache, normalize_answer
+
+KEY_POINTS = ["Compound interest", "Time"]
+EVALUATION = {"score": 85, "feedback": "Good use of compounding"}
+
+def make_cache(max_entries=100, ttl_seconds=3600):
+    """Create a GradingCache with explicit settings"""
+    cache = object.__new__(GradingCache)
+    cache._configure(max_entries=max_entries, ttl_seconds=ttl_seconds)
+    return cache
+
+def test_trivially_different_answers_share_a_key():
+    """Test that case, whitespace and punctuation do not change the key"""
+    assert normalize_answer("  Save EARLY,  it compounds! ") == "save early it compounds"
+    key = GradingCache.make_key("quiz1", "q2", KEY_POINTS, "Save early, it compounds.")
+    assert GradingCache.make_key("quiz1", "q2", KEY_POINTS, "save EARLY it   compounds") == key
+    print("✅ Trivially different answers share a cache entry")
+
+def test_question_and_key_points_are_part_of_the_key():
+    """Test that another question or changed key points miss the cache"""
+    cache = make_cache()
+    cache.put(GradingCache.make_key("quiz1", "q2", KEY_POINTS, "Save early"), EVALUATION)
+
+    assert cache.get(GradingCache.make_key("quiz1", "q3", KEY_POINTS, "Save early")) is None
+    assert cache.get(GradingCache.make_key("quiz1", "q2", KEY_POINTS + ["Risk"], "Save early")) is None
+    assert cache.get(GradingCache.make_key("quiz1", "q2", KEY_POINTS, "Save early")) == EVALUATION
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    print("✅ Cache keys depend on the question and its key points")
+
+def test_entries_expire():
+    """Test that results are not reused after the TTL"""
+    cache = make_cache(ttl_seconds=0.05)
+    key = GradingCache.make_key("quiz1", "q2", KEY_POINTS, "Save early")
+    cache.put(key, EVALUATION)
+    assert cache.get(key) == EVALUATION
+
+    time.sleep(0.1)
+    assert cache.get(key) is None
+    assert cache.get_stats()["entries"] == 0
+    print("✅ Cached grades expire")
+
+def test_lru_eviction():
+    """Test that the least recently used result is evicted at capacity"""
+    cache = make_cache(max_entries=2)
+    cache.put("a", EVALUATION)
+    cache.put("b", EVALUATION)
+    assert cache.get("a") is not None
+    cache.put("c", EVALUATION)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.get_stats()["evictions"] == 1
+    print("✅ Least recently used grades are evicted")
+
+def test_fallback_results_are_not_stored():
+    """Test that default results from a failed grading are never reused"""
+    cache = make_cache()
+    cache.put("a", {"score": 70, "feedback": "Default", "fallback": True})
+    assert cache.get("a") is None
+    assert cache.get_stats()["entries"] == 0
+    print("✅ Fallback grades are not cached")
+
+if __name__ == "__main__":
+    test_trivially_different_answers_share_a_key()
+    test_question_and_key_points_are_part_of_the_key()
+    test_entries_expire()
+    test_lru_eviction()
+    test_fallback_results_are_not_stored()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,104 @@
+import time
+import threading
+from gemini_api.hedging import HedgingClient, LatencyTracker
+
+class ScriptedClient:
+    """Fake Gemini client whose calls take scripted amounts of time"""
+    model_name = "fake-model"
+    
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.timeouts = []
+        self._lock = threading.Lock()
+    
+    def generate_content(self, prompt, timeout=None, **kwargs):
+        with self._lock:
+            delay = self.delays[self.calls % len(self.delays)]
+            self.calls += 1
+            call_number = self.calls
+            self.timeouts.append(timeout)
+        time.sleep(delay)
+        return f"response {call_number} to {prompt}"
+
+def make_client(delays, **overrides):
+    settings = {"enabled": True, "percentile": 90, "min_samples": 5, "window": 50, "max_workers": 4}
+    settings.update(overrides)
+    return HedgingClient(ScriptedClient(delays), **settings)
+
+def test_latency_percentiles():
+    """Test the nearest-rank percentiles of the latency window"""
+    tracker = LatencyTracker(window=100)
+    assert tracker.percentile(95) is None
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    assert tracker.percentile(50) == 0.05
+    assert tracker.percentile(95) == 0.095
+    assert tracker.get_stats()['p99_ms'] == 99.0
+    print("✅ Latency percentiles are computed over the window")
+
+def test_slow_call_is_hedged():
+    """Test that a call slower than the latency percentile is raced by a hedge"""
+    hedging = make_client([0.01])
+    # Warm the latency window with fast calls
+    for _ in range(5):
+        hedging.generate_content("warm-up")
+    assert hedging.hedge_delay() is not None
+    
+    # The next call is very slow; its hedge returns quickly and wins
+    hedging._client.delays = [0.5, 0.01]
+    hedging._client.calls = 0
+    started = time.monotonic()
+    response = hedging.generate_content("lesson")
+    elapsed = time.monotonic() - started
+    
+    assert response == "response 2 to lesson"
+    assert elapsed < 0.3
+    stats = hedging.get_stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+    
+    # Once the abandoned primary finishes, the time saved is recorded
+    time.sleep(0.6)
+    assert hedging.get_stats()['avg_latency_won_ms'] > 300
+    print("✅ Slow calls are hedged and the first response wins")
+
+def test_hedging_disabled_and_warming():
+    """Test that nothing is hedged until enabled and warmed up"""
+    disabled = make_client([0.01], enabled=False)
+    for _ in range(10):
+        disabled.generate_content("prompt")
+    assert disabled.hedge_delay() is None
+    
+    cold = make_client([0.01], min_samples=50)
+    cold.generate_content("prompt")
+    assert cold.hedge_delay() is None
+    assert cold.get_stats()['hedged'] == 0
+    print("✅ Hedging waits until enabled and the window has enough samples")
+
+def test_deadline():
+    """Test that a call past its deadline raises TimeoutError"""
+    hedging = make_client([0.5], enabled=False)
+    started = time.monotonic()
+    try:
+        hedging.generate_content("slow", timeout=0.1)
+        assert False, "Expected TimeoutError"
+    except TimeoutError:
+        pass
+    assert time.monotonic() - started < 0.3
+    # The remaining time is passed on to the wrapped client
+    assert 0 < hedging._client.timeouts[0] <= 0.1
+    assert hedging.get_stats()['deadline_exceeded'] == 1
+    
+    # Calls that finish in time are unaffected
+    fast = make_client([0.01], enabled=False)
+    assert fast.generate_content("quick", timeout=1) == "response 1 to quick"
+    print("✅ Deadlines bound the wait for slow calls")
+
+if __name__ == "__main__":
+    test_latency_percentiles()
+    test_slow_call_is_hedged()
+    test_hedging_disabled_and_warming()
+    test_deadline()
+    
+    print("\nAll tests completed!")
@@ -0,0 +1,142 @@
+import os
+import time
+import tempfile
+import threading
+from durable_queue import DurableQueue
+from job_manager import JobManager, JobQueueFullError
+
+def make_manager(visibility_timeout=60, worker_count=2, queue_size=10):
+    """Create a JobManager on a throwaway durable queue"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="job_manager_"), "jobs.db")
+    manager = object.__new__(JobManager)
+    manager._configure(
+        job_queue=DurableQueue(db_path=db_path, visibility_timeout=visibility_timeout, max_attempts=3,
+                               backoff_base=0.01),
+        worker_count=worker_count,
+        queue_size=queue_size,
+        retention_seconds=3600,
+        poll_interval=0.05
+    )
+    return manager
+
+def wait_for_status(manager, job_id, status, timeout=5):
+    """Poll a job until it reaches a status"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get_job(job_id)
+        if job and job["status"] == status:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not reach {status}")
+
+def test_slow_job_keeps_its_lease():
+    """Test that a job running past the visibility timeout is not run a second time"""
+    manager = make_manager(visibility_timeout=0.3, worker_count=2)
+    runs = []
+    lock = threading.Lock()
+
+    def slow_handler(topic):
+        with lock:
+            runs.append(topic)
+        time.sleep(1.0)
+        return {"topic": topic}
+
+    manager.register("slow", slow_handler)
+    job_id = manager.submit("slow", {"topic": "budgeting"})
+    wait_for_status(manager, job_id, "completed")
+
+    assert runs == ["budgeting"]
+    assert manager.get_stats()["completed"] == 1
+    print("✅ The heartbeat keeps slow jobs leased to their worker")
+
+def test_full_queue_rejects_jobs():
+    """Test that submissions are refused once the queue holds queue_size jobs"""
+    manager = make_manager(worker_count=1, queue_size=3)
+    release = threading.Event()
+    manager.register("blocked", lambda n: release.wait(5))
+
+    job_ids = [manager.submit("blocked", {"n": n}) for n in range(3)]
+    assert not manager.has_capacity()
+
+    try:
+        manager.submit("blocked", {"n": 3})
+        raise AssertionError("Expected JobQueueFullError")
+    except JobQueueFullError:
+        pass
+
+    started = time.time()
+    try:
+        manager.submit("blocked", {"n": 4}, timeout=0.2)
+        raise AssertionError("Expected JobQueueFullError")
+    except JobQueueFullError:
+        pass
+    assert time.time() - started >= 0.2
+
+    release.set()
+    for job_id in job_ids:
+        wait_for_status(manager, job_id, "completed")
+    assert manager.has_capacity(3)
+    stats = manager.get_stats()
+    assert stats["submitted"] == 3 and stats["rejected"] == 2
+    print("✅ A full queue rejects new jobs")
+
+def test_workers_are_bounded():
+    """Test that no more than worker_count jobs run at the same time"""
+    manager = make_manager(worker_count=2)
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def tracked_handler(n):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.2)
+        with lock:
+            running[0] -= 1
+        return {"n": n}
+
+    manager.register("tracked", tracked_handler)
+    job_ids = [manager.submit("tracked", {"n": n}) for n in range(6)]
+    for job_id in job_ids:
+        wait_for_status(manager, job_id, "completed")
+
+    assert peak[0] == 2
+    assert manager.get_stats()["completed"] == 6
+    print("✅ At most", peak[0], "jobs ran at once")
+
+def test_job_status_lookup():
+    """Test that get_job reports each stage of a job's life"""
+    manager = make_manager(worker_count=1)
+    release = threading.Event()
+    manager.register("blocked", lambda n: release.wait(5) and {"n": n})
+
+    def failing_handler(n):
+        raise RuntimeError("Gemini unavailable")
+
+    manager.register("failing", failing_handler)
+
+    assert manager.get_job("missing-job") is None
+
+    first = manager.submit("blocked", {"n": 1})
+    second = manager.submit("blocked", {"n": 2})
+    wait_for_status(manager, first, "running")
+    assert manager.get_job(second)["status"] == "queued"
+
+    release.set()
+    job = wait_for_status(manager, second, "completed")
+    assert job["result"] == {"n": 2} and job["kind"] == "blocked"
+
+    failed = manager.submit("failing", {"n": 3})
+    job = wait_for_status(manager, failed, "failed")
+    assert job["attempts"] == 3 and "Gemini unavailable" in job["error"]
+    assert manager.get_stats()["failed"] == 1
+    print("✅ Job status is reported from queued to completed or failed")
+
+if __name__ == "__main__":
+    test_slow_job_keeps_its_lease()
+    test_full_queue_rejects_jobs()
+    test_workers_are_bounded()
+    test_job_status_lookup()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,104 @@
+import json
+import time
+from json_extractor import extract_json, extract_quiz, extract_evaluation, extract_units, repair_json, JSONExtractionError
+
+MCQ = {"id": "q1", "type": "mcq", "question": "What is a budget?",
+       "options": ["A plan", "A loan", "A tax", "A bond"], "correct_answer": 0, "explanation": "A budget is a plan"}
+FREE_TEXT = {"id": "q2", "type": "free_text", "question": "Why save early?",
+             "sample_answer": "Compounding", "key_points": ["Compound interest", "Time"]}
+
+def test_prose_and_code_fences():
+    """Test extraction from prose and Markdown code fences"""
+    text = "Here is your quiz:\n```json\n" + json.dumps({"questions": [MCQ]}) + "\n```\nGood luck {student}!"
+    assert extract_json(text) == {"questions": [MCQ]}
+    
+    # Braces inside strings must not end the object early
+    text = 'Result: {"score": 90, "feedback": "Use {curly} braces \\" and } freely"} trailing {'
+    assert extract_evaluation(text) == {"score": 90, "feedback": 'Use {curly} braces " and } freely'}
+    print("✅ JSON extracted from prose and code fences")
+
+def test_skips_non_json_braces():
+    """Test that brace-delimited prose before the JSON is skipped"""
+    text = 'Consider {this note} first. {"score": "85", "feedback": "Good"}'
+    assert extract_evaluation(text) == {"score": 85, "feedback": "Good"}
+    print("✅ Non-JSON braces skipped")
+
+def test_repairs_common_defects():
+    """Test trailing commas, comments and Python literals"""
+    assert json.loads(repair_json('{"a": [1, 2,], "b": True, // note\n "c": None,}')) == {"a": [1, 2], "b": True, "c": None}
+    print("✅ Trailing commas, comments and literals repaired")
+
+def test_truncated_quiz():
+    """Test that a response cut off mid-question keeps the complete questions"""
+    full = json.dumps({"questions": [MCQ, FREE_TEXT, MCQ]})
+    truncated = full[:full.rindex('"options"') + 15]
+    quiz = extract_quiz(truncated)
+    assert [q["id"] for q in quiz["questions"]] == ["q1", "q2"]
+    
+    # Cut off inside a string value
+    quiz = extract_quiz('{"questions": [' + json.dumps(MCQ) + ', {"id": "q2", "question": "Why sa')
+    assert len(quiz["questions"]) == 1
+    print("✅ Truncated quizzes keep their complete questions")
+
+def test_schema_validation():
+    """Test that invalid questions are dropped and answers are normalized"""
+    bad_mcq = dict(MCQ, id="q3", correct_answer=7)
+    named_answer = dict(MCQ, id="q4", correct_answer="A loan")
+    quiz = extract_quiz(json.dumps([bad_mcq, named_answer, {"question": ""}]))
+    assert [(q["id"], q["correct_answer"]) for q in quiz["questions"]] == [("q4", 1)]
+    
+    assert extract_evaluation('{"score": 140, "feedback": ""}')["score"] == 100
+    
+    for text in ["no json here", '{"questions": []}', '{"feedback": "no score"}']:
+        try:
+            extract_evaluation(text) if "feedback" in text else extract_quiz(text)
+            assert False, f"Expected failure for {text}"
+        except JSONExtractionError:
+            pass
+    print("✅ Schema validation drops unusable questions and evaluations")
+
+def test_syllabus_units():
+    """Test that syllabus units are validated and normalized"""
+    text = '```json\n{"units": [{"unit_title": "  Supply and   Demand ", "key_summary": "Markets", ' \
+           '"key_topics": ["Equilibrium", "", "Elasticity", "Surplus", "Efficiency", "Shortages", "Taxes"]}, ' \
+           '{"key_summary": "No title"},]}\n```'
+    units = extract_units(text)["units"]
+    assert len(units) == 1
+    assert units[0]["unit_title"] == "Supply and Demand"
+    assert units[0]["key_topics"] == ["Equilibrium", "Elasticity", "Surplus", "Efficiency", "Shortages"]
+    
+    assert extract_units('[]') == {"units": []}
+    try:
+        extract_units('{"modules": []}')
+        assert False, "Expected failure without a units list"
+    except JSONExtractionError:
+        pass
+    print("✅ Syllabus units are validated")
+
+def test_pathological_input():
+    """Test that unclosed and deeply nested brackets fail fast with JSONExtractionError"""
+    for text in ['note { ' * 4000, '{"a": ' * 2000, '[' * 20000]:
+        started = time.monotonic()
+        try:
+            extract_json(text)
+            assert False, "Expected failure for unclosed brackets"
+        except JSONExtractionError:
+            pass
+        # One pass over the text, not one per unclosed bracket
+        assert time.monotonic() - started < 2
+    
+    # A value nested in prose braces that never close is still found
+    text = 'Consider {this note first. {"score": 85, "feedback": "Good"} end'
+    assert extract_evaluation(text) == {"score": 85, "feedback": "Good"}
+    print("✅ Pathological input fails fast")
+
+if __name__ == "__main__":
+    test_prose_and_code_fences()
+    test_skips_non_json_braces()
+    test_repairs_common_defects()
+    test_truncated_quiz()
+    test_schema_validation()
+    test_syllabus_units()
+    test_pathological_input()
+    
+    print("\nAll tests completed!")
@@ -42,7 +42,7 @@ async def test_financial_lesson_generation():
     """
     
     # Generate content with HTML formatting
-    response = await gemini_client.generate_content(
+    response = await gemini_client.generate_content_async(
         prompt=prompt,
         output_format="html",
         system_instruction=system_instruction
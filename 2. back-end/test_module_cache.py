@@ -0,0 +1,112 @@
+import os
+import time
+import tempfile
+from module_cache import ModuleCache, normalize_topic
+
+def make_cache(**overrides):
+    """Create a ModuleCache pointed at a throwaway directory"""
+    cache = object.__new__(ModuleCache)
+    settings = {
+        "cache_dir": tempfile.mkdtemp(prefix="module_cache_"),
+        "memory_entries": 2,
+        "max_bytes": 1024 * 1024,
+        "max_age_seconds": 3600
+    }
+    settings.update(overrides)
+    cache._configure(**settings)
+    return cache
+
+def test_key_normalization():
+    """Test that equivalent topics share a cache key"""
+    assert normalize_topic("  Budgeting!! ") == "budgeting"
+    key_a = ModuleCache.make_key("Budgeting", "Basic", "1", "gemini-pro")
+    key_b = ModuleCache.make_key(" budgeting ", "basic", "1", "gemini-pro")
+    key_c = ModuleCache.make_key("budgeting", "Basic", "2", "gemini-pro")
+    assert key_a == key_b
+    assert key_a != key_c
+    print("✅ Equivalent topics share a cache key")
+
+def test_memory_and_disk_tiers():
+    """Test that entries survive memory eviction via the disk tier"""
+    cache = make_cache()
+    for i in range(3):
+        cache.put(f"key{i}", f"<h1>Lesson {i}</h1>")
+    
+    # key0 was pushed out of memory but is still on disk
+    assert "key0" not in cache._memory
+    assert cache.get("key0") == "<h1>Lesson 0</h1>"
+    assert cache.get("missing") is None
+    
+    stats = cache.get_stats()
+    assert stats["disk_hits"] == 1 and stats["misses"] == 1
+    print("✅ Disk tier serves entries evicted from memory:", stats)
+
+def test_age_and_size_eviction():
+    """Test that expired and over-quota entries are removed"""
+    cache = make_cache(max_bytes=40)
+    cache.put("old", "x" * 30)
+    old_path = cache._path_for("old")
+    stale = time.time() - 10
+    os.utime(old_path, (stale, stale))
+    cache.put("new", "y" * 30)
+    
+    # The older entry is trimmed to get back under the byte quota
+    assert not os.path.exists(old_path)
+    assert cache.get("new") == "y" * 30
+    
+    expiring = make_cache(max_age_seconds=1)
+    expiring.put("lesson", "<p>content</p>")
+    expiring._memory.clear()
+    past = time.time() - 5
+    os.utime(expiring._path_for("lesson"), (past, past))
+    assert expiring.get("lesson") is None
+    print("✅ Size and age based eviction work")
+
+def test_puts_do_not_rescan_disk():
+    """Test that writes under the quota use the running index instead of walking the directory"""
+    cache = make_cache(max_bytes=100)
+    walks = []
+    original_walk = os.walk
+    os.walk = lambda *args, **kwargs: walks.append(args) or original_walk(*args, **kwargs)
+    try:
+        cache.put("a", "x" * 40)
+        cache.put("b", "y" * 40)
+        assert not walks
+        assert cache.get_stats()["disk_bytes"] == 80
+        
+        # Using "a" makes "b" the least recently used entry when the quota is crossed
+        cache._memory.clear()
+        assert cache.get("a") == "x" * 40
+        cache.put("c", "z" * 40)
+        assert len(walks) == 1
+    finally:
+        os.walk = original_walk
+    
+    assert not os.path.exists(cache._path_for("b"))
+    assert cache.get("a") == "x" * 40
+    assert cache.get_stats()["disk_bytes"] == 80
+    print("✅ The disk tier is trimmed from a running index")
+
+def test_quiz_entries():
+    """Test that a module's quiz is cached under the lesson's key"""
+    cache = make_cache()
+    questions = [{"id": "q1", "type": "mcq", "question": "?", "options": ["a", "b"], "correct_answer": 0}]
+    
+    assert cache.get_quiz("lesson") is None
+    assert cache.put_quiz("lesson", questions)
+    assert not cache.put_quiz("empty", [])
+    assert cache.get_quiz("lesson") == questions
+    
+    stats = cache.get_stats()
+    assert stats["quiz_hits"] == 1
+    assert stats["quiz_stores"] == 1
+    print("✅ Quizzes are cached alongside lessons")
+
+if __name__ == "__main__":
+    test_key_normalization()
+    test_memory_and_disk_tiers()
+    test_age_and_size_eviction()
+    test_puts_do_not_rescan_disk()
+    test_quiz_entries()
+    
+    print("\nAll tests completed!")
@@ -0,0 +1,160 @@
+import os
+import time
+import tempfile
+import threading
+from durable_queue import DurableQueue
+from job_manager import JobManager, JobQueueFullError
+from module_service import ModuleFanOut, unique_topics
+
+class FakeGenerator:
+    """Fake module generator that tracks how many topics run at once per user"""
+    
+    def __init__(self, delay=0.1, fail_topics=()):
+        self.delay = delay
+        self.fail_topics = set(fail_topics)
+        self.active = {}
+        self.peak = {}
+        self._lock = threading.Lock()
+    
+    def __call__(self, user_id, topic, level):
+        with self._lock:
+            self.active[user_id] = self.active.get(user_id, 0) + 1
+            self.peak[user_id] = max(self.peak.get(user_id, 0), self.active[user_id])
+        time.sleep(self.delay)
+        with self._lock:
+            self.active[user_id] -= 1
+        if topic in self.fail_topics:
+            raise RuntimeError(f"Gemini failed for {topic}")
+        return {"module_id": f"{user_id}-{topic}-{level}", "from_cache": False}
+
+def make_manager(db_path=None, worker_count=8, max_attempts=3, queue_size=50):
+    """Create a JobManager, on a throwaway durable queue unless a path is given"""
+    db_path = db_path or os.path.join(tempfile.mkdtemp(prefix="module_service_"), "jobs.db")
+    manager = object.__new__(JobManager)
+    manager._configure(
+        job_queue=DurableQueue(db_path=db_path, max_attempts=max_attempts, backoff_base=0.01),
+        worker_count=worker_count,
+        queue_size=queue_size,
+        retention_seconds=3600,
+        poll_interval=0.02
+    )
+    return manager
+
+def test_unique_topics():
+    """Test that blank and repeated topics are dropped"""
+    assert unique_topics(["Saving", " saving ", "", "Investing", "Saving"]) == ["Saving", "Investing"]
+    print("✅ Topics are de-duplicated")
+
+def test_parallel_fan_out_with_per_user_cap():
+    """Test that topics run concurrently but never above the per-user limit"""
+    generator = FakeGenerator(delay=0.1)
+    fanout = ModuleFanOut(make_manager(worker_count=8), generator, per_user_limit=2,
+                          defer_seconds=0.05, poll_interval=0.02)
+    topics = ["Budgeting", "Saving", "Investing", "Credit", "Taxes", "Insurance"]
+    
+    started = time.monotonic()
+    batch_id, rejected = fanout.submit("user1", topics)
+    assert rejected == []
+    # Submitting returns before the modules are generated
+    assert time.monotonic() - started < 0.05
+    assert fanout.get_batch(batch_id)["status"] == "running"
+    
+    batch = fanout.wait(batch_id, timeout=5)
+    elapsed = time.monotonic() - started
+    
+    assert batch["status"] == "completed"
+    assert batch["counts"]["completed"] == 6
+    assert generator.peak["user1"] <= 2
+    # 6 topics, at most 2 at a time: well under 6 sequential calls plus deferrals
+    assert elapsed < 1.5
+    assert [topic["topic"] for topic in batch["topics"]] == topics
+    assert batch["topics"][0]["result"]["module_id"] == "user1-Budgeting-Basic"
+    assert fanout.get_stats()["deferred"] > 0
+    print("✅ Topics are generated concurrently under the per-user cap")
+
+def test_users_do_not_block_each_other():
+    """Test that one user's long batch does not hold up another user"""
+    generator = FakeGenerator(delay=0.1)
+    fanout = ModuleFanOut(make_manager(worker_count=4), generator, per_user_limit=1,
+                          defer_seconds=0.05, poll_interval=0.02)
+    
+    fanout.submit("busy", ["a", "b", "c", "d", "e"])
+    started = time.monotonic()
+    batch = fanout.wait(fanout.submit("other", ["Saving"])[0], timeout=5)
+    
+    assert batch["counts"]["completed"] == 1
+    assert time.monotonic() - started < 0.5
+    assert generator.peak["busy"] == 1
+    print("✅ Users are capped independently")
+
+def test_per_topic_failures():
+    """Test that a failing topic is reported without failing the batch"""
+    fanout = ModuleFanOut(make_manager(worker_count=4, max_attempts=1), FakeGenerator(delay=0.01, fail_topics=["Crypto"]),
+                          per_user_limit=3, poll_interval=0.02)
+    batch = fanout.wait(fanout.submit("user1", ["Saving", "Crypto"])[0], timeout=5)
+    
+    by_topic = {topic["topic"]: topic for topic in batch["topics"]}
+    assert batch["status"] == "completed"
+    assert by_topic["Saving"]["status"] == "completed"
+    assert by_topic["Crypto"]["status"] == "failed"
+    assert "Gemini failed" in by_topic["Crypto"]["error"]
+    assert fanout.get_stats()["errors"] == 1
+    
+    try:
+        fanout.submit("user1", ["", " "])
+        assert False, "A batch without topics should be refused"
+    except ValueError:
+        pass
+    assert fanout.get_batch("missing") is None
+    print("✅ Per-topic failures are reported")
+
+def test_batches_are_visible_to_every_worker():
+    """Test that a batch submitted in one process can be polled from another"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="module_service_"), "jobs.db")
+    submitter = ModuleFanOut(make_manager(db_path, worker_count=2), FakeGenerator(delay=0.05),
+                             per_user_limit=3, poll_interval=0.02)
+    # A second manager on the same database stands in for another gunicorn worker
+    poller = ModuleFanOut(make_manager(db_path, worker_count=1), FakeGenerator(delay=0.05),
+                          per_user_limit=3, poll_interval=0.02)
+    
+    batch_id, _ = submitter.submit("user1", ["Saving", "Investing"])
+    batch = poller.wait(batch_id, timeout=5)
+    
+    assert batch["id"] == batch_id and batch["user_id"] == "user1"
+    assert batch["counts"]["completed"] == 2
+    assert batch["finished_at"] is not None
+    print("✅ Batch status is read from the shared job rows")
+
+def test_full_queue_rejects_remaining_topics():
+    """Test that topics the queue has no room for are rejected while the queued ones still run"""
+    release = threading.Event()
+    fanout = ModuleFanOut(make_manager(worker_count=1, queue_size=3), lambda user_id, topic, level: release.wait(5),
+                          per_user_limit=3, poll_interval=0.02)
+    
+    batch_id, rejected = fanout.submit("user1", ["Budgeting", "Saving", "Investing", "Credit", "Taxes"])
+    assert rejected == ["Credit", "Taxes"]
+    assert [topic["topic"] for topic in fanout.get_batch(batch_id)["topics"]] == ["Budgeting", "Saving", "Investing"]
+    
+    # Nothing queued at all still refuses the whole submission
+    try:
+        fanout.submit("user2", ["Insurance"])
+        assert False, "A full queue should refuse the batch"
+    except JobQueueFullError:
+        pass
+    
+    release.set()
+    batch = fanout.wait(batch_id, timeout=5)
+    assert batch["counts"]["completed"] == 3
+    stats = fanout.get_stats()
+    assert stats["topics"] == 3 and stats["rejected"] == 2
+    print("✅ Topics over the queue limit are rejected, queued ones still run")
+
+if __name__ == "__main__":
+    test_unique_topics()
+    test_parallel_fan_out_with_per_user_cap()
+    test_users_do_not_block_each_other()
+    test_per_topic_failures()
+    test_batches_are_visible_to_every_worker()
+    test_full_queue_rejects_remaining_topics()
+    
+    print("\nAll tests completed!")
@@ -0,0 +1,181 @@
+import json
+import tempfile
+from contextlib import contextmanager
+import app as backend
+from module_cache import ModuleCache
+
+STREAM_URL = "/api/generate-module/stream"
+REQUEST_DATA = {"user_id": "user-1", "topic": "budgeting", "level": "Basic"}
+
+class FakeChunk:
+    """A streamed Gemini response chunk"""
+
+    def __init__(self, text):
+        self.text = text
+
+class FakeStream:
+    """A streamed Gemini response that can fail partway and records cancellation"""
+
+    def __init__(self, parts, fail_after=None):
+        self.parts = parts
+        self.fail_after = fail_after
+        self.cancelled = False
+
+    def __iter__(self):
+        for i, part in enumerate(self.parts):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError("Gemini stream interrupted")
+            yield FakeChunk(part)
+
+    def cancel(self):
+        self.cancelled = True
+
+class FakeGemini:
+    """Fake Gemini client returning a prepared stream"""
+
+    model_name = "fake-model"
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False, timeout=None):
+        self.prompts.append(prompt)
+        return self.stream
+
+class FakeJobManager:
+    """Job manager whose queue always has room"""
+
+    def has_capacity(self, count=1):
+        return True
+
+class FakeUsageMeter:
+    """Usage meter that records calls without writing them"""
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, *args, **kwargs):
+        self.records.append(args)
+
+def make_cache():
+    """Create a ModuleCache pointed at a throwaway directory"""
+    cache = object.__new__(ModuleCache)
+    cache._configure(cache_dir=tempfile.mkdtemp(prefix="module_cache_"), memory_entries=64,
+                     max_bytes=1024 * 1024, max_age_seconds=3600)
+    return cache
+
+@contextmanager
+def patched_backend(stream, store=None, cache=None):
+    """Replace the app's Gemini client, cache, queue and storage for one request"""
+    stored = []
+
+    def fake_store(user_id, topic, level, html_content, cache_key):
+        stored.append(html_content)
+        return {"module_id": "module-1", "quiz_status": "queued", "quiz_job_id": "job-1"}
+
+    replacements = {
+        "gemini_client": FakeGemini(stream),
+        "module_cache": cache or make_cache(),
+        "job_manager": FakeJobManager(),
+        "usage_meter": FakeUsageMeter(),
+        "quota_exceeded_response": lambda user_id: None,
+        "store_generated_module": store or fake_store
+    }
+    originals = {name: getattr(backend, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(backend, name, value)
+    try:
+        yield stored
+    finally:
+        for name, value in originals.items():
+            setattr(backend, name, value)
+
+def read_events(response):
+    """Parse a Server-Sent Events body into (event, data) pairs"""
+    events = []
+    for message in response.get_data(as_text=True).split("\n\n"):
+        if not message.strip():
+            continue
+        fields = dict(line.split(": ", 1) for line in message.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_stream_events_in_order():
+    """Test that a generation streams start, every chunk, then done"""
+    stream = FakeStream(["<h1>Budgeting</h1>", "<p>Plan your spending.</p>"])
+    with patched_backend(stream) as stored:
+        client = backend.app.test_client()
+        response = client.post(STREAM_URL, json=REQUEST_DATA)
+        events = read_events(response)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert [event for event, _ in events] == ["start", "chunk", "chunk", "done"]
+    assert events[0][1] == {"topic": "budgeting", "level": "Basic", "from_cache": False}
+    assert "".join(data["html"] for event, data in events if event == "chunk") == "".join(stream.parts)
+    assert events[-1][1]["module_id"] == "module-1"
+    assert stored == ["".join(stream.parts)]
+    assert not stream.cancelled
+    print("✅ Stream events arrive in order:", [event for event, _ in events])
+
+def test_cached_module_streams_one_chunk():
+    """Test that cached content is sent as a single chunk without calling Gemini"""
+    cache = make_cache()
+    cache.put(backend.get_module_cache_key("budgeting", "Basic"), "<h1>Cached</h1>")
+    with patched_backend(FakeStream([]), cache=cache) as stored:
+        client = backend.app.test_client()
+        events = read_events(client.post(STREAM_URL, json=REQUEST_DATA))
+        prompts = backend.gemini_client.prompts
+
+    assert [event for event, _ in events] == ["start", "chunk", "done"]
+    assert events[0][1]["from_cache"] is True
+    assert events[1][1] == {"html": "<h1>Cached</h1>"}
+    assert prompts == [] and stored == ["<h1>Cached</h1>"]
+    print("✅ Cached module streamed as one chunk")
+
+def test_upstream_failure_sends_error_event():
+    """Test that a failure partway through the stream ends it with an error event"""
+    stream = FakeStream(["<h1>Budgeting</h1>", "<p>never sent</p>"], fail_after=1)
+    with patched_backend(stream) as stored:
+        client = backend.app.test_client()
+        response = client.post(STREAM_URL, json=REQUEST_DATA)
+        events = read_events(response)
+
+    assert response.status_code == 200
+    assert [event for event, _ in events] == ["start", "chunk", "error"]
+    assert events[-1][1] == {"error": "Gemini stream interrupted"}
+    assert stored == []
+    print("✅ Upstream failure reported as an error event")
+
+def test_storage_failure_sends_error_event():
+    """Test that a module that cannot be stored ends the stream with an error event, not done"""
+    def failing_store(user_id, topic, level, html_content, cache_key):
+        raise RuntimeError("Failed to store module: database unavailable")
+
+    with patched_backend(FakeStream(["<h1>Budgeting</h1>"]), store=failing_store):
+        client = backend.app.test_client()
+        events = read_events(client.post(STREAM_URL, json=REQUEST_DATA))
+
+    assert [event for event, _ in events] == ["start", "chunk", "error"]
+    assert "database unavailable" in events[-1][1]["error"]
+    print("✅ Storage failure reported as an error event")
+
+def test_invalid_request_is_rejected_before_streaming():
+    """Test that bad parameters get a JSON 400 instead of an event stream"""
+    with patched_backend(FakeStream([])):
+        client = backend.app.test_client()
+        response = client.post(STREAM_URL, json=dict(REQUEST_DATA, level="Expert"))
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+    print("✅ Invalid level rejected with 400")
+
+if __name__ == "__main__":
+    test_stream_events_in_order()
+    test_cached_module_streams_one_chunk()
+    test_upstream_failure_sends_error_event()
+    test_storage_failure_sends_error_event()
+    test_invalid_request_is_rejected_before_streaming()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,90 @@
+import os
+import tempfile
+from datetime import datetime
+from module_cache import ModuleCache
+from module_warmer import ModuleWarmer, rank_topics, seconds_until
+
+def make_cache():
+    """Create a ModuleCache pointed at a throwaway directory"""
+    cache = object.__new__(ModuleCache)
+    cache._configure(cache_dir=tempfile.mkdtemp(prefix="module_cache_"), memory_entries=64,
+                     max_bytes=1024 * 1024, max_age_seconds=3600)
+    return cache
+
+def make_warmer(topics, cache, token_budget=100000, lesson_tokens=1000, quiz_tokens=500):
+    """Create a warmer with fake generators that count their calls"""
+    calls = []
+    
+    def generate_lesson(topic, level):
+        calls.append(("lesson", topic, level))
+        return f"<h1>{topic} {level}</h1>", lesson_tokens
+    
+    def generate_quiz(topic, level, html):
+        calls.append(("quiz", topic, level))
+        return [{"id": "q1", "question": f"About {html}?"}], quiz_tokens
+    
+    warmer = ModuleWarmer(
+        fetch_topics=lambda: topics,
+        generate_lesson=generate_lesson,
+        generate_quiz=generate_quiz,
+        cache=cache,
+        make_key=lambda topic, level: ModuleCache.make_key(topic, level, "1", "fake-model"),
+        enabled=False,
+        top_n=2,
+        token_budget=token_budget,
+        run_hour=3,
+        lock_path=os.path.join(tempfile.mkdtemp(prefix="warmer_"), "warmer.lock")
+    )
+    return warmer, calls
+
+def test_rank_topics():
+    """Test that topics are ranked by normalized popularity"""
+    topics = ["Investing", "budgeting", "Budgeting", "Budgeting!", "Budgeting", "investing", "Taxes", ""]
+    assert rank_topics(topics, 2) == ["Budgeting", "Investing"]
+    assert seconds_until(3, datetime(2024, 1, 1, 2, 0)) == 3600
+    assert seconds_until(3, datetime(2024, 1, 1, 4, 0)) == 23 * 3600
+    print("✅ Topics are ranked by popularity")
+
+def test_warms_top_topics_at_all_levels():
+    """Test that the top topics are cached at every level and not regenerated"""
+    cache = make_cache()
+    warmer, calls = make_warmer(["Saving", "Saving", "Budgeting", "Crypto"], cache)
+    
+    report = warmer.run()
+    assert report["lessons_generated"] == 6
+    assert report["quizzes_generated"] == 6
+    assert report["tokens_spent"] == 6 * 1500
+    assert ("lesson", "Crypto", "Basic") not in calls
+    
+    key = ModuleCache.make_key("Saving", "Advanced", "1", "fake-model")
+    assert cache.get(key) == "<h1>Saving Advanced</h1>"
+    assert cache.get_quiz(key)[0]["id"] == "q1"
+    
+    # A second run finds everything cached
+    calls.clear()
+    report = warmer.run()
+    assert report["already_cached"] == 6
+    assert calls == []
+    assert warmer.get_stats()["runs"] == 2
+    print("✅ Top topics are warmed at every level")
+
+def test_respects_token_budget():
+    """Test that warming stops once the budget would be exceeded"""
+    cache = make_cache()
+    warmer, calls = make_warmer(["Saving", "Saving", "Budgeting"], cache, token_budget=4000)
+    
+    report = warmer.run()
+    # Each level costs 1500 tokens, so only two fit in 4000
+    assert report["lessons_generated"] == 2
+    assert report["tokens_spent"] == 3000
+    assert report["budget_exhausted"]
+    # The most popular topic is warmed first
+    assert calls[0] == ("lesson", "Saving", "Basic")
+    print("✅ The nightly token budget is respected")
+
+if __name__ == "__main__":
+    test_rank_topics()
+    test_warms_top_topics_at_all_levels()
+    test_respects_token_budget()
+    
+    print("\nAll tests completed!")
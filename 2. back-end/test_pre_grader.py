@@ -0,0 +1,79 @@
+from pre_grader import PreGrader, stem
+
+KEY_POINTS = [
+    "Compound interest earns interest on previous interest",
+    "Starting early gives money more time to grow",
+    "Higher interest rates increase growth"
+]
+
+def make_pre_grader(**overrides):
+    """Create a PreGrader with explicit thresholds"""
+    grader = object.__new__(PreGrader)
+    settings = {
+        "enabled": True,
+        "pass_threshold": 0.8,
+        "fail_threshold": 0.1,
+        "point_threshold": 0.6,
+        "min_words": 3
+    }
+    settings.update(overrides)
+    grader._configure(**settings)
+    return grader
+
+def test_stemming():
+    """Test that inflected forms share a stem"""
+    assert stem("investing") == stem("invests") == "invest"
+    assert stem("rates") == stem("rate")
+    print("✅ Inflected forms share a stem")
+
+def test_clear_pass():
+    """Test that an answer covering every key point is settled locally"""
+    grader = make_pre_grader()
+    answer = ("Compound interest means you earn interest on your previous interest. "
+              "Starting early gives your money more time to grow, and higher interest rates increase the growth.")
+    result = grader.grade(answer, KEY_POINTS)
+    assert result and result["score"] == 100
+    print("✅ Clear pass graded locally:", result["score"])
+
+def test_clear_fail():
+    """Test that off-topic and very short answers are settled locally"""
+    grader = make_pre_grader()
+    assert grader.grade("I like pizza and football on weekends.", KEY_POINTS)["score"] == 0
+    assert grader.grade("interest", KEY_POINTS)["score"] == 0
+    print("✅ Clear fails graded locally")
+
+def test_short_answer_naming_key_points_escalates():
+    """Test that a terse answer listing the key points is not failed with full marks"""
+    grader = make_pre_grader()
+    assert grader.grade("diversification risk", ["Diversification", "Risk"]) is None
+    
+    result = grader.grade("pizza", ["Diversification", "Risk"])
+    assert result["score"] == 0
+    assert result["feedback"] == "Your answer is missing key points: Diversification; Risk"
+    print("✅ Short answers that cover the key points go to the LLM")
+
+def test_ambiguous_answer_escalates():
+    """Test that partial answers go to the LLM and are counted"""
+    grader = make_pre_grader()
+    answer = "Compound interest earns interest on the interest you already have."
+    assert grader.grade(answer, KEY_POINTS) is None
+    
+    stats = grader.get_stats()
+    assert stats["escalated"] == 1 and stats["llm_skipped"] == 0
+    print("✅ Ambiguous answer escalated:", stats)
+
+def test_disabled():
+    """Test that a disabled pre-grader always escalates"""
+    grader = make_pre_grader(enabled=False)
+    assert grader.grade("I like pizza", KEY_POINTS) is None
+    print("✅ Disabled pre-grader escalates everything")
+
+if __name__ == "__main__":
+    test_stemming()
+    test_clear_pass()
+    test_clear_fail()
+    test_short_answer_naming_key_points_escalates()
+    test_ambiguous_answer_escalates()
+    test_disabled()
+    
+    print("\nAll tests completed!")
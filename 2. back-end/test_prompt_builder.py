@@ -0,0 +1,56 @@
+from prompt_builder import PromptBuilder, html_to_blocks, fit_to_budget, estimate_tokens
+
+LESSON = """
+<h1>Budgeting Basics</h1>
+<style>.lesson { color: red; }</style>
+<p>A <strong>budget</strong> is a plan for your <strong>income</strong> and expenses.</p>
+<h2>The 50/30/20 Rule</h2>
+<ul>
+    <li>50% of income to needs</li>
+    <li>30% to wants</li>
+</ul>
+<p>Filler paragraph about nothing in particular that goes on and on. """ + "More filler text. " * 40 + """</p>
+<p>A budget is a plan for your income and expenses.</p>
+<script>trackLessonView();</script>
+"""
+
+def test_html_to_blocks():
+    """Test that markup, scripts and duplicate paragraphs are removed"""
+    blocks, key_terms = html_to_blocks(LESSON)
+    text = " ".join(block for _, block in blocks)
+    
+    assert "color: red" not in text and "trackLessonView" not in text and "<" not in text
+    assert ("heading", "The 50/30/20 Rule") in blocks
+    assert ("item", "30% to wants") in blocks
+    assert key_terms == ["budget", "income"]
+    assert sum(1 for _, block in blocks if block.startswith("A budget is a plan")) == 1
+    print("✅ Lesson HTML reduced to text blocks:", len(blocks), "blocks")
+
+def test_fit_to_budget_keeps_headings_and_key_terms():
+    """Test that trimming keeps headings and key-term paragraphs first"""
+    blocks, key_terms = html_to_blocks(LESSON)
+    content = fit_to_budget(blocks, key_terms, 40)
+    
+    assert estimate_tokens(content) <= 45
+    assert "## Budgeting Basics" in content and "## The 50/30/20 Rule" in content
+    assert "A budget is a plan" in content
+    assert "More filler text. More filler text. More filler text." not in content
+    print("✅ Content trimmed to budget:\n" + content)
+
+def test_build_quiz_prompt_reports_tokens():
+    """Test that the prompt builder reports the token counts it produced"""
+    builder = object.__new__(PromptBuilder)
+    builder._configure({"Basic": 40})
+    prompt, tokens = builder.build_quiz_prompt("budgeting", "Basic", LESSON)
+    
+    assert "Budgeting Basics" in prompt and '"questions"' in prompt
+    assert tokens["content_tokens_out"] < tokens["content_tokens_in"]
+    assert builder.get_stats()["trimmed"] == 1
+    print("✅ Quiz prompt token counts:", tokens)
+
+if __name__ == "__main__":
+    test_html_to_blocks()
+    test_fit_to_budget_keeps_headings_and_key_terms()
+    test_build_quiz_prompt_reports_tokens()
+    
+    print("\nAll tests completed!")
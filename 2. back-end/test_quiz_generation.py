@@ -62,7 +62,7 @@ async def test_quiz_generation():
     """
     
     # Generate quiz with JSON formatting
-    response = await gemini_client.generate_content(
+    response = await gemini_client.generate_content_async(
         prompt=prompt,
         output_format="json",
         system_instruction="""
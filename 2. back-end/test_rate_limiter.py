@@ -0,0 +1,56 @@
+from gemini_api.rate_limiter import RateLimiter
+
+class FakeClock:
+    """Manually advanced clock"""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+def test_request_quota():
+    """Test that requests beyond the per-minute quota are spread out"""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=0, clock=clock)
+    
+    # The first minute's quota is available as a burst
+    waits = [limiter.reserve(10) for _ in range(60)]
+    assert all(wait == 0 for wait in waits)
+    
+    # Further requests wait one refill interval each
+    assert abs(limiter.reserve(10) - 1.0) < 1e-9
+    assert abs(limiter.reserve(10) - 2.0) < 1e-9
+    
+    clock.now += 2
+    assert limiter.reserve(10) > 0
+    print("✅ Requests beyond the quota are delayed")
+
+def test_token_quota_and_refusal():
+    """Test the tokens-per-minute quota, refused reservations and corrections"""
+    clock = FakeClock()
+    limiter = RateLimiter(requests_per_minute=0, tokens_per_minute=600, clock=clock)
+    
+    assert limiter.reserve(600) == 0
+    # 300 tokens refill at 10/s
+    assert abs(limiter.reserve(300, max_wait=60) - 30.0) < 1e-9
+    
+    # A reservation that would wait past max_wait is refused and debits nothing
+    assert limiter.reserve(300, max_wait=5) is None
+    assert limiter.get_stats()['refused'] == 1
+    
+    # Refunding an overestimate makes the capacity available again
+    limiter.adjust(-300)
+    clock.now += 30
+    assert limiter.reserve(300) == 0
+    
+    stats = limiter.get_stats()
+    assert stats['reserved'] == 3
+    assert stats['delayed'] == 1
+    print("✅ Token quota, refusals and corrections work")
+
+if __name__ == "__main__":
+    test_request_quota()
+    test_token_quota_and_refusal()
+    
+    print("\nAll tests completed!")
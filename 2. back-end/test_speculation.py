@@ -0,0 +1,134 @@
+import time
+import threading
+from speculation import SpeculativeGenerator, passing_likely
+
+def make_speculator(progress, **kwargs):
+    """Create a speculator over fixed progress that records what it queues"""
+    queued = []
+
+    def prepare(topic, level):
+        queued.append((topic, level))
+        return f"job-{len(queued)}"
+
+    options = dict(enabled=True, threshold=80, min_answered_fraction=0.5, dedupe_seconds=3600)
+    options.update(kwargs)
+    speculator = SpeculativeGenerator(lambda user_id, module_id: progress[module_id], prepare, **options)
+    return speculator, queued
+
+def test_passing_likely():
+    """Test the running score prediction"""
+    assert not passing_likely([], 10, 80, 0.5)
+    assert not passing_likely([100, 100], 10, 80, 0.5)  # Too few answers to predict
+    assert passing_likely([100, 100, 100, 100, 60], 10, 80, 0.5)
+    assert not passing_likely([100, 100, 0, 100, 60], 10, 80, 0.5)
+    print("✅ Passing is predicted only from enough answers")
+
+def test_queues_next_level_once():
+    """Test that a likely pass queues the next level once per module"""
+    speculator, queued = make_speculator({"m1": ("Saving", "Basic", [100, 100, 100])})
+
+    assert speculator.check("u1", "m1", 5) == "job-1"
+    assert speculator.check("u1", "m1", 5) is None
+    assert queued == [("Saving", "Moderate")]
+    assert speculator.get_stats()["queued"] == 1
+    print("✅ The next level is queued once when passing is likely")
+
+def test_waits_for_enough_answers():
+    """Test that nothing is queued before passing looks likely"""
+    progress = {"m1": ("Saving", "Basic", [100])}
+    speculator, queued = make_speculator(progress)
+
+    assert speculator.check("u1", "m1", 4) is None
+    progress["m1"] = ("Saving", "Basic", [100, 100])
+    assert speculator.check("u1", "m1", 4) == "job-1"
+    assert queued == [("Saving", "Moderate")]
+    print("✅ Progress is checked again until passing looks likely")
+
+def test_dedupes_across_users():
+    """Test that the same topic and level is queued once for many users"""
+    speculator, queued = make_speculator({
+        "m1": ("Saving", "Moderate", [100, 100]),
+        "m2": (" saving ", "Moderate", [90, 90])
+    })
+
+    speculator.check("u1", "m1", 4)
+    speculator.check("u2", "m2", 4)
+    assert queued == [("Saving", "Advanced")]
+    assert speculator.get_stats()["already_queued"] == 1
+    print("✅ Concurrent learners share one speculative preparation")
+
+def test_no_level_after_advanced():
+    """Test that Advanced quizzes have nothing to prepare"""
+    speculator, queued = make_speculator({"m1": ("Saving", "Advanced", [100, 100])})
+
+    assert speculator.check("u1", "m1", 2) is None
+    assert queued == []
+    print("✅ Nothing is prepared after the Advanced level")
+
+def test_errors_do_not_raise():
+    """Test that a failing lookup or queue is counted and retried later"""
+    def fail(user_id, module_id):
+        raise RuntimeError("database unavailable")
+
+    speculator = SpeculativeGenerator(fail, lambda topic, level: "job", enabled=True)
+    assert speculator.check("u1", "m1", 4) is None
+    assert speculator.get_stats()["errors"] == 1
+
+    attempts = []
+
+    def flaky_prepare(topic, level):
+        attempts.append(level)
+        if len(attempts) == 1:
+            raise RuntimeError("queue full")
+        return "job"
+
+    speculator = SpeculativeGenerator(lambda user_id, module_id: ("Saving", "Basic", [100, 100]),
+                                      flaky_prepare, enabled=True, threshold=80, min_answered_fraction=0.5)
+    assert speculator.check("u1", "m1", 4) is None
+    assert speculator.check("u1", "m1", 4) == "job"
+    print("✅ Speculation errors never reach answer submission")
+
+def test_consider_runs_in_background():
+    """Test that the answer handler only schedules the progress check"""
+    release = threading.Event()
+
+    def slow_progress(user_id, module_id):
+        release.wait(2)
+        return ("Saving", "Basic", [100, 100])
+
+    queued = []
+    speculator = SpeculativeGenerator(slow_progress, lambda topic, level: queued.append(level) or "job",
+                                      enabled=True, threshold=80, min_answered_fraction=0.5)
+    started = time.monotonic()
+    assert speculator.consider("u1", "m1", 2)
+    # A second answer while the check is pending does not schedule another
+    assert not speculator.consider("u1", "m1", 2)
+    assert time.monotonic() - started < 0.1
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while speculator.get_stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert queued == ["Moderate"]
+    assert not speculator.consider("u1", "m1", 2)
+    print("✅ Progress checks run off the request thread")
+
+def test_disabled():
+    """Test that a disabled speculator does nothing"""
+    speculator, queued = make_speculator({"m1": ("Saving", "Basic", [100, 100])}, enabled=False)
+
+    assert not speculator.consider("u1", "m1", 2)
+    assert queued == []
+    print("✅ Speculation can be switched off")
+
+if __name__ == "__main__":
+    test_passing_likely()
+    test_queues_next_level_once()
+    test_waits_for_enough_answers()
+    test_dedupes_across_users()
+    test_no_level_after_advanced()
+    test_errors_do_not_raise()
+    test_consider_runs_in_background()
+    test_disabled()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,53 @@
+from speech_text import SpeechTextExtractor, html_to_speech_text, latex_to_speech
+
+LESSON_HTML = """
+<h1>Compound Interest</h1>
+<p>Interest earns <strong>interest</strong> over time.</p>
+<h2>Key points</h2>
+<ul><li>Start early</li><li>Reinvest returns!</li></ul>
+<script>trackView();</script>
+<p>The formula is \\( FV = PV \\times (1 + r)^n \\). A fee of 1\\% on $5 adds up.</p>
+"""
+
+def test_html_to_speech_text():
+    """Test that markup is dropped and headings and list items end with a pause"""
+    text = html_to_speech_text(LESSON_HTML)
+    paragraphs = text.split("\n\n")
+    assert paragraphs[0] == "Compound Interest."
+    assert paragraphs[1] == "Interest earns interest over time."
+    assert paragraphs[2] == "Key points."
+    assert paragraphs[3] == "Start early.\nReinvest returns!"
+    assert paragraphs[4] == "The formula is FV equals PV times (1 plus r) to the power of n. A fee of 1% on $5 adds up."
+    assert "<" not in text and "trackView" not in text
+    assert html_to_speech_text("") == ""
+    print("✅ Lesson HTML becomes clean speech text")
+
+def test_latex_to_speech():
+    """Test that the LaTeX in lessons is read as words"""
+    assert latex_to_speech(r"PV = \frac{FV}{(1 + r)^{n}}") == "PV equals FV over (1 plus r) to the power of n"
+    assert latex_to_speech(r"A = \pi r^2") == "A equals pi r squared"
+    assert latex_to_speech(r"r_{\text{real}} \approx r - i") == "r sub real is approximately r minus i"
+    assert latex_to_speech(r"\sqrt{\sigma^2}") == "the square root of sigma squared"
+    assert latex_to_speech(r"\left( 1 + \frac{r}{12} \right)^{12t}") == "( 1 plus r over 12 ) to the power of 12t"
+    print("✅ LaTeX is read as words")
+
+def test_extraction_is_memoized():
+    """Test that the same module content is parsed once"""
+    extractor = SpeechTextExtractor(max_entries=2)
+    first = extractor.extract(LESSON_HTML)
+    assert extractor.extract(LESSON_HTML) == first
+    extractor.extract("<p>Two</p>")
+    extractor.extract("<p>Three</p>")
+
+    stats = extractor.get_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["entries"] == 2
+    assert stats["chars_out"] < stats["chars_in"]
+    print("✅ Speech text is memoized per module content")
+
+if __name__ == "__main__":
+    test_html_to_speech_text()
+    test_latex_to_speech()
+    test_extraction_is_memoized()
+
+    print("\nAll tests completed!")
@@ -0,0 +1,94 @@
+import io
+import wave
+import json
+import threading
+import urllib.request
+from stub_server import StubConfig, make_server, generate_text
+from gemini_api.local_model import LocalGenerativeModel, LocalBackendError
+from json_extractor import extract_quiz, extract_evaluation
+from grading import build_evaluation_prompt, build_batch_evaluation_prompt, parse_batch_evaluation
+from prompt_builder import get_prompt_builder
+
+def start_server(**overrides):
+    """Start a stub server on a free port"""
+    settings = {"latency_ms": 5, "latency_sigma": 0, "error_rate": 0, "rate_limit_rate": 0, "seed": 1}
+    settings.update(overrides)
+    server = make_server(StubConfig(**settings), port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def test_deterministic_responses():
+    """Test that each prompt type gets a deterministic, usable response"""
+    lesson_prompt = "Create comprehensive educational content about budgeting at Basic level."
+    lesson = generate_text(lesson_prompt)
+    assert lesson == generate_text(lesson_prompt)
+    assert lesson.startswith("<h1>Budgeting</h1>")
+    assert len(lesson.split()) > 800
+    
+    quiz_prompt, _ = get_prompt_builder().build_quiz_prompt("budgeting", "Basic", lesson)
+    quiz = extract_quiz(generate_text(quiz_prompt))
+    assert len(quiz["questions"]) == 7
+    
+    item = {"question": "Why budget?", "sample_answer": "To plan", "key_points": ["plan"], "user_answer": "x"}
+    assert 0 <= extract_evaluation(generate_text(build_evaluation_prompt(item)))["score"] <= 100
+    
+    batch = [dict(item, id="a1"), dict(item, id="a2")]
+    results = parse_batch_evaluation(generate_text(build_batch_evaluation_prompt(batch)), ["a1", "a2"])
+    assert set(results) == {"a1", "a2"}
+    print("✅ Lesson, quiz and grading responses are deterministic and valid")
+
+def test_local_model_round_trip():
+    """Test the local model against a running stub server"""
+    server, url = start_server()
+    try:
+        model = LocalGenerativeModel("gemini-pro", url)
+        prompt = "Create comprehensive educational content about saving at Basic level."
+        response = model.generate_content(prompt, request_options={"timeout": 5})
+        assert response.text == generate_text(prompt)
+        assert response.usage_metadata.prompt_token_count > 0
+        
+        chunks = list(model.generate_content(prompt, stream=True))
+        assert len(chunks) > 1
+        assert ''.join(chunk.text for chunk in chunks) == response.text
+        
+        # Hugging Face TTS returns WAV audio sized to the text
+        request = urllib.request.Request(f"{url}/models/facebook/mms-tts-eng",
+                                         data=json.dumps({"inputs": "one two three four"}).encode())
+        with urllib.request.urlopen(request, timeout=5) as tts_response:
+            audio = tts_response.read()
+        with wave.open(io.BytesIO(audio)) as wav:
+            assert wav.getnframes() / wav.getframerate() > 1.0
+    finally:
+        server.shutdown()
+    print("✅ The local model and TTS endpoint work against the stub server")
+
+def test_injected_failures():
+    """Test that configured 429 and 5xx rates are injected"""
+    server, url = start_server(rate_limit_rate=1.0)
+    try:
+        model = LocalGenerativeModel("gemini-pro", url)
+        try:
+            model.generate_content("hello")
+            assert False, "Expected a 429"
+        except LocalBackendError as e:
+            assert e.code == 429
+    finally:
+        server.shutdown()
+    
+    server, url = start_server(error_rate=1.0)
+    try:
+        try:
+            LocalGenerativeModel("gemini-pro", url).generate_content("hello")
+            assert False, "Expected a 5xx"
+        except LocalBackendError as e:
+            assert e.code in (500, 503)
+    finally:
+        server.shutdown()
+    print("✅ Rate limit and server errors are injected at the configured rates")
+
+if __name__ == "__main__":
+    test_deterministic_responses()
+    test_local_model_round_trip()
+    test_injected_failures()
+    
+    print("\nAll tests completed!")
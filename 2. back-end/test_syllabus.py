@@ -0,0 +1,232 @@
+import io
+import os
+import json
+import time
+import tempfile
+import zipfile
+from stub_server import generate_text
+from syllabus import (SyllabusIngestor, SyllabusError, SyllabusTooLargeError, spool_upload, detect_file_type,
+                      extract_text, chunk_text, merge_units, unit_key)
+from prompt_builder import estimate_tokens
+from fingerprint import FingerprintIndex
+
+SYLLABUS = """
+ECON 101: Introduction to Microeconomics
+
+Week 1-2: Introduction to Economics
+- Scarcity and choice
+- Opportunity cost
+
+Page 1 of 2
+
+Week 3-4: Supply and Demand
+- Market equilibrium
+- Price elasticity
+"""
+
+def make_docx(paragraphs):
+    """Build a minimal DOCX file in memory"""
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in paragraphs)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('word/document.xml', f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+    return buffer.getvalue()
+
+def stub_segment(prompt, user_id):
+    """Segment a syllabus chunk with the stub server's model"""
+    return generate_text(prompt)
+
+def make_unit(title, topics, summary="Summary"):
+    """Build a validated unit"""
+    return {"unit_title": title, "key_summary": summary, "key_topics": topics}
+
+def test_spool_upload():
+    """Test that uploads are spooled and the size limit is enforced"""
+    with spool_upload(io.BytesIO(b"x" * 200000), max_bytes=300000, memory_bytes=1000) as spooled:
+        assert len(spooled.read()) == 200000
+
+    try:
+        spool_upload(io.BytesIO(b"x" * 200000), max_bytes=100000)
+        assert False, "Expected the upload to be rejected"
+    except SyllabusTooLargeError:
+        pass
+    print("✅ Uploads are spooled under a size limit")
+
+def test_detect_and_extract():
+    """Test file type detection and text extraction"""
+    assert detect_file_type("syllabus.pdf", b"%PDF-1.7") == "pdf"
+    assert detect_file_type("syllabus.txt", b"ECON 101") == "text"
+
+    docx = make_docx(["Week 1: Budgeting", "Needs and wants"])
+    assert detect_file_type("syllabus.docx", docx[:8]) == "docx"
+    assert extract_text(io.BytesIO(docx), "docx") == "Week 1: Budgeting\nNeeds and wants"
+
+    for filename, head in (("syllabus.doc", b"\xd0\xcf\x11\xe0"), ("photo.png", b"\x89PNG\r\n")):
+        try:
+            detect_file_type(filename, head)
+            assert False, f"Expected {filename} to be rejected"
+        except SyllabusError:
+            pass
+    print("✅ Text is extracted from DOCX and plain text")
+
+def test_docx_size_limit():
+    """Test that a DOCX whose body inflates past the limit is rejected before it is read"""
+    bomb = make_docx(["Budgeting " * 200000])
+    assert len(bomb) < 100000
+    try:
+        extract_text(io.BytesIO(bomb), "docx", max_docx_xml_bytes=1024 * 1024)
+        assert False, "Expected the DOCX to be rejected"
+    except SyllabusTooLargeError:
+        pass
+
+    ingestor = SyllabusIngestor(stub_segment, max_workers=2, max_docx_xml_bytes=1024 * 1024)
+    try:
+        ingestor.ingest(io.BytesIO(bomb), "syllabus.docx")
+        assert False, "Expected the DOCX to be rejected"
+    except SyllabusTooLargeError:
+        pass
+
+    small = make_docx(["Week 1: Budgeting"])
+    assert extract_text(io.BytesIO(small), "docx", max_docx_xml_bytes=1024 * 1024) == "Week 1: Budgeting"
+    print("✅ DOCX bodies are limited by their uncompressed size")
+
+def test_chunk_text():
+    """Test that chunks stay within the token budget and drop page numbers"""
+    text = "\n\n".join(f"Week {week}: Topic {week}\n" + "- detail about the topic " * 20 for week in range(40))
+    chunks = chunk_text(text + "\n\n12\n\nPage 3 of 40", 300)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    assert "Page 3 of 40" not in chunks[-1]
+    assert chunks[0].startswith("Week 0: Topic 0")
+
+    # A single paragraph over the budget is split rather than sent whole
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunk_text("word " * 500, 50))
+    print("✅ Text is chunked within the token budget")
+
+def test_merge_units():
+    """Test that units repeated across chunks are merged"""
+    assert unit_key("Week 1-2: Supply and Demand") == unit_key("supply and demand!") == "supply and demand"
+
+    merged = merge_units([
+        [make_unit("Week 1-2: Supply and Demand", ["Equilibrium", "Elasticity"], summary="")],
+        [make_unit("Supply and demand", ["elasticity", "Surplus"], summary="Markets"),
+         make_unit("Consumer Theory", ["Utility"])]
+    ], max_units=10)
+
+    assert [unit["unit_title"] for unit in merged] == ["Week 1-2: Supply and Demand", "Consumer Theory"]
+    assert merged[0]["key_topics"] == ["Equilibrium", "Elasticity", "Surplus"]
+    assert merged[0]["key_summary"] == "Markets"
+    assert len(merge_units([[make_unit(f"Unit {i} title {i}", [])] for i in range(5)], max_units=3)) == 3
+    print("✅ Units are merged and deduplicated")
+
+def test_ingest_with_stub_model():
+    """Test the full pipeline against the stub model's syllabus responses"""
+    ingestor = SyllabusIngestor(stub_segment, max_workers=4, chunk_tokens=3000)
+    result = ingestor.ingest(io.BytesIO(SYLLABUS.encode('utf-8')), "syllabus.txt")
+
+    assert result["file_type"] == "text"
+    assert result["chunks"] == 1
+    assert result["failed_chunks"] == 0
+    assert result["units"]
+    assert all(unit["unit_title"] and len(unit["key_topics"]) <= 5 for unit in result["units"])
+    assert ingestor.get_stats()["syllabi"] == 1
+    print("✅ A syllabus upload is segmented into units")
+
+def test_segmentation_metered_to_uploader():
+    """Test that every segmentation call is made on behalf of the uploading user"""
+    users = []
+
+    def segment(prompt, user_id):
+        users.append(user_id)
+        return generate_text(prompt)
+
+    ingestor = SyllabusIngestor(segment, max_workers=2, chunk_tokens=100)
+    text = "\n\n".join(f"Week {week}: Topic {week}\n- Reading chapter {week}" for week in range(20))
+    result = ingestor.ingest_text(text, user_id="user-1")
+    ingestor.ingest(io.BytesIO(SYLLABUS.encode('utf-8')), "syllabus.txt", user_id="user-2")
+
+    assert result["chunks"] > 1
+    assert users == ["user-1"] * result["chunks"] + ["user-2"]
+    print("✅ Segmentation calls are made for the uploading user")
+
+def test_chunks_segmented_in_parallel():
+    """Test that chunks are segmented concurrently and failed chunks are tolerated"""
+    def segment(prompt, user_id):
+        time.sleep(0.2)
+        part = prompt.split("from part ")[1].split(" ")[0]
+        if part == "2":
+            raise TimeoutError("deadline exceeded")
+        return json.dumps({"units": [{"unit_title": f"Topic {part}", "key_summary": "", "key_topics": []}]})
+
+    ingestor = SyllabusIngestor(segment, max_workers=8, chunk_tokens=100)
+    text = "\n\n".join("Paragraph " + "word " * 60 for _ in range(6))
+
+    started = time.time()
+    result = ingestor.ingest_text(text)
+    elapsed = time.time() - started
+
+    assert result["chunks"] == 6
+    assert result["failed_chunks"] == 1
+    assert len(result["units"]) == 5
+    assert elapsed < 0.6, f"Chunks were not segmented in parallel ({elapsed:.2f}s)"
+    print("✅ Chunks are segmented in parallel")
+
+def test_rejects_empty_and_unsegmentable():
+    """Test empty syllabi and total segmentation failure"""
+    ingestor = SyllabusIngestor(lambda prompt, user_id: "not json", max_workers=2)
+    try:
+        ingestor.ingest_text("   \n\n 3 \n")
+        assert False, "Expected an empty syllabus to be rejected"
+    except SyllabusError:
+        pass
+
+    try:
+        ingestor.ingest_text(SYLLABUS)
+        assert False, "Expected a failed segmentation to raise"
+    except RuntimeError:
+        pass
+    print("✅ Empty and unsegmentable syllabi are rejected")
+
+def test_reuses_units_of_duplicate_syllabi():
+    """Test that a re-uploaded or lightly edited syllabus is not segmented again"""
+    prompts = []
+
+    def segment(prompt, user_id):
+        prompts.append(prompt)
+        return generate_text(prompt)
+
+    syllabus = "\n\n".join(f"Week {week}: Topic {week}\n- Reading chapter {week} of the textbook\n"
+                           f"- Problem set {week} on market outcomes" for week in range(30))
+    index = FingerprintIndex(db_path=os.path.join(tempfile.mkdtemp(prefix="fingerprints_"), "fingerprints.db"))
+    ingestor = SyllabusIngestor(segment, max_workers=2, index=index)
+    first = ingestor.ingest_text(syllabus)
+    assert len(prompts) == 1
+
+    # Same text with page markers and different spacing
+    again = ingestor.ingest_text(syllabus.replace("Week 10:", "Page 3 of 9\n\nWeek 10:").replace("\n", "\n\n"))
+    assert again["units"] == first["units"]
+    assert again["similarity"] == 1.0
+
+    # Next semester's copy with a line changed
+    edited = ingestor.ingest_text(syllabus.replace("- Problem set 4 on market outcomes", "- Midterm review session"))
+    assert edited["units"] == first["units"]
+    assert edited["duplicate_of"] == again["duplicate_of"]
+    assert len(prompts) == 1
+    assert ingestor.get_stats()["duplicates"] == 2
+    print("✅ Duplicate syllabi reuse their parsed units")
+
+if __name__ == "__main__":
+    test_spool_upload()
+    test_detect_and_extract()
+    test_docx_size_limit()
+    test_chunk_text()
+    test_merge_units()
+    test_ingest_with_stub_model()
+    test_segmentation_metered_to_uploader()
+    test_chunks_segmented_in_parallel()
+    test_rejects_empty_and_unsegmentable()
+    test_reuses_units_of_duplicate_syllabi()
+
+    print("\nAll tests completed!")
@@ -122,7 +122,7 @@ async def test_syllabus_parsing():
     """
     
     # Generate parsed syllabus with JSON formatting
-    response = await gemini_client.generate_content(
+    response = await gemini_client.generate_content_async(
         prompt=prompt,
         output_format="json",
         system_instruction=system_instruction
@@ -0,0 +1,144 @@
+import io
+import time
+import wave
+import threading
+from tts_pipeline import SpeechPipeline, AudioStitcher, split_speech_text, is_wav_audio
+
+def make_wav(samples, frame_rate=16000):
+    """Build a mono 16-bit WAV file holding the given sample bytes"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(frame_rate)
+        writer.writeframes(samples)
+    return buffer.getvalue()
+
+def test_split_speech_text():
+    """Test that chunks follow sentence and paragraph boundaries"""
+    text = "Budgeting basics.\n\nA budget is a plan. It helps you save! Track every expense.\n\nNext, set goals."
+    chunks = split_speech_text(text, 40)
+    assert chunks[0] == "Budgeting basics."
+    assert chunks[1] == "A budget is a plan. It helps you save!"
+    assert chunks[2] == "Track every expense."
+    assert chunks[-1] == "Next, set goals."
+
+    long_sentence = "Saving early matters, because interest compounds over many years, and small amounts grow large"
+    pieces = split_speech_text(long_sentence, 40)
+    assert all(len(piece) <= 40 for piece in pieces)
+    assert " ".join(pieces) == long_sentence
+    assert split_speech_text("", 40) == []
+    print("✅ Text is split at sentence boundaries with a short first chunk")
+
+def test_stitcher_shares_wav_header():
+    """Test that WAV segments are joined under one header"""
+    stitcher = AudioStitcher()
+    first = stitcher.add(make_wav(b"\x01\x00" * 100))
+    second = stitcher.add(make_wav(b"\x02\x00" * 50))
+    assert first.startswith(b"RIFF") and first.count(b"RIFF") == 1
+    assert second == b"\x02\x00" * 50
+
+    with wave.open(io.BytesIO(stitcher.getvalue()), "rb") as reader:
+        assert reader.getnframes() == 150
+        assert reader.readframes(150) == b"\x01\x00" * 100 + b"\x02\x00" * 50
+
+    try:
+        stitcher.add(make_wav(b"\x00\x00", frame_rate=22050))
+        assert False, "Mismatched formats should be rejected"
+    except ValueError:
+        pass
+
+    assert is_wav_audio(make_wav(b"\x00\x00")) and not is_wav_audio(b"ID3 frame one")
+    passthrough = AudioStitcher()
+    assert passthrough.add(b"ID3 frame one") == b"ID3 frame one"
+    assert passthrough.add(b" frame two") == b" frame two"
+    assert passthrough.getvalue() == b"ID3 frame one frame two"
+    print("✅ WAV segments share one header; other formats pass through")
+
+def test_stream_in_order_with_capped_concurrency():
+    """Test that segments come out in order while at most max_concurrency chunks run"""
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def synthesize(text):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        # Later chunks finish first
+        time.sleep(0.05 if text.startswith("One") else 0.01)
+        with lock:
+            running[0] -= 1
+        return text.encode()
+
+    text = "One. Two. Three. Four. Five. Six."
+    pipeline = SpeechPipeline(synthesize, max_concurrency=2, max_chars=5, max_workers=8)
+    segments = list(pipeline.stream(text))
+    assert segments == [b"One.", b"Two.", b"Three.", b"Four.", b"Five.", b"Six."]
+    assert peak[0] <= 2
+    assert pipeline.get_stats()["chunks"] == 6
+    print("✅ Segments are emitted in order with capped concurrency")
+
+def test_first_segment_before_whole_text():
+    """Test that the first segment is available before later chunks are synthesized"""
+    started = []
+
+    def synthesize(text):
+        started.append(text)
+        if text != "First sentence.":
+            time.sleep(0.2)
+        return text.encode()
+
+    pipeline = SpeechPipeline(synthesize, max_concurrency=2, max_chars=30, max_workers=4)
+    segments = pipeline.stream("First sentence. " + "More words here. " * 6)
+    begin = time.time()
+    assert next(segments) == b"First sentence."
+    assert time.time() - begin < 0.15
+    segments.close()
+    assert len(started) < 4
+    print("✅ Playback can start after the first sentence")
+
+def test_closing_stream_cancels_pending_chunks():
+    """Test that a disconnected listener stops further synthesis"""
+    calls = []
+    release = threading.Event()
+
+    def synthesize(text):
+        calls.append(text)
+        release.wait(1)
+        return text.encode()
+
+    pipeline = SpeechPipeline(synthesize, max_concurrency=3, max_chars=5, max_workers=1)
+    segments = pipeline.stream("One. Two. Three. Four. Five. Six.")
+    release.set()
+    next(segments)
+    segments.close()
+    time.sleep(0.1)
+    assert len(calls) < 6
+    assert pipeline.get_stats()["cancelled_chunks"] >= 1
+    print("✅ Closing the stream cancels chunks not yet started")
+
+def test_errors_propagate():
+    """Test that a failed chunk raises from the stream"""
+    def synthesize(text):
+        if text == "Two.":
+            raise RuntimeError("TTS service unavailable")
+        return text.encode()
+
+    pipeline = SpeechPipeline(synthesize, max_concurrency=2, max_chars=5, max_workers=2)
+    try:
+        pipeline.synthesize_all("One. Two. Three.")
+        assert False, "The chunk error should propagate"
+    except RuntimeError as e:
+        assert "unavailable" in str(e)
+    print("✅ Synthesis errors reach the caller")
+
+if __name__ == "__main__":
+    test_split_speech_text()
+    test_stitcher_shares_wav_header()
+    test_stream_in_order_with_capped_concurrency()
+    test_first_segment_before_whole_text()
+    test_closing_stream_cancels_pending_chunks()
+    test_errors_propagate()
+
+    print("\nAll tests completed!")
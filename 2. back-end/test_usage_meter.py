@@ -0,0 +1,142 @@
+import os
+import time
+import tempfile
+from types import SimpleNamespace
+from usage_meter import UsageMeter, response_token_counts, SYSTEM_USER
+
+class FakeClock:
+    """Manually advanced clock"""
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def make_meter(write=None, **kwargs):
+    """Create a meter that collects written batches"""
+    batches = []
+
+    def collect(rows):
+        batches.append(rows)
+
+    options = dict(flush_interval=60, max_pending=100, quota_tokens=0, quota_window=24 * 3600, clock=FakeClock(),
+                   db_path=os.path.join(tempfile.mkdtemp(prefix="usage_meter_"), "llm_quota.db"))
+    options.update(kwargs)
+    return UsageMeter(write or collect, **options), batches
+
+def test_token_counts():
+    """Test that reported usage is preferred over estimates"""
+    reported = SimpleNamespace(usage_metadata=SimpleNamespace(prompt_token_count=120, candidates_token_count=30))
+    assert response_token_counts("prompt", reported, "text") == (120, 30)
+    assert response_token_counts("one two three four", object(), "five six") == (4, 2)
+    print("✅ Token counts come from usage metadata when available")
+
+def test_aggregates_and_flushes_in_one_batch():
+    """Test that calls are aggregated per user, endpoint and model and flushed together"""
+    meter, batches = make_meter()
+    meter.record("u1", "generate_module", "gemini-pro", 100, 400, 1200)
+    meter.record("u1", "generate_module", "gemini-pro", 100, 300, 800)
+    meter.record("u2", "submit_answer", "gemini-pro", 50, 20, 300, error=True)
+    meter.record(None, "module_warmer", "gemini-pro", 10, 10, 100)
+
+    assert meter.flush() == 3
+    assert len(batches) == 1
+    rows = {(row["user_id"], row["endpoint"]): row for row in batches[0]}
+    module_row = rows[("u1", "generate_module")]
+    assert module_row["calls"] == 2
+    assert module_row["total_tokens"] == 900
+    assert module_row["total_latency_ms"] == 2000
+    assert module_row["max_latency_ms"] == 1200
+    assert rows[("u2", "submit_answer")]["errors"] == 1
+    assert (SYSTEM_USER, "module_warmer") in rows
+
+    # Nothing pending means no write
+    assert meter.flush() == 0
+    assert len(batches) == 1
+    print("✅ Usage is aggregated and flushed in one batch")
+
+def test_failed_flush_is_retried():
+    """Test that rows of a failed write are kept for the next flush"""
+    attempts = []
+
+    def flaky_write(rows):
+        attempts.append(rows)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+
+    meter, _ = make_meter(write=flaky_write)
+    meter.record("u1", "generate_quiz", "gemini-pro", 100, 100, 500)
+    assert meter.flush() == 0
+    meter.record("u1", "generate_quiz", "gemini-pro", 100, 100, 700)
+    assert meter.flush() == 1
+
+    assert attempts[1][0]["calls"] == 2
+    assert attempts[1][0]["total_tokens"] == 400
+    stats = meter.get_stats()
+    assert stats["flush_failures"] == 1 and stats["rows_written"] == 1
+    print("✅ Failed flushes are retried without losing usage")
+
+def test_quota_window():
+    """Test the rolling per-user token quota"""
+    clock = FakeClock()
+    meter, _ = make_meter(quota_tokens=1000, quota_window=24 * 3600, clock=clock)
+    meter.record("u1", "generate_module", "gemini-pro", 400, 500, 100)
+    assert meter.check_quota("u1")
+    meter.record("u1", "generate_module", "gemini-pro", 100, 100, 100)
+    assert not meter.check_quota("u1")
+    assert meter.check_quota("u2")
+    assert 1 <= meter.retry_after() <= 3600
+
+    # Background usage never counts against a user
+    meter.record(None, "module_warmer", "gemini-pro", 5000, 5000, 100)
+    assert meter.get_user_tokens(SYSTEM_USER) == 0
+
+    # Usage leaves the window after a day
+    clock.now += 24 * 3600 + 1
+    assert meter.check_quota("u1")
+    assert meter.get_stats()["throttled"] == 1
+    print("✅ Heavy users are throttled within the quota window")
+
+def test_quota_is_shared_by_workers():
+    """Test that two worker processes' meters count against one quota"""
+    clock = FakeClock()
+    db_path = os.path.join(tempfile.mkdtemp(prefix="usage_meter_"), "llm_quota.db")
+    first, _ = make_meter(quota_tokens=1000, clock=clock, db_path=db_path)
+    second, _ = make_meter(quota_tokens=1000, clock=clock, db_path=db_path)
+
+    first.record("u1", "generate_module", "gemini-pro", 300, 300, 100)
+    assert second.check_quota("u1")
+    second.record("u1", "submit_answer", "gemini-pro", 200, 200, 100)
+    assert not first.check_quota("u1") and not second.check_quota("u1")
+    assert first.get_user_tokens("u1") == 1000
+
+    # Any worker's flush drops buckets that left the window
+    clock.now += 24 * 3600 + 1
+    first.flush()
+    assert second.get_user_tokens("u1") == 0
+    assert second.get_stats()["metered_users"] == 0
+    print("✅ The quota covers every worker process")
+
+def test_background_flush():
+    """Test that the flush thread writes early when many totals are pending"""
+    meter, batches = make_meter(flush_interval=60, max_pending=2, clock=time.time)
+    meter.start()
+    meter.record("u1", "generate_module", "gemini-pro", 1, 1, 1)
+    meter.record("u2", "generate_module", "gemini-pro", 1, 1, 1)
+
+    deadline = time.time() + 2
+    while not batches and time.time() < deadline:
+        time.sleep(0.01)
+    meter.stop()
+    assert batches and len(batches[0]) == 2
+    print("✅ The background thread flushes when totals pile up")
+
+if __name__ == "__main__":
+    test_token_counts()
+    test_aggregates_and_flushes_in_one_batch()
+    test_failed_flush_is_retried()
+    test_quota_window()
+    test_quota_is_shared_by_workers()
+    test_background_flush()
+
+    print("\nAll tests completed!")
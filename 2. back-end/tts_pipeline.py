@@ -0,0 +1,259 @@
+"""
+TTS Pipeline Module
+
+This module provides pipelined text-to-speech synthesis. Module text is
+split at paragraph and sentence boundaries into short chunks, the chunks
+are synthesized concurrently (at most a few at a time per listener), and the
+audio segments are emitted in order as soon as each one is ready. The first
+chunk is a single sentence, so playback can start after the first sentence
+instead of after the whole lesson.
+
+Segments are joined into one playable stream: WAV segments share a single
+header written up front and contribute only their samples, while other
+formats (MP3 frames, Ogg pages) are concatenated as they are.
+"""
+
+import io
+import os
+import re
+import time
+import wave
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable, Iterator
+
+# Sentence ends followed by whitespace
+SENTENCE_BREAK = re.compile(r'(?<=[.!?;:])\s+')
+
+# Data size written into a streamed WAV header, whose final size is not known yet
+STREAMING_WAV_SIZE = 0xFFFFFFFF
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Split a sentence longer than max_chars at commas, and clauses still too long at spaces."""
+    parts = []
+    for clause in re.split(r'(?<=,)\s+', sentence):
+        parts.extend(clause.split() if len(clause) > max_chars else [clause])
+
+    pieces = []
+    current = ''
+    for part in parts:
+        candidate = f"{current} {part}".strip()
+        if current and len(candidate) > max_chars:
+            pieces.append(current)
+            current = part
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_speech_text(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks for speech synthesis.
+
+    Chunks end at sentence boundaries and never span paragraphs. The first
+    chunk is the first sentence alone, so its audio is ready quickly.
+
+    Args:
+        text: The text to speak
+        max_chars: Maximum characters per chunk
+
+    Returns:
+        List[str]: The chunks in reading order
+    """
+    chunks = []
+    for paragraph in re.split(r'\n\s*\n', text or ''):
+        sentences = []
+        for sentence in SENTENCE_BREAK.split(' '.join(paragraph.split())):
+            if sentence:
+                sentences.extend(_split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence])
+
+        current = ''
+        for sentence in sentences:
+            candidate = f"{current} {sentence}".strip()
+            # Keep the very first sentence on its own for a fast start
+            if current and (len(candidate) > max_chars or not chunks):
+                chunks.append(current)
+                current = sentence
+            else:
+                current = candidate
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def is_wav_audio(audio: bytes) -> bool:
+    """
+    Check whether audio data is a WAV file.
+
+    Args:
+        audio: The audio data
+
+    Returns:
+        bool: True if the data starts with a RIFF/WAVE header
+    """
+    return audio[:4] == b'RIFF' and audio[8:12] == b'WAVE'
+
+
+def _wav_header(channels: int, sample_width: int, frame_rate: int, data_size: int) -> bytes:
+    """Build a PCM WAV header for the given data size."""
+    riff_size = min(data_size + 36, STREAMING_WAV_SIZE)
+    return (b'RIFF' + struct.pack('<I', riff_size) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, frame_rate,
+                                    frame_rate * channels * sample_width, channels * sample_width, sample_width * 8)
+            + b'data' + struct.pack('<I', data_size))
+
+
+class AudioStitcher:
+    """Joins audio segments into one stream, sharing a single header between WAV segments."""
+
+    def __init__(self):
+        self._is_wav = None
+        self._params = None
+        self._parts = []
+
+    def add(self, segment: bytes) -> bytes:
+        """
+        Add the next segment.
+
+        Args:
+            segment: The audio of one chunk
+
+        Returns:
+            bytes: The bytes to send for this segment
+
+        Raises:
+            ValueError: If a WAV segment's format differs from the first segment's
+        """
+        if self._is_wav is None:
+            self._is_wav = is_wav_audio(segment)
+        if not self._is_wav:
+            self._parts.append(segment)
+            return segment
+
+        with wave.open(io.BytesIO(segment), 'rb') as reader:
+            params = (reader.getnchannels(), reader.getsampwidth(), reader.getframerate())
+            frames = reader.readframes(reader.getnframes())
+        self._parts.append(frames)
+
+        if self._params is None:
+            self._params = params
+            return _wav_header(*params, STREAMING_WAV_SIZE) + frames
+        if params != self._params:
+            raise ValueError(f"Audio segment format {params} differs from {self._params}")
+        return frames
+
+    def getvalue(self) -> bytes:
+        """
+        Get the complete audio of all segments added so far.
+
+        Returns:
+            bytes: The joined audio, with exact sizes in the WAV header
+        """
+        data = b''.join(self._parts)
+        if self._is_wav and self._params:
+            return _wav_header(*self._params, len(data)) + data
+        return data
+
+
+class SpeechPipeline:
+    """
+    Synthesizes text chunk by chunk, concurrently, yielding audio in order.
+
+    The synthesize function is called as synthesize(text) for each chunk and
+    returns its audio, raising on failure. Chunks of all listeners share one
+    worker pool; each listener has at most max_concurrency chunks in flight.
+    """
+
+    def __init__(self, synthesize: Callable[[str], bytes], max_concurrency: int = None,
+                 max_chars: int = None, max_workers: int = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            synthesize: Synthesizes the audio of one chunk of text
+            max_concurrency: Chunks of one text synthesized at the same time
+            max_chars: Maximum characters per chunk
+            max_workers: Worker threads shared by all texts
+        """
+        self.synthesize = synthesize
+        self.max_concurrency = max_concurrency or int(os.getenv('TTS_MAX_CONCURRENCY', 3))
+        self.max_chars = max_chars or int(os.getenv('TTS_CHUNK_CHARS', 400))
+        self.max_workers = max_workers or int(os.getenv('TTS_WORKERS', 8))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tts')
+        self._lock = threading.Lock()
+        self._stats = {'texts': 0, 'chunks': 0, 'cancelled_chunks': 0, 'total_first_audio_ms': 0.0}
+
+    def stream(self, text: str) -> Iterator[bytes]:
+        """
+        Synthesize a text, yielding each chunk's audio in reading order as soon as it is ready.
+
+        Closing the iterator early cancels chunks that have not started.
+
+        Args:
+            text: The text to speak
+
+        Returns:
+            Iterator[bytes]: The audio segments
+        """
+        started = time.time()
+        chunks = iter(split_speech_text(text, self.max_chars))
+        in_flight = deque()
+        first = True
+        try:
+            for chunk in chunks:
+                in_flight.append(self._executor.submit(self.synthesize, chunk))
+                if len(in_flight) >= self.max_concurrency:
+                    break
+
+            while in_flight:
+                segment = in_flight.popleft().result()
+                # Keep the window full while this segment is sent
+                chunk = next(chunks, None)
+                if chunk is not None:
+                    in_flight.append(self._executor.submit(self.synthesize, chunk))
+
+                with self._lock:
+                    self._stats['chunks'] += 1
+                    if first:
+                        self._stats['texts'] += 1
+                        self._stats['total_first_audio_ms'] += (time.time() - started) * 1000
+                first = False
+                yield segment
+        finally:
+            cancelled = sum(future.cancel() for future in in_flight)
+            if cancelled:
+                with self._lock:
+                    self._stats['cancelled_chunks'] += cancelled
+
+    def synthesize_all(self, text: str) -> bytes:
+        """
+        Synthesize a whole text with the pipeline and join the audio.
+
+        Args:
+            text: The text to speak
+
+        Returns:
+            bytes: The complete audio
+        """
+        stitcher = AudioStitcher()
+        for segment in self.stream(text):
+            stitcher.add(segment)
+        return stitcher.getvalue()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get pipeline counters.
+
+        Returns:
+            Dict[str, Any]: Texts and chunks synthesized, chunks cancelled and average time to first audio
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats.pop('total_first_audio_ms')
+        stats['avg_first_audio_ms'] = round(total / stats['texts'], 1) if stats['texts'] else 0.0
+        return stats
@@ -0,0 +1,334 @@
+"""
+Usage Meter Module
+
+This module meters LLM usage per user and endpoint. Each call's prompt and
+response token counts and latency are added to in-memory totals keyed by
+user, endpoint and model. A background thread writes the totals to the
+llm_usage table in one bulk insert every few seconds, so metering costs no
+Supabase write per call.
+
+A rolling per-user token total, kept in hourly buckets, backs a quota check
+cheap enough to run on every request. The buckets live in a local SQLite
+database shared by every worker process on the machine, so a user's quota
+covers the calls made by all workers.
+"""
+
+import os
+import time
+import uuid
+import atexit
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Callable, Tuple
+
+from prompt_builder import estimate_tokens
+
+# User ID recorded for background work not done on behalf of a user
+SYSTEM_USER = 'system'
+
+# Number of buckets the quota window is divided into
+QUOTA_BUCKETS = 24
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'llm_quota.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota_usage (
+    user_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    tokens INTEGER NOT NULL,
+    PRIMARY KEY (user_id, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_quota_usage_bucket ON quota_usage (bucket);
+"""
+
+
+def response_token_counts(prompt: str, response: Any, response_text: str) -> Tuple[int, int]:
+    """
+    Get the prompt and response token counts of an LLM call.
+
+    Counts reported in the response's usage metadata are used when present,
+    otherwise they are estimated from the text.
+
+    Args:
+        prompt: The prompt sent
+        response: The response object
+        response_text: The response text
+
+    Returns:
+        Tuple[int, int]: Prompt tokens and response tokens
+    """
+    usage = getattr(response, 'usage_metadata', None)
+    prompt_tokens = getattr(usage, 'prompt_token_count', 0) or estimate_tokens(prompt)
+    response_tokens = getattr(usage, 'candidates_token_count', 0) or estimate_tokens(response_text)
+    return prompt_tokens, response_tokens
+
+
+class UsageMeter:
+    """
+    Aggregates LLM usage in memory and flushes it in bulk.
+
+    The write function is called as write(rows) with a list of llm_usage
+    rows and must raise if they were not stored; failed rows are kept and
+    retried on the next flush. Quota buckets are written through to the
+    shared SQLite database on every call.
+    """
+
+    def __init__(self, write: Callable[[List[Dict[str, Any]]], Any], flush_interval: float = None,
+                 max_pending: int = None, quota_tokens: int = None, quota_window: float = None,
+                 db_path: str = None, clock: Callable[[], float] = time.time):
+        """
+        Initialize the meter.
+
+        Args:
+            write: Stores a batch of usage rows
+            flush_interval: Seconds between flushes
+            max_pending: Pending totals that trigger an early flush; more are dropped if writes keep failing
+            quota_tokens: Tokens a user may use per quota window (0 disables the quota)
+            quota_window: Length of the rolling quota window in seconds
+            db_path: Path of the SQLite database holding the quota buckets
+            clock: Time source, replaceable in tests
+        """
+        self.write = write
+        self.flush_interval = flush_interval or float(os.getenv('LLM_USAGE_FLUSH_SECONDS', 10))
+        self.max_pending = max_pending or int(os.getenv('LLM_USAGE_MAX_PENDING', 1000))
+        self.quota_tokens = quota_tokens if quota_tokens is not None else int(os.getenv('LLM_USER_TOKEN_QUOTA', 0))
+        self.quota_window = quota_window or float(os.getenv('LLM_USER_QUOTA_WINDOW_SECONDS', 24 * 3600))
+        self.db_path = db_path or os.getenv('LLM_QUOTA_DB_PATH', DEFAULT_DB_PATH)
+        self.clock = clock
+        self._bucket_seconds = self.quota_window / QUOTA_BUCKETS
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        self._pending = {}  # Map of (user_id, endpoint, model) to usage totals since the last flush
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {'calls': 0, 'errors': 0, 'tokens': 0, 'flushes': 0, 'rows_written': 0,
+                       'flush_failures': 0, 'rows_dropped': 0, 'throttled': 0, 'quota_errors': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the quota database, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _oldest_bucket(self) -> int:
+        """Get the index of the oldest bucket inside the quota window."""
+        return int(self.clock() // self._bucket_seconds) - QUOTA_BUCKETS + 1
+
+    def record(self, user_id: Optional[str], endpoint: str, model: str, prompt_tokens: int,
+               response_tokens: int, latency_ms: float, error: bool = False):
+        """
+        Record one LLM call.
+
+        Args:
+            user_id: The user the call was made for (None for background work)
+            endpoint: The endpoint or job that made the call
+            model: The model called
+            prompt_tokens: Tokens sent
+            response_tokens: Tokens received
+            latency_ms: Call duration in milliseconds
+            error: Whether the call failed
+        """
+        user_id = user_id or SYSTEM_USER
+        now = self.clock()
+        tokens = prompt_tokens + response_tokens
+        with self._lock:
+            totals = self._pending.get((user_id, endpoint, model))
+            if totals is None:
+                totals = self._pending[(user_id, endpoint, model)] = {
+                    'calls': 0, 'errors': 0, 'prompt_tokens': 0, 'response_tokens': 0,
+                    'total_latency_ms': 0.0, 'max_latency_ms': 0.0, 'period_start': now, 'period_end': now
+                }
+            totals['calls'] += 1
+            totals['errors'] += int(error)
+            totals['prompt_tokens'] += prompt_tokens
+            totals['response_tokens'] += response_tokens
+            totals['total_latency_ms'] += latency_ms
+            totals['max_latency_ms'] = max(totals['max_latency_ms'], latency_ms)
+            totals['period_end'] = now
+
+            self._stats['calls'] += 1
+            self._stats['errors'] += int(error)
+            self._stats['tokens'] += tokens
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+        if user_id != SYSTEM_USER and tokens:
+            try:
+                self._connection().execute(
+                    "INSERT INTO quota_usage (user_id, bucket, tokens) VALUES (?, ?, ?) "
+                    "ON CONFLICT (user_id, bucket) DO UPDATE SET tokens = tokens + excluded.tokens",
+                    (user_id, int(now // self._bucket_seconds), tokens)
+                )
+            except sqlite3.Error as e:
+                print(f"Error recording quota usage: {str(e)}")
+                with self._lock:
+                    self._stats['quota_errors'] += 1
+
+    def get_user_tokens(self, user_id: str) -> int:
+        """
+        Get the tokens a user used within the quota window, across all worker processes.
+
+        Args:
+            user_id: The user
+
+        Returns:
+            int: Tokens used in the rolling window
+        """
+        row = self._connection().execute(
+            "SELECT COALESCE(SUM(tokens), 0) FROM quota_usage WHERE user_id = ? AND bucket >= ?",
+            (user_id, self._oldest_bucket())
+        ).fetchone()
+        return row[0]
+
+    def check_quota(self, user_id: str) -> bool:
+        """
+        Check whether a user may make more LLM calls.
+
+        Args:
+            user_id: The user
+
+        Returns:
+            bool: True if the user is within quota (always True when the quota is disabled)
+        """
+        if not self.quota_tokens or not user_id:
+            return True
+        try:
+            if self.get_user_tokens(user_id) < self.quota_tokens:
+                return True
+        except sqlite3.Error as e:
+            # Let the request through rather than fail it over metering
+            print(f"Error checking quota usage: {str(e)}")
+            with self._lock:
+                self._stats['quota_errors'] += 1
+            return True
+        with self._lock:
+            self._stats['throttled'] += 1
+        return False
+
+    def retry_after(self) -> int:
+        """
+        Get the seconds until the oldest quota bucket expires.
+
+        Returns:
+            int: Seconds a throttled user should wait before retrying
+        """
+        return max(1, int(self._bucket_seconds - self.clock() % self._bucket_seconds))
+
+    def flush(self) -> int:
+        """
+        Write the pending usage totals in one batch.
+
+        Returns:
+            int: Number of rows written
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            self._prune_usage()
+            if not pending:
+                return 0
+
+            rows = [{
+                'id': str(uuid.uuid4()),
+                'user_id': user_id,
+                'endpoint': endpoint,
+                'model': model,
+                'calls': totals['calls'],
+                'errors': totals['errors'],
+                'prompt_tokens': totals['prompt_tokens'],
+                'response_tokens': totals['response_tokens'],
+                'total_tokens': totals['prompt_tokens'] + totals['response_tokens'],
+                'total_latency_ms': round(totals['total_latency_ms'], 1),
+                'max_latency_ms': round(totals['max_latency_ms'], 1),
+                'period_start': datetime.fromtimestamp(totals['period_start']).isoformat(),
+                'period_end': datetime.fromtimestamp(totals['period_end']).isoformat()
+            } for (user_id, endpoint, model), totals in pending.items()]
+
+            try:
+                self.write(rows)
+            except Exception as e:
+                print(f"Error writing LLM usage: {str(e)}")
+                self._restore(pending)
+                return 0
+
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['rows_written'] += len(rows)
+            return len(rows)
+
+    def _restore(self, pending: Dict[Tuple[str, str, str], Dict[str, Any]]):
+        """Merge totals that failed to flush back into the pending totals."""
+        with self._lock:
+            self._stats['flush_failures'] += 1
+            for key, totals in pending.items():
+                current = self._pending.get(key)
+                if current is None:
+                    if len(self._pending) >= self.max_pending:
+                        self._stats['rows_dropped'] += 1
+                        continue
+                    self._pending[key] = totals
+                    continue
+                for field in ('calls', 'errors', 'prompt_tokens', 'response_tokens', 'total_latency_ms'):
+                    current[field] += totals[field]
+                current['max_latency_ms'] = max(current['max_latency_ms'], totals['max_latency_ms'])
+                current['period_start'] = min(current['period_start'], totals['period_start'])
+
+    def _prune_usage(self):
+        """Drop quota buckets that left the window."""
+        try:
+            self._connection().execute("DELETE FROM quota_usage WHERE bucket < ?", (self._oldest_bucket(),))
+        except sqlite3.Error as e:
+            print(f"Error pruning quota usage: {str(e)}")
+
+    def start(self):
+        """Start the background flush thread and flush once more at exit."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='usage-meter', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        """Flush every interval, or early when many totals are pending."""
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing LLM usage: {str(e)}")
+
+    def stop(self):
+        """Stop the flush thread and write what is still pending."""
+        self._stop.set()
+        self._wake.set()
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get metering counters.
+
+        Returns:
+            Dict[str, Any]: Calls and tokens metered, flush outcomes, pending totals and throttled requests
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        try:
+            stats['metered_users'] = self._connection().execute(
+                "SELECT COUNT(DISTINCT user_id) FROM quota_usage WHERE bucket >= ?", (self._oldest_bucket(),)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error counting metered users: {str(e)}")
+        stats['quota_tokens'] = self.quota_tokens
+        return stats